@@ -0,0 +1,149 @@
+"""Add catalog and category product statistics.
+
+Revision ID: 3b9e5d0c8a41
+Revises: e932bdfb653c
+Create Date: 2026-10-17 21:48:10.402517
+
+Summary tables of product counts and prices per catalog and category, kept up
+to date by statement-level triggers on products and backfilled here. The
+(catalog_id, price) and (category_id, price) indexes serving the minimum and
+maximum price lookups replace the single-column ones and are built
+concurrently before those are dropped.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9e5d0c8a41'
+down_revision: str | None = 'e932bdfb653c'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+STATS_TABLES = (
+    ('catalog_stats', 'catalog_id', 'catalogs'),
+    ('category_stats', 'category_id', 'categories'),
+)
+TRIGGERS = ('products_stats_insert', 'products_stats_update', 'products_stats_delete')
+
+# Source of truth for the trigger SQL. app.core.models holds a copy for create_all, which
+# tests/core/test_models.py checks against this one; a later change belongs in a new migration.
+PRODUCT_STATS_FUNCTION = """
+CREATE OR REPLACE FUNCTION refresh_product_stats() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    changes text;
+    stats_table text;
+    key_column text;
+    parent_table text;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changes := 'SELECT catalog_id, category_id, price, 1 AS sign FROM new_rows';
+    ELSIF TG_OP = 'DELETE' THEN
+        changes := 'SELECT catalog_id, category_id, price, -1 AS sign FROM old_rows';
+    ELSE
+        changes := 'WITH moved AS ('
+            || 'SELECT n.catalog_id, n.category_id, n.price, o.catalog_id AS old_catalog_id, '
+            || 'o.category_id AS old_category_id, o.price AS old_price '
+            || 'FROM new_rows n JOIN old_rows o USING (id) '
+            || 'WHERE (n.catalog_id, n.category_id, n.price) IS DISTINCT FROM (o.catalog_id, o.category_id, o.price)) '
+            || 'SELECT catalog_id, category_id, price, 1 AS sign FROM moved UNION ALL '
+            || 'SELECT old_catalog_id, old_category_id, old_price, -1 FROM moved';
+    END IF;
+    FOR stats_table, key_column, parent_table IN
+        VALUES ('catalog_stats', 'catalog_id', 'catalogs'), ('category_stats', 'category_id', 'categories')
+    LOOP
+        EXECUTE format(
+            'WITH changes AS (%1$s) '
+            'INSERT INTO %2$I AS s (%3$I, product_count, price_total) '
+            'SELECT %3$I, sum(sign), sum(sign * price) FROM changes '
+            'WHERE EXISTS (SELECT FROM %4$I p WHERE p.id = changes.%3$I) GROUP BY %3$I '
+            'ON CONFLICT (%3$I) DO UPDATE SET product_count = s.product_count + excluded.product_count, '
+            'price_total = s.price_total + excluded.price_total',
+            changes, stats_table, key_column, parent_table
+        );
+        EXECUTE format(
+            'WITH changes AS (%1$s) '
+            'UPDATE %2$I s SET price_min = (SELECT min(price) FROM products p WHERE p.%3$I = s.%3$I), '
+            'price_max = (SELECT max(price) FROM products p WHERE p.%3$I = s.%3$I) '
+            'WHERE s.%3$I IN (SELECT %3$I FROM changes)',
+            changes, stats_table, key_column
+        );
+    END LOOP;
+    RETURN NULL;
+END;
+$$
+"""
+PRODUCT_STATS_TRIGGERS = (
+    (
+        'CREATE TRIGGER products_stats_insert AFTER INSERT ON products REFERENCING NEW TABLE AS new_rows '
+        'FOR EACH STATEMENT EXECUTE FUNCTION refresh_product_stats()'
+    ),
+    (
+        'CREATE TRIGGER products_stats_update AFTER UPDATE ON products REFERENCING OLD TABLE AS old_rows '
+        'NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION refresh_product_stats()'
+    ),
+    (
+        'CREATE TRIGGER products_stats_delete AFTER DELETE ON products REFERENCING OLD TABLE AS old_rows '
+        'FOR EACH STATEMENT EXECUTE FUNCTION refresh_product_stats()'
+    ),
+)
+
+
+def upgrade() -> None:
+    """Apply migration to the database."""
+    with op.get_context().autocommit_block():
+        for _, key_column, _ in STATS_TABLES:
+            op.create_index(
+                f'ix_products_{key_column}_price',
+                'products',
+                [key_column, 'price'],
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+            op.drop_index(f'ix_products_{key_column}', table_name='products', postgresql_concurrently=True)
+    for stats_table, key_column, parent_table in STATS_TABLES:
+        op.create_table(
+            stats_table,
+            sa.Column(key_column, sa.Integer(), nullable=False),
+            sa.Column('product_count', sa.BigInteger(), server_default='0', nullable=False),
+            sa.Column('price_total', sa.Numeric(precision=14, scale=2), server_default='0', nullable=False),
+            sa.Column('price_min', sa.Numeric(precision=10, scale=2), nullable=True),
+            sa.Column('price_max', sa.Numeric(precision=10, scale=2), nullable=True),
+            sa.ForeignKeyConstraint([key_column], [f'{parent_table}.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint(key_column),
+        )
+    # Statistics are backfilled in the same transaction that installs the triggers, so products written
+    # concurrently wait for the lock on products and are then counted by the triggers.
+    op.execute('LOCK TABLE products IN SHARE MODE')
+    op.execute(PRODUCT_STATS_FUNCTION)
+    for statement in PRODUCT_STATS_TRIGGERS:
+        op.execute(statement)
+    for stats_table, key_column, _ in STATS_TABLES:
+        op.execute(
+            f'INSERT INTO {stats_table} ({key_column}, product_count, price_total, price_min, price_max) '  # noqa: S608
+            f'SELECT {key_column}, count(*), sum(price), min(price), max(price) FROM products GROUP BY {key_column}'
+        )
+
+
+def downgrade() -> None:
+    """Rollback the migration."""
+    for name in TRIGGERS:
+        op.execute(f'DROP TRIGGER {name} ON products')
+    op.execute('DROP FUNCTION refresh_product_stats()')
+    for stats_table, _, _ in reversed(STATS_TABLES):
+        op.drop_table(stats_table)
+    with op.get_context().autocommit_block():
+        for _, key_column, _ in STATS_TABLES:
+            op.create_index(
+                f'ix_products_{key_column}',
+                'products',
+                [key_column],
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+            op.drop_index(f'ix_products_{key_column}_price', table_name='products', postgresql_concurrently=True)
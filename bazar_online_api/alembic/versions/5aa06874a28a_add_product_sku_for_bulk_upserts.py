@@ -0,0 +1,44 @@
+"""Add product SKU for bulk upserts.
+
+Revision ID: 5aa06874a28a
+Revises: e175743f05c3
+Create Date: 2026-10-17 19:21:40.270118
+
+The unique index backing the (owner_id, sku) constraint is built concurrently
+and then attached to the table, so existing rows are never locked for writes.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5aa06874a28a'
+down_revision: str | None = 'e175743f05c3'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Apply migration to the database."""
+    op.add_column('products', sa.Column('sku', sa.String(length=64), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_products_owner_id_sku',
+            'products',
+            ['owner_id', 'sku'],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    op.execute(
+        'ALTER TABLE products ADD CONSTRAINT uq_products_owner_id_sku UNIQUE USING INDEX uq_products_owner_id_sku'
+    )
+
+
+def downgrade() -> None:
+    """Rollback the migration."""
+    op.drop_constraint('uq_products_owner_id_sku', 'products', type_='unique')
+    op.drop_column('products', 'sku')
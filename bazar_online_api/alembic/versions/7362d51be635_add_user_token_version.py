@@ -0,0 +1,29 @@
+"""Add user token version.
+
+Revision ID: 7362d51be635
+Revises: ac01e91472ee
+Create Date: 2026-10-17 19:58:03.114209
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '7362d51be635'
+down_revision: str | None = 'ac01e91472ee'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Apply migration to the database."""
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Rollback the migration."""
+    op.drop_column('users', 'token_version')
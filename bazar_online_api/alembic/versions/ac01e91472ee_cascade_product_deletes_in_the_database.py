@@ -0,0 +1,45 @@
+"""Cascade product deletes in the database.
+
+Revision ID: ac01e91472ee
+Revises: 5aa06874a28a
+Create Date: 2026-10-17 19:40:52.631907
+
+The foreign keys are recreated as NOT VALID and validated in a separate
+transaction, so existing rows are checked without blocking writes.
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'ac01e91472ee'
+down_revision: str | None = '5aa06874a28a'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+FOREIGN_KEYS = (
+    ('products_catalog_id_fkey', 'catalogs', 'catalog_id'),
+    ('products_category_id_fkey', 'categories', 'category_id'),
+)
+
+
+def _recreate_foreign_keys(ondelete: str | None) -> None:
+    for name, referent, column in FOREIGN_KEYS:
+        op.drop_constraint(name, 'products', type_='foreignkey')
+        op.create_foreign_key(
+            name, 'products', referent, [column], ['id'], ondelete=ondelete, postgresql_not_valid=True
+        )
+    with op.get_context().autocommit_block():
+        for name, _, _ in FOREIGN_KEYS:
+            op.execute(f'ALTER TABLE products VALIDATE CONSTRAINT {name}')
+
+
+def upgrade() -> None:
+    """Apply migration to the database."""
+    _recreate_foreign_keys(ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    """Rollback the migration."""
+    _recreate_foreign_keys(ondelete=None)
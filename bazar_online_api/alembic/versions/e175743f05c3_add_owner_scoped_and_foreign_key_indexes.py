@@ -0,0 +1,81 @@
+"""Add owner-scoped and foreign key indexes.
+
+Revision ID: e175743f05c3
+Revises: f19093c62313
+Create Date: 2026-10-17 19:02:11.418305
+
+Indexes are built with CREATE INDEX CONCURRENTLY outside of a transaction, so
+the migration can run against a live database without locking writes.
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e175743f05c3'
+down_revision: str | None = 'f19093c62313'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+OWNER_SCOPED_TABLES = ('catalogs', 'categories', 'products')
+PRIMARY_KEY_TABLES = ('users', 'catalogs', 'categories', 'products')
+
+
+def upgrade() -> None:
+    """Apply migration to the database."""
+    with op.get_context().autocommit_block():
+        for table in OWNER_SCOPED_TABLES:
+            op.create_index(
+                f'ix_{table}_owner_id_id',
+                table,
+                ['owner_id', 'id'],
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+            op.create_index(
+                f'ix_{table}_owner_id_created_at_id',
+                table,
+                ['owner_id', 'created_at', 'id'],
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        op.create_index(
+            op.f('ix_products_catalog_id'),
+            'products',
+            ['catalog_id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            op.f('ix_products_category_id'),
+            'products',
+            ['category_id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        for table in PRIMARY_KEY_TABLES:
+            op.drop_index(op.f(f'ix_{table}_id'), table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Rollback the migration."""
+    with op.get_context().autocommit_block():
+        for table in PRIMARY_KEY_TABLES:
+            op.create_index(
+                op.f(f'ix_{table}_id'),
+                table,
+                ['id'],
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        op.drop_index(op.f('ix_products_category_id'), table_name='products', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_products_catalog_id'), table_name='products', postgresql_concurrently=True)
+        for table in OWNER_SCOPED_TABLES:
+            op.drop_index(f'ix_{table}_owner_id_created_at_id', table_name=table, postgresql_concurrently=True)
+            op.drop_index(f'ix_{table}_owner_id_id', table_name=table, postgresql_concurrently=True)
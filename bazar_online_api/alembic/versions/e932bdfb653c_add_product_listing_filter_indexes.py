@@ -0,0 +1,40 @@
+"""Add product listing filter indexes.
+
+Revision ID: e932bdfb653c
+Revises: 7454c81d743a
+Create Date: 2026-10-17 21:06:52.730914
+
+Composite indexes matching the filters and sort orders of the product listing,
+built with CREATE INDEX CONCURRENTLY outside of a transaction.
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e932bdfb653c'
+down_revision: str | None = '7454c81d743a'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+LISTING_INDEXES = {
+    'ix_products_owner_id_catalog_id_created_at_id': ['owner_id', 'catalog_id', 'created_at', 'id'],
+    'ix_products_owner_id_category_id_created_at_id': ['owner_id', 'category_id', 'created_at', 'id'],
+    'ix_products_owner_id_price_id': ['owner_id', 'price', 'id'],
+    'ix_products_owner_id_name_id': ['owner_id', 'name', 'id'],
+}
+
+
+def upgrade() -> None:
+    """Apply migration to the database."""
+    with op.get_context().autocommit_block():
+        for name, columns in LISTING_INDEXES.items():
+            op.create_index(name, 'products', columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Rollback the migration."""
+    with op.get_context().autocommit_block():
+        for name in LISTING_INDEXES:
+            op.drop_index(name, table_name='products', postgresql_concurrently=True)
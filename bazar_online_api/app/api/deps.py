@@ -1,24 +1,127 @@
-from typing import Annotated
+from collections.abc import AsyncGenerator
+from typing import Annotated, Any
 
 import jwt
 import sqlalchemy as sa
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.models import User
+from app.core.schemas import Principal
 from app.core.security import T_Token
 from app.core.settings import settings
-from app.infra.database import T_DbSession
+from app.infra.cache import CacheBackend, T_Cache
+from app.infra.database import T_DbSession, T_ReplicaRouter
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/v1/auth/login')
 
 
-async def get_current_user(token: T_Token, session: T_DbSession) -> User:
+def _principal_cache_key(email: str) -> str:
+    return f'principal:{email}'
+
+
+def _token_version_cache_key(user_id: int) -> str:
+    return f'token_version:{user_id}'
+
+
+def _primary_reads_cache_key(user_id: int) -> str:
+    return f'primary_reads:{user_id}'
+
+
+def _unauthorized() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail='Invalid authentication credentials',
+    )
+
+
+def mark_replayed(request: Request) -> None:
+    """Record that the request is answered with a stored response and writes nothing.
+
+    The write session then leaves the user's reads on the replicas, and `invalidates` keeps their cached
+    responses.
+    """
+    request.state.replayed = True
+
+
+def is_replayed(request: Request) -> bool:
+    """Whether the request is answered with a stored response, as recorded by `mark_replayed`."""
+    return getattr(request.state, 'replayed', False)
+
+
+async def invalidate_principal(cache: CacheBackend, email: str) -> None:
+    """Drop the cached principal of a user, to be called whenever the user's row changes.
+
+    Args:
+        cache: Cache backend holding the principals.
+        email: E-mail of the user (the token subject).
+    """
+    await cache.delete(_principal_cache_key(email))
+
+
+async def cache_token_version(cache: CacheBackend, user_id: int, token_version: int) -> None:
+    """Record a user's current token version, e.g. right after it was bumped to revoke their tokens.
+
+    Args:
+        cache: Cache backend holding the token versions.
+        user_id: ID of the user.
+        token_version: The user's current token version.
+    """
+    await cache.set(
+        _token_version_cache_key(user_id), str(token_version).encode(), settings.TOKEN_VERSION_CACHE_TTL_SECONDS
+    )
+
+
+async def _current_token_version(session: AsyncSession, cache: CacheBackend, user_id: int) -> int | None:
+    cached = await cache.get(_token_version_cache_key(user_id))
+    if cached is not None:
+        return int(cached)
+    token_version = await session.scalar(sa.select(User.token_version).where(User.id == user_id))
+    if token_version is not None:
+        await cache_token_version(cache, user_id, token_version)
+    return token_version
+
+
+async def _principal_from_subject(session: AsyncSession, cache: CacheBackend, email: str) -> Principal:
+    cached = await cache.get(_principal_cache_key(email))
+    if cached is not None:
+        return Principal.model_validate_json(cached)
+
+    query = sa.select(User.id, User.email, User.username, User.token_version).where(User.email == email)
+    user = (await session.execute(query)).first()
+    if not user:
+        raise _unauthorized()
+
+    principal = Principal.model_validate(user)
+    await cache.set(
+        _principal_cache_key(email), principal.model_dump_json().encode(), settings.PRINCIPAL_CACHE_TTL_SECONDS
+    )
+    return principal
+
+
+def _principal_from_claims(payload: dict[str, Any]) -> Principal:
+    try:
+        return Principal(
+            id=payload['uid'], email=payload['sub'], username=payload['username'], token_version=payload['ver']
+        )
+    except (KeyError, ValidationError):
+        raise _unauthorized() from None
+
+
+async def get_current_user(token: T_Token, session: T_DbSession, cache: T_Cache) -> Principal:
     """Validate the JWT token and return the current user.
 
+    Tokens carrying a `uid` claim are trusted as-is once their token version is checked against the user's
+    current one (cached, and skipped entirely when TOKEN_REVOCATION_CHECK is off). Older tokens holding only
+    the e-mail are resolved through the principal cache; they predate token versions, so they count as version 0
+    and stop working once the user revokes their tokens.
+
     Args:
         token: JWT token from the Authorization header.
         session: Async SQLAlchemy session.
+        cache: Cache backend holding principals and token versions.
 
     Returns:
         The authenticated user.
@@ -26,26 +129,71 @@ async def get_current_user(token: T_Token, session: T_DbSession) -> User:
     try:
         payload = jwt.decode(token, algorithms=[settings.ACCESS_TOKEN_ALGORITHM], key=settings.SECRET_KEY)
     except jwt.PyJWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail='Invalid authentication credentials',
-        ) from None
+        raise _unauthorized() from None
 
     email: str = payload.get('sub', '')
     if not email:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail='Invalid authentication credentials',
-        )
+        raise _unauthorized()
 
-    user = await session.scalar(sa.select(User).where(User.email == email))
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail='Invalid authentication credentials',
-        )
+    if 'uid' not in payload:
+        principal = await _principal_from_subject(session, cache, email)
+        principal = principal.model_copy(update={'token_version': payload.get('ver', 0)})
+    else:
+        principal = _principal_from_claims(payload)
+
+    if settings.TOKEN_REVOCATION_CHECK:
+        token_version = await _current_token_version(session, cache, principal.id)
+        if token_version != principal.token_version:
+            raise _unauthorized()
+
+    return principal
 
-    return user
+
+T_CurrentUser = Annotated[Principal, Depends(get_current_user)]
+
+
+async def get_read_session(
+    current_user: T_CurrentUser, session: T_DbSession, cache: T_Cache, replicas: T_ReplicaRouter
+) -> AsyncGenerator[AsyncSession, None]:
+    """Yield the session used by read-only handlers.
+
+    Reads go to the next reachable replica, and fall back to the primary session when no replica is configured or
+    reachable, or for DB_REPLICA_STICKY_SECONDS after the user's last write, so users always read their own writes
+    regardless of replication lag.
+
+    Args:
+        current_user: The authenticated user.
+        session: Session on the primary database.
+        cache: Cache backend recording the users' recent writes.
+        replicas: Router over the read replicas.
+    """
+    if replicas.factories and await cache.get(_primary_reads_cache_key(current_user.id)) is None:
+        replica_session = await replicas.connect()
+        if replica_session is not None:
+            async with replica_session:
+                yield replica_session
+            return
+    yield session
+
+
+async def get_write_session(
+    request: Request, current_user: T_CurrentUser, session: T_DbSession, cache: T_Cache, replicas: T_ReplicaRouter
+) -> AsyncGenerator[AsyncSession, None]:
+    """Yield the primary session to a handler that writes, then pin the user's reads to the primary.
+
+    Reads are left alone when the request was answered with a replayed response, which wrote nothing.
+
+    Args:
+        request: The incoming request.
+        current_user: The authenticated user.
+        session: Session on the primary database.
+        cache: Cache backend recording the users' recent writes.
+        replicas: Router over the read replicas.
+    """
+    yield session
+    if replicas.factories and not is_replayed(request):
+        await cache.set(_primary_reads_cache_key(current_user.id), b'1', settings.DB_REPLICA_STICKY_SECONDS)
 
 
-T_CurrentUser = Annotated[User, Depends(get_current_user)]
+T_ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
+T_WriteSession = Annotated[AsyncSession, Depends(get_write_session)]
@@ -0,0 +1,203 @@
+import asyncio
+import hashlib
+import random
+import time
+from collections.abc import AsyncGenerator
+from datetime import timedelta
+from typing import Annotated, Any
+
+import sqlalchemy as sa
+from fastapi import Depends, Header, HTTPException, Request, Response, status
+from pydantic_core import to_json
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import T_CurrentUser, T_WriteSession, mark_replayed
+from app.core.models import IdempotencyKey
+from app.core.settings import settings
+from app.infra.profiling import profile_serialization
+
+JSON_MEDIA_TYPE = 'application/json'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+POLL_SECONDS = 0.05
+POLL_MAX_SECONDS = 1.0
+
+_sample = random.random
+
+T_IdempotencyKeyHeader = Annotated[
+    str | None,
+    Header(
+        alias='Idempotency-Key',
+        min_length=1,
+        max_length=255,
+        description='Client-chosen key making retries of this request return the first response instead of '
+        'writing again.',
+    ),
+]
+
+
+def _fingerprint(request: Request, body: bytes) -> str:
+    digest = hashlib.sha256(f'{request.method} {request.url.path}?{request.url.query}\n'.encode())
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def _key_filter(owner_id: int, key: str) -> sa.ColumnElement[bool]:
+    return sa.and_(IdempotencyKey.owner_id == owner_id, IdempotencyKey.key == key)
+
+
+def _expired() -> sa.ColumnElement[bool]:
+    return IdempotencyKey.created_at < sa.func.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+
+
+def _stale() -> sa.ColumnElement[bool]:
+    """Whether a key has expired, or was claimed by a request that died before storing its response."""
+    return sa.or_(
+        _expired(),
+        sa.and_(
+            IdempotencyKey.status_code.is_(None),
+            IdempotencyKey.created_at < sa.func.now() - timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+        ),
+    )
+
+
+async def purge_expired_keys(session: AsyncSession) -> int:
+    """Delete up to IDEMPOTENCY_PURGE_BATCH_SIZE expired keys, oldest first, and return how many were deleted.
+
+    The keys are found through the `created_at` index and locked with SKIP LOCKED, so concurrent purges share
+    the work instead of waiting on each other.
+    """
+    expired = (
+        sa.select(IdempotencyKey.owner_id, IdempotencyKey.key)
+        .where(_expired())
+        .order_by(IdempotencyKey.created_at)
+        .limit(settings.IDEMPOTENCY_PURGE_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    )
+    query = (
+        sa.delete(IdempotencyKey)
+        .where(sa.tuple_(IdempotencyKey.owner_id, IdempotencyKey.key).in_(expired))
+        .returning(IdempotencyKey.owner_id)
+    )
+    purged = len((await session.scalars(query)).all())
+    await session.commit()
+    return purged
+
+
+async def _claim(session: AsyncSession, owner_id: int, key: str, fingerprint: str) -> bool:
+    """Record `key` as in flight for this request, unless a live request already holds it.
+
+    An IDEMPOTENCY_PURGE_RATE fraction of the claims also purges a batch of expired keys, which would otherwise
+    only be replaced when their owner reused them.
+    """
+    insert = postgresql.insert(IdempotencyKey).values(
+        owner_id=owner_id, key=key, fingerprint=fingerprint, created_at=sa.func.now()
+    )
+    query = insert.on_conflict_do_update(
+        index_elements=[IdempotencyKey.owner_id, IdempotencyKey.key],
+        set_={'fingerprint': fingerprint, 'status_code': None, 'response_body': None, 'created_at': sa.func.now()},
+        where=_stale(),
+    ).returning(IdempotencyKey.owner_id)
+    claimed = await session.scalar(query) is not None
+    await session.commit()
+    if claimed and _sample() < settings.IDEMPOTENCY_PURGE_RATE:
+        await purge_expired_keys(session)
+    return claimed
+
+
+def _replay(status_code: int, body: bytes) -> Response:
+    return Response(body, status_code=status_code, media_type=JSON_MEDIA_TYPE, headers={REPLAYED_HEADER: 'true'})
+
+
+class IdempotentRequest:
+    """Idempotency slot of a POST request, as resolved by the `idempotent_request` dependency."""
+
+    def __init__(
+        self, session: AsyncSession, owner_id: int, key: str | None, response: Response | None = None
+    ) -> None:
+        """Wrap the slot of `key` (None without an Idempotency-Key header) and the response it already holds."""
+        self.session = session
+        self.owner_id = owner_id
+        self.key = key
+        self.response = response
+
+    async def store(self, content: Any, status_code: int) -> Response:  # noqa: ANN401
+        """Record `content` as the response to the key, and answer with it.
+
+        Call it before committing the handler's writes: the response is stored in the same transaction, so a
+        retry either replays it or, if the writes were rolled back, runs the request again.
+        """
+        with profile_serialization():
+            body = to_json(content)
+        if self.key is not None:
+            query = (
+                sa.update(IdempotencyKey)
+                .where(_key_filter(self.owner_id, self.key))
+                .values(status_code=status_code, response_body=body)
+            )
+            await self.session.execute(query)
+        return Response(body, status_code=status_code, media_type=JSON_MEDIA_TYPE)
+
+
+async def idempotent_request(
+    request: Request, session: T_WriteSession, current_user: T_CurrentUser, key: T_IdempotencyKeyHeader = None
+) -> AsyncGenerator[IdempotentRequest, None]:
+    """Resolve the Idempotency-Key of a POST request to the response to replay, or claim it for this request.
+
+    Keys are scoped to the current user and remembered for IDEMPOTENCY_KEY_TTL_SECONDS. A retry of a completed
+    request is answered with the stored response after a primary key lookup; it is marked as replayed, so that it
+    neither invalidates the user's cached responses nor pins their reads to the primary. A duplicate arriving
+    while the first request is still running waits up to IDEMPOTENCY_WAIT_SECONDS for its response, and gets 409
+    past that. It polls the key with an exponential backoff from POLL_SECONDS to POLL_MAX_SECONDS, so that a burst
+    of retries adds little load to the primary. Reusing a key for a different request is rejected with 422. When
+    the handler fails, the key is released so that the request can be retried.
+    """
+    if key is None:
+        yield IdempotentRequest(session, current_user.id, None)
+        return
+
+    fingerprint = _fingerprint(request, await request.body())
+    lookup = sa.select(
+        IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.response_body, _stale().label('stale')
+    ).where(_key_filter(current_user.id, key))
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    delay = POLL_SECONDS
+    while True:
+        existing = (await session.execute(lookup)).first()
+        await session.commit()
+        if existing is None or existing.stale:
+            if await _claim(session, current_user.id, key, fingerprint):
+                break
+        elif existing.fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail='Idempotency-Key was already used for a different request',
+            )
+        elif existing.status_code is not None and existing.response_body is not None:
+            mark_replayed(request)
+            yield IdempotentRequest(
+                session, current_user.id, key, _replay(existing.status_code, existing.response_body)
+            )
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail='A request with this Idempotency-Key is still in progress',
+                headers={'Retry-After': '1'},
+            )
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, POLL_MAX_SECONDS)
+
+    try:
+        yield IdempotentRequest(session, current_user.id, key)
+    except Exception:
+        await session.rollback()
+        await session.execute(
+            sa.delete(IdempotencyKey).where(_key_filter(current_user.id, key), IdempotencyKey.status_code.is_(None))
+        )
+        await session.commit()
+        raise
+
+
+T_IdempotentRequest = Annotated[IdempotentRequest, Depends(idempotent_request)]
@@ -0,0 +1,107 @@
+from collections.abc import Iterable
+from typing import Annotated, Literal
+
+import sqlalchemy as sa
+from fastapi import Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import T_CurrentUser, T_WriteSession
+from app.core.models import Catalog, Category
+
+
+class OwnedReferences:
+    """Ownership of the catalogs and categories referenced by a request's writes, resolved in batches.
+
+    IDs are looked up once per request: `resolve` checks every ID not seen yet with a single query, and later
+    checks of the same IDs are answered from memory. Names are resolved to IDs the same way by `resolve_names`.
+    """
+
+    def __init__(self, session: AsyncSession, owner_id: int) -> None:
+        """Track the references of `owner_id`'s writes, looked up through `session`."""
+        self.session = session
+        self.owner_id = owner_id
+        self._catalogs: dict[int, bool] = {}
+        self._categories: dict[int, bool] = {}
+        self._catalog_names: dict[str, list[int]] = {}
+        self._category_names: dict[str, list[int]] = {}
+
+    async def resolve(self, catalog_ids: Iterable[int], category_ids: Iterable[int]) -> None:
+        """Look up which of the given catalog and category IDs belong to the owner, using a single query."""
+        new_catalogs = set(catalog_ids) - self._catalogs.keys()
+        new_categories = set(category_ids) - self._categories.keys()
+        if not new_catalogs and not new_categories:
+            return
+        query = sa.union_all(
+            sa.select(sa.literal('catalog').label('kind'), Catalog.id).where(
+                Catalog.owner_id == self.owner_id, Catalog.id.in_(new_catalogs)
+            ),
+            sa.select(sa.literal('category').label('kind'), Category.id).where(
+                Category.owner_id == self.owner_id, Category.id.in_(new_categories)
+            ),
+        )
+        rows = (await self.session.execute(query)).all()
+        self._catalogs.update(
+            dict.fromkeys(new_catalogs, False) | {id_: True for kind, id_ in rows if kind == 'catalog'}
+        )
+        self._categories.update(
+            dict.fromkeys(new_categories, False) | {id_: True for kind, id_ in rows if kind == 'category'}
+        )
+
+    async def resolve_names(self, catalog_names: Iterable[str], category_names: Iterable[str]) -> None:
+        """Look up the owner's catalogs and categories called by any of the given names, using a single query."""
+        new_catalogs = set(catalog_names) - self._catalog_names.keys()
+        new_categories = set(category_names) - self._category_names.keys()
+        if not new_catalogs and not new_categories:
+            return
+        query = sa.union_all(
+            sa.select(sa.literal('catalog').label('kind'), Catalog.name, Catalog.id).where(
+                Catalog.owner_id == self.owner_id, Catalog.name.in_(new_catalogs)
+            ),
+            sa.select(sa.literal('category').label('kind'), Category.name, Category.id).where(
+                Category.owner_id == self.owner_id, Category.name.in_(new_categories)
+            ),
+        )
+        rows = (await self.session.execute(query)).all()
+        self._catalog_names.update({name: [] for name in new_catalogs})
+        self._category_names.update({name: [] for name in new_categories})
+        for kind, name, id_ in rows:
+            if kind == 'catalog':
+                self._catalog_names[name].append(id_)
+                self._catalogs[id_] = True
+            else:
+                self._category_names[name].append(id_)
+                self._categories[id_] = True
+
+    def named(self, kind: Literal['catalog', 'category'], name: str) -> list[int]:
+        """Return the IDs of the owner's catalogs or categories called `name`, which must have been resolved first."""
+        return (self._catalog_names if kind == 'catalog' else self._category_names)[name]
+
+    def problem(self, catalog_id: int, category_id: int) -> str | None:
+        """Describe why a product may not reference `catalog_id` and `category_id`, or return None if it may.
+
+        Both IDs must have been resolved first.
+        """
+        if not self._catalogs[catalog_id]:
+            return 'Catalog not found'
+        if not self._categories[category_id]:
+            return 'Category not found'
+        return None
+
+    async def check(self, catalog_id: int, category_id: int) -> None:
+        """Resolve the references of a single product and reject them unless the owner owns both.
+
+        Raises:
+            HTTPException: 422 if the catalog or the category does not exist or belongs to another user.
+        """
+        await self.resolve((catalog_id,), (category_id,))
+        detail = self.problem(catalog_id, category_id)
+        if detail is not None:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail)
+
+
+def get_owned_references(session: T_WriteSession, current_user: T_CurrentUser) -> OwnedReferences:
+    """Return the request's ownership checks of the current user's catalogs and categories."""
+    return OwnedReferences(session, current_user.id)
+
+
+T_OwnedReferences = Annotated[OwnedReferences, Depends(get_owned_references)]
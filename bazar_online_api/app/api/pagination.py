@@ -0,0 +1,66 @@
+import base64
+import binascii
+from collections.abc import Sequence
+from typing import Annotated, Any
+
+import sqlalchemy as sa
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from pydantic_core import to_json
+from sqlalchemy.orm import QueryableAttribute
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+type SortKey = QueryableAttribute[Any] | sa.ColumnElement[Any]
+
+
+class PageParams(BaseModel):
+    """Keyset pagination query parameters."""
+
+    limit: int = Field(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description='Maximum number of items to return.')
+    cursor: str | None = Field(None, description='Opaque cursor returned as `next_cursor` by the previous page.')
+
+
+T_PageParams = Annotated[PageParams, Query()]
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort key values of the last row of a page into an opaque cursor."""
+    return base64.urlsafe_b64encode(to_json(list(values))).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, keys: Sequence[SortKey]) -> tuple[Any, ...]:
+    """Decode a cursor produced by `encode_cursor` back into values typed after the sort keys.
+
+    Raises:
+        HTTPException: If the cursor is malformed or does not match the sort keys.
+    """
+    adapter: TypeAdapter[tuple[Any, ...]] = TypeAdapter(tuple[*(key.type.python_type for key in keys)])  # type: ignore[misc]
+    try:
+        return adapter.validate_json(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError, ValidationError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Invalid pagination cursor') from None
+
+
+def apply_keyset[Q: sa.Select[Any]](
+    query: Q, keys: Sequence[SortKey], page: PageParams, *, descending: bool = False
+) -> Q:
+    """Restrict `query` to the rows following `page.cursor` in `keys` order, descending if asked to.
+
+    One extra row is fetched so that `split_page` can tell whether a next page exists.
+    """
+    if page.cursor is not None:
+        values = decode_cursor(page.cursor, keys)
+        bounds = sa.tuple_(*(sa.literal(value, key.type) for key, value in zip(keys, values, strict=True)))
+        query = query.where(sa.tuple_(*keys) < bounds if descending else sa.tuple_(*keys) > bounds)
+    order = [key.desc() for key in keys] if descending else keys
+    return query.order_by(*order).limit(page.limit + 1)
+
+
+def split_page[R](rows: Sequence[R], keys: Sequence[SortKey], page: PageParams) -> tuple[list[R], str | None]:
+    """Drop the extra row fetched by `apply_keyset` and build the cursor for the next page."""
+    if len(rows) <= page.limit:
+        return list(rows), None
+    items = list(rows[: page.limit])
+    return items, encode_cursor([getattr(items[-1], str(key.key)) for key in keys])
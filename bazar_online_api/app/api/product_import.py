@@ -0,0 +1,349 @@
+import codecs
+import collections
+import csv
+import logging
+from collections.abc import AsyncIterator, Iterator
+from typing import Any, Literal
+
+import sqlalchemy as sa
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.ownership import OwnedReferences
+from app.core.models import Product
+from app.core.schemas import ProductImportError, ProductImportResult, ProductImportRow
+from app.infra.copy import copy_rows
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_ERRORS = 1000
+IMPORT_MAX_RECORD_LENGTH = 64 * 1024
+RECORD_TOO_LONG = f'Record is longer than {IMPORT_MAX_RECORD_LENGTH} characters'
+IMPORT_REQUIRED_COLUMNS = (('name',), ('price',), ('catalog_id', 'catalog'), ('category_id', 'category'))
+
+MERGE_COLUMNS = ('name', 'description', 'price', 'sku', 'catalog_id', 'category_id')
+UPSERT_COLUMNS = ('name', 'description', 'price', 'catalog_id', 'category_id', 'updated_at')
+
+STAGING_TABLE = sa.table(
+    'product_import',
+    sa.column('row_number', sa.Integer),
+    *(sa.column(column) for column in MERGE_COLUMNS),
+)
+STAGING_DDL = (
+    'DROP TABLE IF EXISTS product_import',
+    (
+        'CREATE TEMPORARY TABLE product_import (row_number integer PRIMARY KEY, name varchar(100), description text, '
+        'price numeric(10, 2), sku varchar(64), catalog_id integer, category_id integer) ON COMMIT DROP'
+    ),
+)
+
+
+async def read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[list[str | None]]:
+    """Decode an upload streamed in chunks of any size, yielding the complete UTF-8 lines received with each chunk.
+
+    Lines keep their line break, except for a last line without one. A line longer than IMPORT_MAX_RECORD_LENGTH
+    characters is dropped as it arrives, so that it is never held in memory, and is replaced by None.
+
+    Raises:
+        HTTPException: 422 if the upload is not valid UTF-8.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    partial = ''
+    skipping = False
+    final = False
+    while not final:
+        chunk = await anext(chunks, None)
+        final = chunk is None
+        try:
+            *ended, tail = decoder.decode(chunk or b'', final=final).split('\n')
+        except UnicodeDecodeError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail='The file must be encoded in UTF-8'
+            ) from exc
+        lines: list[str | None] = []
+        for text in ended:
+            if skipping:
+                skipping = False
+                continue
+            line, partial = f'{partial}{text}\n', ''
+            lines.append(line if len(line) <= IMPORT_MAX_RECORD_LENGTH else None)
+        if not skipping:
+            partial += tail
+            if len(partial) > IMPORT_MAX_RECORD_LENGTH:
+                lines.append(None)
+                partial, skipping = '', True
+        if final and partial:
+            lines.append(partial)
+        if lines:
+            yield lines
+
+
+class _EndOfLines(Exception):  # noqa: N818
+    """The lines received so far end in the middle of a record."""
+
+
+class _RecordTooLong(Exception):  # noqa: N818
+    """The record being read is longer than IMPORT_MAX_RECORD_LENGTH characters."""
+
+
+class _LineFeed:
+    """Lines handed to a csv.reader, refilled as the chunks of the upload arrive.
+
+    The lines of the record being read are kept until it is complete, so that a record cut short by the end of
+    the lines received so far is read again from its first line once more lines arrive.
+    """
+
+    def __init__(self) -> None:
+        self.pending: collections.deque[str | None] = collections.deque()
+        self.record: list[str] = []
+        self.length = 0
+        self.final = False
+
+    def __iter__(self) -> '_LineFeed':
+        return self
+
+    def __next__(self) -> str:
+        if not self.pending:
+            if self.final:
+                raise StopIteration
+            raise _EndOfLines
+        line = self.pending.popleft()
+        if line is None:
+            raise _RecordTooLong
+        self.record.append(line)
+        self.length += len(line)
+        if self.length > IMPORT_MAX_RECORD_LENGTH:
+            raise _RecordTooLong
+        return line
+
+    def rewind(self) -> None:
+        """Put the lines of the incomplete record back, to be read again."""
+        self.pending.extendleft(reversed(self.record))
+        self.complete()
+
+    def complete(self) -> None:
+        """Forget the lines of the record just read."""
+        self.record = []
+        self.length = 0
+
+
+def _read_csv(reader: Iterator[list[str]], feed: _LineFeed) -> Iterator[list[str] | str]:
+    """Read the records available in `feed`, yielding the fields of each or the reason it cannot be read."""
+    while True:
+        try:
+            values = next(reader)
+        except _EndOfLines:
+            feed.rewind()
+            return
+        except StopIteration:
+            return
+        except _RecordTooLong:
+            feed.complete()
+            yield RECORD_TOO_LONG
+        except csv.Error as exc:
+            feed.complete()
+            yield str(exc)
+        else:
+            feed.complete()
+            if values:
+                yield values
+
+
+async def read_csv_records(lines: AsyncIterator[list[str | None]]) -> AsyncIterator[list[str] | str]:
+    """Split the lines of a CSV upload into records with a single csv.reader, skipping blank lines.
+
+    Quoted fields may span lines and a quote inside an unquoted field is a literal character, as for any CSV
+    file. A record longer than IMPORT_MAX_RECORD_LENGTH characters is reported instead of its fields and reading
+    resumes on the next line, so an unclosed quote neither holds the rest of the upload in memory nor swallows it.
+    """
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    async for batch in lines:
+        feed.pending.extend(batch)
+        for record in _read_csv(reader, feed):
+            yield record
+    feed.final = True
+    for record in _read_csv(reader, feed):
+        yield record
+
+
+def _validation_detail(exc: ValidationError) -> str:
+    return '; '.join(
+        f'{".".join(map(str, error["loc"]))}: {error["msg"]}' if error['loc'] else error['msg']
+        for error in exc.errors()
+    )
+
+
+async def _ndjson_records(lines: AsyncIterator[list[str | None]]) -> AsyncIterator[str | None]:
+    async for batch in lines:
+        for line in batch:
+            if line is None or line.strip():
+                yield line
+
+
+async def parse_rows(
+    lines: AsyncIterator[list[str | None]], import_format: Literal['ndjson', 'csv']
+) -> AsyncIterator[ProductImportRow | str]:
+    """Parse and validate each record of an import file, yielding the row or the reason it is invalid.
+
+    NDJSON records are lines; CSV files start with a header naming their columns, and their empty fields are
+    treated as missing.
+
+    Raises:
+        HTTPException: 422 if the CSV header lacks a required column.
+    """
+    if import_format == 'ndjson':
+        async for line in _ndjson_records(lines):
+            try:
+                yield RECORD_TOO_LONG if line is None else ProductImportRow.model_validate_json(line)
+            except ValidationError as exc:
+                yield _validation_detail(exc)
+        return
+
+    header: list[str] | None = None
+    async for values in read_csv_records(lines):
+        if isinstance(values, str):
+            yield values
+        elif header is None:
+            header = [name.strip() for name in values]
+            missing = [' or '.join(names) for names in IMPORT_REQUIRED_COLUMNS if not set(names) & set(header)]
+            if missing:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=f'CSV header lacks the columns: {", ".join(missing)}',
+                )
+        elif len(values) != len(header):
+            yield f'Expected {len(header)} fields, got {len(values)}'
+        else:
+            try:
+                yield ProductImportRow.model_validate(
+                    {name: value for name, value in zip(header, values, strict=True) if value != ''}
+                )
+            except ValidationError as exc:
+                yield _validation_detail(exc)
+
+
+class ProductImporter:
+    """Import of a file of products into the current user's products, in the session's transaction.
+
+    Rows are validated in batches of IMPORT_BATCH_SIZE: their catalog and category references are resolved with
+    one query per batch, and the valid rows are loaded into a temporary staging table with COPY. `merge` then
+    writes them all with a single INSERT ... ON CONFLICT, updating the products whose SKU already exists.
+    """
+
+    def __init__(self, session: AsyncSession, references: OwnedReferences, owner_id: int) -> None:
+        """Import into `owner_id`'s products through `session`, checking references with `references`."""
+        self.session = session
+        self.references = references
+        self.owner_id = owner_id
+        self.rows = 0
+        self.invalid = 0
+        self.errors: list[ProductImportError] = []
+        self._skus: set[str] = set()
+
+    def _reject(self, row_number: int, detail: str) -> None:
+        self.invalid += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append(ProductImportError(row=row_number, detail=detail))
+
+    def _reference(self, kind: Literal['catalog', 'category'], id_: int | None, name: str | None) -> int | str:
+        """Return the ID of a row's catalog or category, or the reason it cannot be used."""
+        if id_ is not None:
+            return id_
+        ids = [] if name is None else self.references.named(kind, name)
+        if not ids:
+            return f'{kind.capitalize()} {name!r} not found'
+        if len(ids) > 1:
+            return f'{kind.capitalize()} name {name!r} is ambiguous, use {kind}_id'
+        return ids[0]
+
+    async def _load(self, batch: list[tuple[int, ProductImportRow]]) -> None:
+        """Check the references of a batch of valid rows and stage the ones that may be written."""
+        await self.references.resolve_names(
+            (row.catalog for _, row in batch if row.catalog_id is None and row.catalog is not None),
+            (row.category for _, row in batch if row.category_id is None and row.category is not None),
+        )
+        await self.references.resolve(
+            (row.catalog_id for _, row in batch if row.catalog_id is not None),
+            (row.category_id for _, row in batch if row.category_id is not None),
+        )
+        staged: list[tuple[Any, ...]] = []
+        for row_number, row in batch:
+            catalog_id = self._reference('catalog', row.catalog_id, row.catalog)
+            category_id = self._reference('category', row.category_id, row.category)
+            detail: str | None
+            if isinstance(catalog_id, str) or isinstance(category_id, str):
+                detail = catalog_id if isinstance(catalog_id, str) else str(category_id)
+            else:
+                detail = self.references.problem(catalog_id, category_id)
+            if detail is None and row.sku is not None and row.sku in self._skus:
+                detail = 'Duplicate SKU in file'
+            if detail is not None:
+                self._reject(row_number, detail)
+                continue
+            if row.sku is not None:
+                self._skus.add(row.sku)
+            staged.append((row_number, row.name, row.description, row.price, row.sku, catalog_id, category_id))
+        await copy_rows(await self.session.connection(), 'product_import', ('row_number', *MERGE_COLUMNS), staged)
+
+    async def stage(self, rows: AsyncIterator[ProductImportRow | str]) -> None:
+        """Validate the parsed `rows` of the file and load the valid ones into the staging table."""
+        for statement in STAGING_DDL:
+            await self.session.execute(sa.text(statement))
+        batch: list[tuple[int, ProductImportRow]] = []
+        async for row in rows:
+            self.rows += 1
+            if isinstance(row, str):
+                self._reject(self.rows, row)
+            else:
+                batch.append((self.rows, row))
+            if len(batch) == IMPORT_BATCH_SIZE:
+                await self._load(batch)
+                batch = []
+                logger.info(
+                    'Importing products of user %d: %d rows read, %d invalid', self.owner_id, self.rows, self.invalid
+                )
+        if batch:
+            await self._load(batch)
+
+    async def merge(self) -> ProductImportResult:
+        """Write the staged rows to the products table and report the outcome of the import."""
+        insert = postgresql.insert(Product).from_select(
+            [*MERGE_COLUMNS, 'owner_id', 'created_at', 'updated_at'],
+            sa.select(
+                *(STAGING_TABLE.c[column] for column in MERGE_COLUMNS),
+                sa.literal(self.owner_id),
+                sa.func.now(),
+                sa.func.now(),
+            ).order_by(STAGING_TABLE.c.row_number),
+        )
+        merged = (
+            insert.on_conflict_do_update(
+                constraint='uq_products_owner_id_sku',
+                set_={column: insert.excluded[column] for column in UPSERT_COLUMNS},
+            )
+            .returning(sa.literal_column('xmax = 0', sa.Boolean).label('inserted'))
+            .cte('merged')
+        )
+        query = sa.select(
+            sa.func.count().filter(merged.c.inserted), sa.func.count().filter(sa.not_(merged.c.inserted))
+        )
+        created, updated = (await self.session.execute(query)).one()
+        logger.info(
+            'Imported products of user %d: %d rows read, %d created, %d updated, %d invalid',
+            self.owner_id,
+            self.rows,
+            created,
+            updated,
+            self.invalid,
+        )
+        return ProductImportResult(
+            rows=self.rows,
+            created=created,
+            updated=updated,
+            invalid=self.invalid,
+            errors=sorted(self.errors, key=lambda error: error.row),
+        )
@@ -0,0 +1,137 @@
+import hashlib
+import secrets
+from collections.abc import AsyncGenerator, Awaitable, Callable, Sequence
+
+from fastapi import HTTPException, Request, Response, status
+from pydantic import BaseModel
+
+from app.api.deps import T_CurrentUser, is_replayed
+from app.core.settings import settings
+from app.infra.cache import CacheBackend, T_Cache
+from app.infra.profiling import profile_serialization
+
+CACHE_CONTROL = 'private, no-cache'
+JSON_MEDIA_TYPE = 'application/json'
+
+
+def _version_cache_key(owner_id: int, resource: str) -> str:
+    return f'response_version:{resource}:{owner_id}'
+
+
+def _entry_cache_key(owner_id: int, resources: Sequence[str], versions: Sequence[bytes], request: Request) -> str:
+    query = '&'.join(sorted(f'{name}={value}' for name, value in request.query_params.multi_items()))
+    digest = hashlib.sha256(f'{request.url.path}?{query}'.encode()).hexdigest()
+    return f'response:{",".join(resources)}:{owner_id}:{b".".join(versions).decode()}:{digest}'
+
+
+def _etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    candidates = (candidate.strip().removeprefix('W/') for candidate in if_none_match.split(','))
+    return any(candidate in {'*', etag} for candidate in candidates)
+
+
+def _not_modified(etag: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag, 'Cache-Control': CACHE_CONTROL}
+    )
+
+
+async def _current_version(cache: CacheBackend, owner_id: int, resource: str) -> bytes:
+    key = _version_cache_key(owner_id, resource)
+    version = await cache.get(key)
+    if version is None:
+        version = secrets.token_hex(8).encode()
+        await cache.set(key, version, settings.RESPONSE_CACHE_VERSION_TTL_SECONDS)
+    return version
+
+
+async def bump_response_versions(cache: CacheBackend, owner_id: int, resources: Sequence[str]) -> None:
+    """Invalidate every cached response of an owner's resources by moving them to a new version.
+
+    Versions are random rather than incremented, so concurrent bumps from several workers can never collapse
+    into the same version.
+
+    Args:
+        cache: Cache backend holding the responses and their versions.
+        owner_id: ID of the user owning the resources.
+        resources: Names of the resources whose responses are invalidated.
+    """
+    for resource in resources:
+        await cache.set(
+            _version_cache_key(owner_id, resource),
+            secrets.token_hex(8).encode(),
+            settings.RESPONSE_CACHE_VERSION_TTL_SECONDS,
+        )
+
+
+class CachedResponse:
+    """Cache slot of a GET request, as resolved by the `cached_response` dependency."""
+
+    def __init__(self, cache: CacheBackend, key: str, if_none_match: str | None, hit: bytes | None) -> None:
+        """Wrap the cache slot `key` and what it currently holds (`hit`)."""
+        self.cache = cache
+        self.key = key
+        self.if_none_match = if_none_match
+        self.response: Response | None = None
+        if hit is not None:
+            etag, _, body = hit.partition(b'\n')
+            self.response = self._response(body, etag.decode())
+
+    @staticmethod
+    def _response(body: bytes, etag: str) -> Response:
+        return Response(body, media_type=JSON_MEDIA_TYPE, headers={'ETag': etag, 'Cache-Control': CACHE_CONTROL})
+
+    async def store(self, content: BaseModel | bytes) -> Response:
+        """Cache `content` (a model, or JSON it was already encoded to), and answer with it or with 304."""
+        if isinstance(content, bytes):
+            body = content
+        else:
+            with profile_serialization():
+                body = content.model_dump_json().encode()
+        etag = _etag(body)
+        await self.cache.set(self.key, etag.encode() + b'\n' + body, settings.RESPONSE_CACHE_TTL_SECONDS)
+        if _etag_matches(self.if_none_match, etag):
+            raise _not_modified(etag)
+        return self._response(body, etag)
+
+
+def cached_response(*resources: str) -> Callable[[Request, T_CurrentUser, T_Cache], Awaitable[CachedResponse]]:
+    """Build a dependency looking up the cached response of a GET request on the user's resources.
+
+    Responses are keyed by owner, path, query parameters and the current versions of the resources, and carry a
+    strong ETag. Declare the dependency before the session so that `If-None-Match` hits are answered with 304
+    before a database connection is taken.
+
+    Args:
+        resources: Names of the resources the response is built from, as passed to `invalidates` by the
+            handlers that write them.
+    """
+
+    async def dependency(request: Request, current_user: T_CurrentUser, cache: T_Cache) -> CachedResponse:
+        versions = [await _current_version(cache, current_user.id, resource) for resource in resources]
+        key = _entry_cache_key(current_user.id, resources, versions, request)
+        cached = CachedResponse(cache, key, request.headers.get('If-None-Match'), await cache.get(key))
+        if cached.response is not None and _etag_matches(cached.if_none_match, cached.response.headers['ETag']):
+            raise _not_modified(cached.response.headers['ETag'])
+        return cached
+
+    return dependency
+
+
+def invalidates(*resources: str) -> Callable[[Request, T_CurrentUser, T_Cache], AsyncGenerator[None, None]]:
+    """Build a dependency invalidating the user's cached responses of `resources` once the handler succeeded.
+
+    Requests answered with a replayed response wrote nothing, so they keep the cached responses.
+    """
+
+    async def dependency(request: Request, current_user: T_CurrentUser, cache: T_Cache) -> AsyncGenerator[None, None]:
+        yield
+        if not is_replayed(request):
+            await bump_response_versions(cache, current_user.id, resources)
+
+    return dependency
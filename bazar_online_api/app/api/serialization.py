@@ -0,0 +1,81 @@
+from collections.abc import Callable, Sequence
+from typing import Annotated, Any
+
+import sqlalchemy as sa
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel
+from pydantic_core import to_json
+from sqlalchemy.orm import QueryableAttribute
+
+from app.api.pagination import SortKey
+from app.core.models import Base, Catalog, CatalogStats, Category, CategoryStats
+from app.infra.profiling import profile_serialization
+
+type FieldNames = tuple[str, ...]
+
+
+def sparse_fields(schema: type[BaseModel]) -> Callable[[str | None], FieldNames]:
+    """Build a dependency parsing the `?fields=` sparse fieldset of a listing of `schema` items.
+
+    The dependency returns the requested field names in schema order, or every field of `schema` when the
+    parameter is omitted.
+
+    Args:
+        schema: Public schema of the listed items.
+    """
+    names = tuple(schema.model_fields)
+    description = f'Comma-separated subset of the item fields to return, among: {", ".join(names)}.'
+
+    def dependency(fields: Annotated[str | None, Query(description=description)] = None) -> FieldNames:
+        if fields is None:
+            return names
+        requested = {field.strip() for field in fields.split(',')} - {''}
+        unknown = requested - set(names)
+        if unknown or not requested:
+            detail = f'Unknown fields: {", ".join(sorted(unknown))}' if unknown else 'No fields requested'
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+        return tuple(name for name in names if name in requested)
+
+    return dependency
+
+
+def select_public(model: type[Base], fields: FieldNames, *keys: SortKey) -> sa.Select[Any]:
+    """Select the columns of `model` named by `fields`, in order, followed by the sort `keys`.
+
+    Rows of this query can be encoded with `encode_page` without building an ORM instance or a pydantic model
+    per row. The sort keys are selected even when they are not returned, so that `split_page` can build cursors.
+    """
+    columns = [getattr(model, field) for field in fields]
+    return sa.select(*columns, *(key for key in keys if key.key not in fields))
+
+
+def select_stats(
+    parent: type[Catalog | Category], stats: type[CatalogStats | CategoryStats], key: QueryableAttribute[int]
+) -> sa.Select[Any]:
+    """Select the `ProductStats` fields of `stats`, keyed by `key`, joined to the `parent` rows they summarize.
+
+    The outer join reports a parent none of whose products was ever written as empty. Callers filter the parent
+    rows (ownership, ID) on the returned query, so reading one parent's stats is a pair of primary key lookups.
+    """
+    return sa.select(
+        sa.func.coalesce(stats.product_count, 0).label('product_count'),
+        stats.price_min,
+        stats.price_max,
+        sa.func.round(stats.price_total / sa.func.nullif(stats.product_count, 0), 2).label('price_avg'),
+        sa.func.coalesce(stats.price_total, 0).label('inventory_value'),
+    ).outerjoin_from(parent, stats, key == parent.id)
+
+
+def page_content(rows: Sequence[sa.Row[Any]], fields: FieldNames, next_cursor: str | None) -> dict[str, Any]:
+    """Arrange rows selected with `select_public` as the content of a `Page` whose items hold `fields`."""
+    return {'items': [dict(zip(fields, row, strict=False)) for row in rows], 'next_cursor': next_cursor}
+
+
+def encode_page(rows: Sequence[sa.Row[Any]], fields: FieldNames, next_cursor: str | None) -> bytes:
+    """Encode rows selected with `select_public` as a JSON `Page` whose items hold `fields`.
+
+    With every field of a schema selected, the output is byte-for-byte what the `Page` model would produce, since
+    pydantic-core serializes the column values with the same rules as the model fields.
+    """
+    with profile_serialization():
+        return to_json(page_content(rows, fields, next_cursor))
@@ -0,0 +1,48 @@
+import secrets
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from app.core.schemas import SlowQuery
+from app.core.settings import settings
+from app.infra.slow_queries import SlowQueryLog, slow_query_log
+
+
+def require_admin_key(x_admin_key: Annotated[str | None, Header()] = None) -> None:
+    """Reject requests whose `X-Admin-Key` header does not match ADMIN_API_KEY.
+
+    The admin endpoints are disabled (404) while ADMIN_API_KEY is not set.
+    """
+    if settings.ADMIN_API_KEY is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Not Found')
+    if x_admin_key is None or not secrets.compare_digest(x_admin_key, settings.ADMIN_API_KEY):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Invalid admin key')
+
+
+def get_slow_query_log() -> SlowQueryLog:
+    """Returns the process-wide slow query log."""
+    return slow_query_log
+
+
+T_SlowQueryLog = Annotated[SlowQueryLog, Depends(get_slow_query_log)]
+
+router = APIRouter(dependencies=[Depends(require_admin_key)])
+
+
+@router.get('/slow-queries', status_code=HTTPStatus.OK)
+async def list_slow_queries(log: T_SlowQueryLog) -> list[SlowQuery]:
+    """List the slow statements recorded by this process, newest first.
+
+    Statements are normalized and their bind parameters reduced to types. A SLOW_QUERY_EXPLAIN_RATE fraction of
+    the SELECT, WITH, INSERT, UPDATE and DELETE statements get a plan from plain EXPLAIN, with estimated rows and
+    costs; with SLOW_QUERY_EXPLAIN_ANALYZE on, sampled SELECT statements are run again under EXPLAIN (ANALYZE,
+    BUFFERS) for measured rows and timings.
+    """
+    return log.entries()
+
+
+@router.delete('/slow-queries', status_code=HTTPStatus.NO_CONTENT)
+async def clear_slow_queries(log: T_SlowQueryLog) -> None:
+    """Forget the slow statements recorded by this process, e.g. to watch a deployment from a clean slate."""
+    log.clear()
@@ -4,11 +4,13 @@ from typing import Annotated
 import sqlalchemy as sa
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.dialects import postgresql
 
-from app.api.deps import T_CurrentUser
+from app.api.deps import T_CurrentUser, cache_token_version, invalidate_principal
 from app.core.models import User
 from app.core.schemas import Token, UserCreate
-from app.core.security import create_access_token, verify_password
+from app.core.security import create_access_token, password_hasher
+from app.infra.cache import T_Cache
 from app.infra.database import T_DbSession
 
 router = APIRouter()
@@ -22,36 +24,73 @@ async def login(form_data: T_OAuth2Form, session: T_DbSession) -> Token:
     user = await session.scalar(
         sa.select(User).where(sa.or_(User.email == form_data.username, User.username == form_data.username))
     )
-    if not user or not verify_password(form_data.password, str(user.hashed_password)):
+    if not user or not await password_hasher.verify(form_data.password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Incorrect email or password.')
 
-    return Token(access_token=create_access_token(email=str(user.email)))
+    return Token(
+        access_token=create_access_token(
+            user_id=user.id, email=user.email, username=user.username, token_version=user.token_version
+        )
+    )
 
 
 @router.post('/refresh-token', summary='Update access token', status_code=HTTPStatus.OK)
 async def refresh_access_token(user: T_CurrentUser) -> Token:
     """Refresh access token."""
-    return Token(access_token=create_access_token(email=str(user.email)))
+    return Token(
+        access_token=create_access_token(
+            user_id=user.id, email=user.email, username=user.username, token_version=user.token_version
+        )
+    )
+
+
+@router.post('/revoke-tokens', summary='Revoke every access token of the user', status_code=HTTPStatus.OK)
+async def revoke_tokens(user: T_CurrentUser, session: T_DbSession, cache: T_Cache) -> Token:
+    """Invalidate all access tokens issued so far to the current user and return a fresh one."""
+    query = (
+        sa.update(User)
+        .where(User.id == user.id)
+        .values(token_version=User.token_version + 1)
+        .returning(User.token_version)
+    )
+    token_version = await session.scalar(query)
+    if token_version is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid authentication credentials')
+    await session.commit()
+    await cache_token_version(cache, user.id, token_version)
+    await invalidate_principal(cache, user.email)
+
+    return Token(
+        access_token=create_access_token(
+            user_id=user.id, email=user.email, username=user.username, token_version=token_version
+        )
+    )
 
 
 @router.post('/register', summary='Register a new user', status_code=HTTPStatus.CREATED)
 async def register(user_data: UserCreate, session: T_DbSession) -> Token:
     """Register a new user and return a JWT token.
 
-    The user details are taken from the request body.
+    The user details are taken from the request body. A clash on the unique e-mail or username is detected by
+    the INSERT itself, so registering is a single statement.
     """
-    existing_user = await session.scalar(
-        sa.select(User).where(sa.or_(User.email == user_data.username, User.username == user_data.username))
+    hashed_password = await password_hasher.hash(user_data.password)
+    query = (
+        postgresql.insert(User)
+        .values(email=user_data.email, username=user_data.username, hashed_password=hashed_password)
+        .on_conflict_do_nothing()
+        .returning(User.id, User.email, User.username, User.token_version)
     )
-    if existing_user:
+    new_user = (await session.execute(query)).first()
+    if new_user is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='User already exists',
         )
-
-    new_user = User(email=user_data.email, username=user_data.username, hashed_password=user_data.password)
-    session.add(new_user)
     await session.commit()
-    await session.refresh(new_user)
 
-    return Token(access_token=create_access_token(email=str(new_user.email)))
+    return Token(
+        access_token=create_access_token(
+            user_id=new_user.id, email=new_user.email, username=new_user.username, token_version=new_user.token_version
+        )
+    )
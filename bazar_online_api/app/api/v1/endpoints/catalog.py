@@ -1,84 +1,195 @@
 from http import HTTPStatus
+from typing import Annotated, Any, Literal
 
 import sqlalchemy as sa
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from pydantic_core import to_json
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import T_CurrentUser
-from app.core.models import Catalog
-from app.core.schemas import CatalogPublic, CatalogPublicList, CatalogSchema
-from app.infra.database import T_DbSession
+from app.api.deps import T_CurrentUser, T_ReadSession, T_WriteSession
+from app.api.idempotency import T_IdempotentRequest
+from app.api.pagination import PageParams, T_PageParams, apply_keyset, split_page
+from app.api.response_cache import CachedResponse, cached_response, invalidates
+from app.api.serialization import FieldNames, encode_page, page_content, select_public, select_stats, sparse_fields
+from app.core.models import Catalog, CatalogStats, Product
+from app.core.schemas import CatalogPublic, CatalogSchema, CatalogWithProducts, Page, ProductPublic, ProductStats
 
 router = APIRouter()
 
+T_CachedCatalogs = Annotated[CachedResponse, Depends(cached_response('catalogs'))]
+T_CachedCatalogProducts = Annotated[CachedResponse, Depends(cached_response('catalogs', 'products'))]
+T_CatalogFields = Annotated[FieldNames, Depends(sparse_fields(CatalogPublic))]
+T_ProductFields = Annotated[FieldNames, Depends(sparse_fields(ProductPublic))]
+T_CatalogInclude = Annotated[
+    Literal['products'] | None, Query(description='Embed the first page of the catalog products.')
+]
 
-@router.get('/', status_code=HTTPStatus.OK)
-async def list_catalogs(session: T_DbSession, current_user: T_CurrentUser) -> list[CatalogPublic]:
-    """List all catalogs owned by the current user."""
-    query = sa.select(Catalog).where(Catalog.owner_id == current_user.id)
-    result = await session.scalars(query)
-    catalogs = list(result.all())
-    return CatalogPublicList.validate_python(catalogs)
+CATALOG_FIELDS = tuple(CatalogPublic.model_fields)
+PRODUCT_FIELDS = tuple(ProductPublic.model_fields)
 
 
-@router.get('/{catalog_id}', status_code=HTTPStatus.OK)
-async def get_catalog(catalog_id: int, session: T_DbSession, current_user: T_CurrentUser) -> CatalogPublic:
-    """Retrieve a specific catalog by its ID if it belongs to the current user."""
-    query = sa.select(Catalog).where(Catalog.id == catalog_id, Catalog.owner_id == current_user.id)
-    catalog = await session.scalar(query)
+@router.get('/', status_code=HTTPStatus.OK, response_model=Page[CatalogPublic])
+async def list_catalogs(
+    page: T_PageParams,
+    fields: T_CatalogFields,
+    cached: T_CachedCatalogs,
+    session: T_ReadSession,
+    current_user: T_CurrentUser,
+) -> Response:
+    """List the catalogs owned by the current user, one page at a time."""
+    if cached.response is not None:
+        return cached.response
+    keys = (Catalog.created_at, Catalog.id)
+    query = apply_keyset(select_public(Catalog, fields, *keys).where(Catalog.owner_id == current_user.id), keys, page)
+    result = await session.execute(query)
+    rows, next_cursor = split_page(result.all(), keys, page)
+    return await cached.store(encode_page(rows, fields, next_cursor))
+
+
+async def _products_page(
+    session: AsyncSession, owner_id: int, catalog_id: int, page: PageParams, fields: FieldNames
+) -> tuple[list[sa.Row[Any]], str | None]:
+    keys = (Product.created_at, Product.id)
+    query = select_public(Product, fields, *keys).where(Product.owner_id == owner_id, Product.catalog_id == catalog_id)
+    result = await session.execute(apply_keyset(query, keys, page))
+    return split_page(result.all(), keys, page)
+
+
+def _not_found() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Catalog not found')
+
+
+@router.get('/{catalog_id}', status_code=HTTPStatus.OK, response_model=CatalogWithProducts)
+async def get_catalog(
+    catalog_id: int,
+    cached: T_CachedCatalogProducts,
+    session: T_ReadSession,
+    current_user: T_CurrentUser,
+    include: T_CatalogInclude = None,
+) -> Response:
+    """Retrieve a specific catalog by its ID if it belongs to the current user.
+
+    With `include=products`, the first page of the catalog's products is embedded as well, read with a second
+    query; the following pages are served by `GET /catalogs/{catalog_id}/products`.
+    """
+    if cached.response is not None:
+        return cached.response
+    query = select_public(Catalog, CATALOG_FIELDS).where(Catalog.id == catalog_id, Catalog.owner_id == current_user.id)
+    catalog = (await session.execute(query)).first()
     if not catalog:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Catalog not found')
-    return CatalogPublic.model_validate(catalog)
+        raise _not_found()
+    content = dict(zip(CATALOG_FIELDS, catalog, strict=True))
+    if include == 'products':
+        rows, next_cursor = await _products_page(session, current_user.id, catalog_id, PageParams(), PRODUCT_FIELDS)
+        content['products'] = page_content(rows, PRODUCT_FIELDS, next_cursor)
+    return await cached.store(to_json(content))
+
+
+@router.get('/{catalog_id}/products', status_code=HTTPStatus.OK, response_model=Page[ProductPublic])
+async def list_catalog_products(  # noqa: PLR0913, PLR0917
+    catalog_id: int,
+    page: T_PageParams,
+    fields: T_ProductFields,
+    cached: T_CachedCatalogProducts,
+    session: T_ReadSession,
+    current_user: T_CurrentUser,
+) -> Response:
+    """List the products of a catalog owned by the current user, one page at a time.
+
+    The catalog itself is only looked up when its first page comes back empty, to tell an empty catalog from a
+    missing one.
+    """
+    if cached.response is not None:
+        return cached.response
+    rows, next_cursor = await _products_page(session, current_user.id, catalog_id, page, fields)
+    if not rows and page.cursor is None:
+        query = sa.select(Catalog.id).where(Catalog.id == catalog_id, Catalog.owner_id == current_user.id)
+        if await session.scalar(query) is None:
+            raise _not_found()
+    return await cached.store(encode_page(rows, fields, next_cursor))
+
 
+@router.get('/{catalog_id}/stats', status_code=HTTPStatus.OK, response_model=ProductStats)
+async def get_catalog_stats(
+    catalog_id: int, cached: T_CachedCatalogProducts, session: T_ReadSession, current_user: T_CurrentUser
+) -> Response:
+    """Retrieve the product count, prices and inventory value of a catalog owned by the current user.
 
-@router.post('/', status_code=HTTPStatus.CREATED)
+    The figures are read from the catalog's summary row, which triggers on the products table keep up to date,
+    instead of being aggregated over its products.
+    """
+    if cached.response is not None:
+        return cached.response
+    query = select_stats(Catalog, CatalogStats, CatalogStats.catalog_id).where(
+        Catalog.id == catalog_id, Catalog.owner_id == current_user.id
+    )
+    stats = (await session.execute(query)).first()
+    if not stats:
+        raise _not_found()
+    return await cached.store(ProductStats.model_validate(stats._asdict()))
+
+
+@router.post(
+    '/',
+    status_code=HTTPStatus.CREATED,
+    response_model=CatalogPublic,
+    dependencies=[Depends(invalidates('catalogs'))],
+)
 async def create_catalog(
     catalog_in: CatalogSchema,
-    session: T_DbSession,
+    idempotency: T_IdempotentRequest,
+    session: T_WriteSession,
     current_user: T_CurrentUser,
-) -> CatalogPublic:
-    """Create a new catalog with the provided data for the current user."""
-    new_catalog = Catalog(
-        name=catalog_in.name,
-        description=catalog_in.description,
-        owner_id=current_user.id,
-    )
-    session.add(new_catalog)
+) -> Response:
+    """Create a new catalog with the provided data for the current user.
+
+    Retries carrying the same `Idempotency-Key` header get the first response back instead of a new catalog.
+    """
+    if idempotency.response is not None:
+        return idempotency.response
+    query = sa.insert(Catalog).values(**catalog_in.model_dump(), owner_id=current_user.id).returning(Catalog)
+    new_catalog = await session.scalar(query)
+    response = await idempotency.store(CatalogPublic.model_validate(new_catalog), HTTPStatus.CREATED)
     await session.commit()
-    await session.refresh(new_catalog)
-    return CatalogPublic.model_validate(new_catalog)
+    return response
 
 
-@router.put('/{catalog_id}', status_code=HTTPStatus.OK)
+@router.put('/{catalog_id}', status_code=HTTPStatus.OK, dependencies=[Depends(invalidates('catalogs'))])
 async def update_catalog(
     catalog_id: int,
     catalog_in: CatalogSchema,
-    session: T_DbSession,
+    session: T_WriteSession,
     current_user: T_CurrentUser,
 ) -> CatalogPublic:
     """Update an existing catalog for the current user."""
-    query = sa.select(Catalog).where(Catalog.id == catalog_id, Catalog.owner_id == current_user.id)
+    query = (
+        sa.update(Catalog)
+        .where(Catalog.id == catalog_id, Catalog.owner_id == current_user.id)
+        .values(**catalog_in.model_dump(exclude_none=True))
+        .returning(Catalog)
+    )
     catalog = await session.scalar(query)
     if not catalog:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Catalog not found')
-    if catalog_in.name is not None:
-        catalog.name = catalog_in.name
-    if catalog_in.description is not None:
-        catalog.description = catalog_in.description
     await session.commit()
-    await session.refresh(catalog)
     return CatalogPublic.model_validate(catalog)
 
 
-@router.delete('/{catalog_id}', status_code=HTTPStatus.NO_CONTENT)
+@router.delete(
+    '/{catalog_id}', status_code=HTTPStatus.NO_CONTENT, dependencies=[Depends(invalidates('catalogs', 'products'))]
+)
 async def delete_catalog(
     catalog_id: int,
-    session: T_DbSession,
+    session: T_WriteSession,
     current_user: T_CurrentUser,
 ) -> None:
-    """Delete a catalog by its ID if it belongs to the current user."""
-    query = sa.select(Catalog).where(Catalog.id == catalog_id, Catalog.owner_id == current_user.id)
-    catalog = await session.scalar(query)
-    if not catalog:
+    """Delete a catalog by its ID if it belongs to the current user.
+
+    Its products are removed by the database through ON DELETE CASCADE, without loading them.
+    """
+    query = (
+        sa.delete(Catalog).where(Catalog.id == catalog_id, Catalog.owner_id == current_user.id).returning(Catalog.id)
+    )
+    if await session.scalar(query) is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Catalog not found')
-    await session.delete(catalog)
     await session.commit()
@@ -1,81 +1,141 @@
 from http import HTTPStatus
+from typing import Annotated
 
 import sqlalchemy as sa
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 
-from app.api.deps import T_CurrentUser
-from app.core.models import Category
-from app.core.schemas import CategoryPublic, CategoryPublicList, CategorySchema
-from app.infra.database import T_DbSession
+from app.api.deps import T_CurrentUser, T_ReadSession, T_WriteSession
+from app.api.idempotency import T_IdempotentRequest
+from app.api.pagination import T_PageParams, apply_keyset, split_page
+from app.api.response_cache import CachedResponse, cached_response, invalidates
+from app.api.serialization import FieldNames, encode_page, select_public, select_stats, sparse_fields
+from app.core.models import Category, CategoryStats
+from app.core.schemas import CategoryPublic, CategorySchema, Page, ProductStats
 
 router = APIRouter()
 
+T_CachedCategories = Annotated[CachedResponse, Depends(cached_response('categories'))]
+T_CachedCategoryProducts = Annotated[CachedResponse, Depends(cached_response('categories', 'products'))]
+T_CategoryFields = Annotated[FieldNames, Depends(sparse_fields(CategoryPublic))]
 
-@router.get('/', status_code=HTTPStatus.OK)
-async def list_categories(session: T_DbSession, current_user: T_CurrentUser) -> list[CategoryPublic]:
-    """List all categories owned by the current user."""
-    query = sa.select(Category).where(Category.owner_id == current_user.id)
-    result = await session.scalars(query)
-    categories = list(result.all())
-    return CategoryPublicList.validate_python(categories)
+
+@router.get('/', status_code=HTTPStatus.OK, response_model=Page[CategoryPublic])
+async def list_categories(
+    page: T_PageParams,
+    fields: T_CategoryFields,
+    cached: T_CachedCategories,
+    session: T_ReadSession,
+    current_user: T_CurrentUser,
+) -> Response:
+    """List the categories owned by the current user, one page at a time."""
+    if cached.response is not None:
+        return cached.response
+    keys = (Category.created_at, Category.id)
+    query = apply_keyset(
+        select_public(Category, fields, *keys).where(Category.owner_id == current_user.id), keys, page
+    )
+    result = await session.execute(query)
+    rows, next_cursor = split_page(result.all(), keys, page)
+    return await cached.store(encode_page(rows, fields, next_cursor))
 
 
-@router.get('/{category_id}', status_code=HTTPStatus.OK)
-async def get_category(category_id: int, session: T_DbSession, current_user: T_CurrentUser) -> CategoryPublic:
+@router.get('/{category_id}', status_code=HTTPStatus.OK, response_model=CategoryPublic)
+async def get_category(
+    category_id: int, cached: T_CachedCategories, session: T_ReadSession, current_user: T_CurrentUser
+) -> Response:
     """Retrieve a specific category by its ID if it belongs to the current user."""
+    if cached.response is not None:
+        return cached.response
     query = sa.select(Category).where(Category.id == category_id, Category.owner_id == current_user.id)
     category = await session.scalar(query)
     if not category:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Category not found')
-    return CategoryPublic.model_validate(category)
+    return await cached.store(CategoryPublic.model_validate(category))
+
 
+@router.get('/{category_id}/stats', status_code=HTTPStatus.OK, response_model=ProductStats)
+async def get_category_stats(
+    category_id: int, cached: T_CachedCategoryProducts, session: T_ReadSession, current_user: T_CurrentUser
+) -> Response:
+    """Retrieve the product count, prices and inventory value of a category owned by the current user.
 
-@router.post('/', status_code=HTTPStatus.CREATED)
+    The figures are read from the category's summary row, which triggers on the products table keep up to date,
+    instead of being aggregated over its products.
+    """
+    if cached.response is not None:
+        return cached.response
+    query = select_stats(Category, CategoryStats, CategoryStats.category_id).where(
+        Category.id == category_id, Category.owner_id == current_user.id
+    )
+    stats = (await session.execute(query)).first()
+    if not stats:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Category not found')
+    return await cached.store(ProductStats.model_validate(stats._asdict()))
+
+
+@router.post(
+    '/',
+    status_code=HTTPStatus.CREATED,
+    response_model=CategoryPublic,
+    dependencies=[Depends(invalidates('categories'))],
+)
 async def create_category(
     category_in: CategorySchema,
-    session: T_DbSession,
+    idempotency: T_IdempotentRequest,
+    session: T_WriteSession,
     current_user: T_CurrentUser,
-) -> CategoryPublic:
-    """Create a new category with the provided data for the current user."""
-    new_category = Category(
-        name=category_in.name,
-        owner_id=current_user.id,
-    )
-    session.add(new_category)
+) -> Response:
+    """Create a new category with the provided data for the current user.
+
+    Retries carrying the same `Idempotency-Key` header get the first response back instead of a new category.
+    """
+    if idempotency.response is not None:
+        return idempotency.response
+    query = sa.insert(Category).values(**category_in.model_dump(), owner_id=current_user.id).returning(Category)
+    new_category = await session.scalar(query)
+    response = await idempotency.store(CategoryPublic.model_validate(new_category), HTTPStatus.CREATED)
     await session.commit()
-    await session.refresh(new_category)
-    return CategoryPublic.model_validate(new_category)
+    return response
 
 
-@router.put('/{category_id}', status_code=HTTPStatus.OK)
+@router.put('/{category_id}', status_code=HTTPStatus.OK, dependencies=[Depends(invalidates('categories'))])
 async def update_category(
     category_id: int,
     category_in: CategorySchema,
-    session: T_DbSession,
+    session: T_WriteSession,
     current_user: T_CurrentUser,
 ) -> CategoryPublic:
     """Update an existing category's name for the current user."""
-    query = sa.select(Category).where(Category.id == category_id, Category.owner_id == current_user.id)
+    query = (
+        sa.update(Category)
+        .where(Category.id == category_id, Category.owner_id == current_user.id)
+        .values(**category_in.model_dump(exclude_none=True))
+        .returning(Category)
+    )
     category = await session.scalar(query)
     if not category:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Category not found')
-    if category_in.name is not None:
-        category.name = category_in.name
     await session.commit()
-    await session.refresh(category)
     return CategoryPublic.model_validate(category)
 
 
-@router.delete('/{category_id}', status_code=HTTPStatus.NO_CONTENT)
+@router.delete(
+    '/{category_id}', status_code=HTTPStatus.NO_CONTENT, dependencies=[Depends(invalidates('categories', 'products'))]
+)
 async def delete_category(
     category_id: int,
-    session: T_DbSession,
+    session: T_WriteSession,
     current_user: T_CurrentUser,
 ) -> None:
-    """Delete a category by its ID if it belongs to the current user."""
-    query = sa.select(Category).where(Category.id == category_id, Category.owner_id == current_user.id)
-    category = await session.scalar(query)
-    if not category:
+    """Delete a category by its ID if it belongs to the current user.
+
+    Its products are removed by the database through ON DELETE CASCADE, without loading them.
+    """
+    query = (
+        sa.delete(Category)
+        .where(Category.id == category_id, Category.owner_id == current_user.id)
+        .returning(Category.id)
+    )
+    if await session.scalar(query) is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Category not found')
-    await session.delete(category)
     await session.commit()
@@ -1,89 +1,451 @@
+import csv
+import io
+from collections.abc import AsyncGenerator, Iterable, Sequence
+from datetime import datetime
+from decimal import Decimal
 from http import HTTPStatus
+from typing import Annotated, Any, Literal
 
 import sqlalchemy as sa
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import Field
+from pydantic_core import to_json
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.api.deps import T_CurrentUser
-from app.core.models import Product
-from app.core.schemas import ProductPublic, ProductPublicList, ProductSchema
-from app.infra.database import T_DbSession
+from app.api.deps import T_CurrentUser, T_ReadSession, T_WriteSession
+from app.api.idempotency import T_IdempotentRequest
+from app.api.ownership import T_OwnedReferences
+from app.api.pagination import PageParams, SortKey, apply_keyset, split_page
+from app.api.product_import import UPSERT_COLUMNS, ProductImporter, parse_rows, read_lines
+from app.api.response_cache import CachedResponse, cached_response, invalidates
+from app.api.serialization import FieldNames, encode_page, select_public, sparse_fields
+from app.core.models import SEARCH_CONFIG, Product
+from app.core.schemas import (
+    Page,
+    ProductBulkCreate,
+    ProductBulkDelete,
+    ProductBulkOperation,
+    ProductBulkRequest,
+    ProductBulkResult,
+    ProductBulkUpsert,
+    ProductImportResult,
+    ProductPublic,
+    ProductSchema,
+)
+from app.infra.database import T_SessionFactory
 
 router = APIRouter()
 
+T_CachedProducts = Annotated[CachedResponse, Depends(cached_response('products'))]
+T_ProductFields = Annotated[FieldNames, Depends(sparse_fields(ProductPublic))]
 
-@router.get('/', status_code=HTTPStatus.OK)
-async def list_products(session: T_DbSession, current_user: T_CurrentUser) -> list[ProductPublic]:
-    """List all products owned by the current user."""
-    query = sa.select(Product).where(Product.owner_id == current_user.id)
-    result = await session.scalars(query)
-    products = list(result.all())
-    return ProductPublicList.validate_python(products)
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+EXPORT_COLUMNS = tuple(ProductPublic.model_fields)
 
 
-@router.get('/{product_id}', status_code=HTTPStatus.OK)
-async def get_product(product_id: int, session: T_DbSession, current_user: T_CurrentUser) -> ProductPublic:
+PRODUCT_SORT_KEYS = {'created_at': Product.created_at, 'price': Product.price, 'name': Product.name}
+
+
+class ProductListParams(PageParams):
+    """Product listing filters, sort order and pagination parameters."""
+
+    catalog_id: int | None = Field(None, description='Only return products of this catalog.')
+    category_id: int | None = Field(None, description='Only return products of this category.')
+    price_min: Decimal | None = Field(None, ge=0, description='Only return products costing at least this much.')
+    price_max: Decimal | None = Field(None, ge=0, description='Only return products costing at most this much.')
+    created_after: datetime | None = Field(None, description='Only return products created after this instant.')
+    sort: Literal['created_at', '-created_at', 'price', '-price', 'name', '-name'] = Field(
+        'created_at', description='Sort field, prefixed with `-` for descending order.'
+    )
+
+
+class ProductSearchParams(PageParams):
+    """Product search query parameters."""
+
+    q: str = Field(min_length=1, max_length=200, description='Words to look for in the name and description.')
+
+
+T_ProductListParams = Annotated[ProductListParams, Query()]
+T_ProductSearchParams = Annotated[ProductSearchParams, Query()]
+T_ExportFormat = Annotated[Literal['ndjson', 'csv'], Query(alias='format', description='Serialization format.')]
+T_ImportFormat = Annotated[Literal['ndjson', 'csv'], Query(alias='format', description='Format of the uploaded file.')]
+
+
+def _encode_ndjson(rows: Sequence[sa.Row[Any]]) -> bytes:
+    return b''.join(to_json(dict(zip(EXPORT_COLUMNS, row, strict=True))) + b'\n' for row in rows)
+
+
+def _encode_csv(rows: Sequence[sa.Row[Any]]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def _bulk_create(
+    session: AsyncSession, owner_id: int, creates: list[tuple[int, ProductBulkCreate]]
+) -> list[ProductBulkResult]:
+    """Insert all created products with one multi-row INSERT ... RETURNING."""
+    rows = [{**op.data.model_dump(), 'owner_id': owner_id} for _, op in creates]
+    product_ids = await session.scalars(sa.insert(Product).returning(Product.id, sort_by_parameter_order=True), rows)
+    return [
+        ProductBulkResult(index=index, op='create', status='created', id=product_id)
+        for (index, _), product_id in zip(creates, product_ids, strict=True)
+    ]
+
+
+async def _bulk_upsert(
+    session: AsyncSession, owner_id: int, upserts: dict[str, tuple[int, ProductBulkUpsert]]
+) -> list[ProductBulkResult]:
+    """Insert or update products by SKU with one multi-row INSERT ... ON CONFLICT ... RETURNING."""
+    rows = [{**op.data.model_dump(), 'sku': sku, 'owner_id': owner_id} for sku, (_, op) in upserts.items()]
+    insert = postgresql.insert(Product)
+    upsert = insert.on_conflict_do_update(
+        constraint='uq_products_owner_id_sku',
+        set_={column: insert.excluded[column] for column in UPSERT_COLUMNS},
+    ).returning(Product.id, Product.sku, sa.literal_column('xmax = 0', sa.Boolean))
+    results = []
+    for product_id, sku, inserted in await session.execute(upsert, rows):
+        index, _ = upserts[sku]
+        status = 'created' if inserted else 'updated'
+        results.append(ProductBulkResult(index=index, op='upsert', status=status, id=product_id))
+    return results
+
+
+async def _bulk_delete(
+    session: AsyncSession, owner_id: int, deletes: list[tuple[int, ProductBulkDelete]]
+) -> list[ProductBulkResult]:
+    """Delete the owner's products with a single DELETE ... RETURNING."""
+    query = (
+        sa.delete(Product)
+        .where(Product.owner_id == owner_id, Product.id.in_({op.id for _, op in deletes}))
+        .returning(Product.id)
+    )
+    deleted_ids = set(await session.scalars(query))
+    return [
+        ProductBulkResult(
+            index=index, op='delete', status='deleted' if op.id in deleted_ids else 'not_found', id=op.id
+        )
+        for index, op in deletes
+    ]
+
+
+async def _plan_deletes(
+    session: AsyncSession, owner_id: int, operations: Sequence[ProductBulkOperation], upserted_skus: Iterable[str]
+) -> tuple[list[tuple[int, ProductBulkDelete]], list[ProductBulkResult]]:
+    """Split the delete operations of a batch into those to run and those touching a product twice.
+
+    Deletes repeating an ID, or naming a product whose SKU is also upserted (found with one query, only when the
+    batch holds both kinds), are returned as invalid results.
+    """
+    deletes: dict[int, tuple[int, ProductBulkDelete]] = {}
+    invalid: list[ProductBulkResult] = []
+    for index, op in enumerate(operations):
+        if not isinstance(op, ProductBulkDelete):
+            continue
+        if op.id in deletes:
+            invalid.append(
+                ProductBulkResult(index=index, op='delete', status='invalid', detail='Duplicate ID in batch')
+            )
+        else:
+            deletes[op.id] = (index, op)
+    skus = set(upserted_skus)
+    if deletes and skus:
+        query = sa.select(Product.id).where(
+            Product.owner_id == owner_id, Product.id.in_(deletes.keys()), Product.sku.in_(skus)
+        )
+        for product_id in await session.scalars(query):
+            index, _ = deletes.pop(product_id)
+            detail = 'Product is also upserted in batch'
+            invalid.append(ProductBulkResult(index=index, op='delete', status='invalid', detail=detail))
+    return list(deletes.values()), invalid
+
+
+async def _stream_products(
+    session_factory: async_sessionmaker[AsyncSession],
+    owner_id: int,
+    export_format: Literal['ndjson', 'csv'],
+) -> AsyncGenerator[bytes, None]:
+    """Yield the owner's products serialized in batches read from a server-side cursor."""
+    encode = _encode_ndjson if export_format == 'ndjson' else _encode_csv
+    if export_format == 'csv':
+        yield ','.join(EXPORT_COLUMNS).encode() + b'\r\n'
+
+    query = (
+        select_public(Product, EXPORT_COLUMNS)
+        .where(Product.owner_id == owner_id)
+        .order_by(Product.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    async with session_factory() as session:
+        result = await session.stream(query)
+        async for rows in result.partitions():
+            yield encode(rows)
+
+
+def _list_query(
+    owner_id: int, params: ProductListParams, fields: FieldNames
+) -> tuple[sa.Select[Any], tuple[SortKey, ...]]:
+    """Compile the listing filters and sort order to SQL, returning the page query and its sort keys.
+
+    The (owner_id, ...) composite indexes of the products table serve these combinations with a range scan that
+    reads the rows already in sort order: any sort without a catalog or category filter, and a catalog_id or a
+    category_id filter sorted by creation time. Other combinations, such as both filters together or a catalog
+    filter sorted by price or name, read the rows matching the filters and sort them, so their cost grows with the
+    size of the catalog or category rather than with the page size.
+    """
+    keys = (PRODUCT_SORT_KEYS[params.sort.removeprefix('-')], Product.id)
+    conditions = [Product.owner_id == owner_id]
+    if params.catalog_id is not None:
+        conditions.append(Product.catalog_id == params.catalog_id)
+    if params.category_id is not None:
+        conditions.append(Product.category_id == params.category_id)
+    if params.price_min is not None:
+        conditions.append(Product.price >= params.price_min)
+    if params.price_max is not None:
+        conditions.append(Product.price <= params.price_max)
+    if params.created_after is not None:
+        conditions.append(Product.created_at > params.created_after)
+    query = select_public(Product, fields, *keys).where(*conditions)
+    return apply_keyset(query, keys, params, descending=params.sort.startswith('-')), keys
+
+
+@router.get('/', status_code=HTTPStatus.OK, response_model=Page[ProductPublic])
+async def list_products(
+    params: T_ProductListParams,
+    fields: T_ProductFields,
+    cached: T_CachedProducts,
+    session: T_ReadSession,
+    current_user: T_CurrentUser,
+) -> Response:
+    """List the products owned by the current user, filtered and sorted as requested, one page at a time."""
+    if cached.response is not None:
+        return cached.response
+    query, keys = _list_query(current_user.id, params, fields)
+    result = await session.execute(query)
+    rows, next_cursor = split_page(result.all(), keys, params)
+    return await cached.store(encode_page(rows, fields, next_cursor))
+
+
+@router.get('/search', status_code=HTTPStatus.OK, response_model=Page[ProductPublic])
+async def search_products(
+    search: T_ProductSearchParams,
+    fields: T_ProductFields,
+    cached: T_CachedProducts,
+    session: T_ReadSession,
+    current_user: T_CurrentUser,
+) -> Response:
+    """Search the products owned by the current user by name and description, best matches first.
+
+    Full-text matches on the weighted name and description vector are combined with trigram word similarity on
+    the name, which also catches prefixes and typos above SEARCH_SIMILARITY_THRESHOLD (set on each connection by
+    `configure_search`); both conditions are served by GIN indexes.
+    """
+    if cached.response is not None:
+        return cached.response
+    ts_query = sa.func.websearch_to_tsquery(SEARCH_CONFIG, search.q)
+    similarity = sa.func.word_similarity(search.q, Product.name)
+    rank = sa.cast(sa.func.ts_rank_cd(Product.search_vector, ts_query) + similarity, sa.Double).label('rank')
+    keys = (rank, Product.id)
+    matches = sa.or_(Product.search_vector.op('@@')(ts_query), Product.name.op('%>')(search.q))
+    query = select_public(Product, fields, *keys).where(Product.owner_id == current_user.id, matches)
+    result = await session.execute(apply_keyset(query, keys, search, descending=True))
+    rows, next_cursor = split_page(result.all(), keys, search)
+    return await cached.store(encode_page(rows, fields, next_cursor))
+
+
+@router.get(
+    '/export',
+    status_code=HTTPStatus.OK,
+    response_class=StreamingResponse,
+    responses={HTTPStatus.OK: {'content': {media_type: {} for media_type in EXPORT_MEDIA_TYPES.values()}}},
+)
+async def export_products(
+    session_factory: T_SessionFactory,
+    current_user: T_CurrentUser,
+    export_format: T_ExportFormat = 'ndjson',
+) -> StreamingResponse:
+    """Stream every product owned by the current user as NDJSON or CSV.
+
+    Rows are read through a server-side cursor and written out batch by batch, so memory use is bounded by
+    the batch size regardless of how many products the user owns.
+    """
+    return StreamingResponse(
+        _stream_products(session_factory, current_user.id, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename="products.{export_format}"'},
+    )
+
+
+@router.get('/{product_id}', status_code=HTTPStatus.OK, response_model=ProductPublic)
+async def get_product(
+    product_id: int, cached: T_CachedProducts, session: T_ReadSession, current_user: T_CurrentUser
+) -> Response:
     """Retrieve a product by ID if it belongs to the current user."""
+    if cached.response is not None:
+        return cached.response
     query = sa.select(Product).where(Product.id == product_id, Product.owner_id == current_user.id)
     product = await session.scalar(query)
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Product not found')
-    return ProductPublic.model_validate(product)
+    return await cached.store(ProductPublic.model_validate(product))
 
 
-@router.post('/', status_code=HTTPStatus.CREATED)
+@router.post(
+    '/',
+    status_code=HTTPStatus.CREATED,
+    response_model=ProductPublic,
+    dependencies=[Depends(invalidates('products'))],
+)
 async def create_product(
     product_in: ProductSchema,
-    session: T_DbSession,
+    idempotency: T_IdempotentRequest,
+    session: T_WriteSession,
+    references: T_OwnedReferences,
     current_user: T_CurrentUser,
-) -> ProductPublic:
-    """Create a new product with the provided data for the current user."""
-    new_product = Product(
-        name=product_in.name,
-        description=product_in.description,
-        price=product_in.price,
-        catalog_id=product_in.catalog_id,
-        category_id=product_in.category_id,
-        owner_id=current_user.id,
-    )
-    session.add(new_product)
+) -> Response:
+    """Create a new product with the provided data for the current user.
+
+    The catalog and category must belong to the current user; otherwise 422 is returned before any write.
+    Retries carrying the same `Idempotency-Key` header get the first response back instead of a new product.
+    """
+    if idempotency.response is not None:
+        return idempotency.response
+    await references.check(product_in.catalog_id, product_in.category_id)
+    query = sa.insert(Product).values(**product_in.model_dump(), owner_id=current_user.id).returning(Product)
+    new_product = await session.scalar(query)
+    response = await idempotency.store(ProductPublic.model_validate(new_product), HTTPStatus.CREATED)
     await session.commit()
-    await session.refresh(new_product)
-    return ProductPublic.model_validate(new_product)
+    return response
+
+
+@router.post(
+    '/bulk',
+    status_code=HTTPStatus.OK,
+    response_model=list[ProductBulkResult],
+    dependencies=[Depends(invalidates('products'))],
+)
+async def bulk_products(
+    batch: ProductBulkRequest,
+    idempotency: T_IdempotentRequest,
+    session: T_WriteSession,
+    references: T_OwnedReferences,
+    current_user: T_CurrentUser,
+) -> Response:
+    """Create, upsert and delete many products in a single transaction.
 
+    Each kind of operation is sent as one multi-row statement, so a batch costs a constant number of round
+    trips. Operations are therefore not run in submission order: all creates run first, then all upserts, then
+    all deletes. To keep the outcome independent of that grouping, a batch may touch each product only once:
+    upserts repeating a SKU, deletes repeating an ID and deletes of a product upserted by SKU in the same batch
+    are reported as invalid and skipped. Every operation gets its own result; operations referencing a catalog
+    or category the user does not own are invalid too. Retries carrying the same `Idempotency-Key` header get
+    the first response back without running the batch again.
+    """
+    if idempotency.response is not None:
+        return idempotency.response
+    writes = [(index, op) for index, op in enumerate(batch.operations) if not isinstance(op, ProductBulkDelete)]
+    await references.resolve((op.data.catalog_id for _, op in writes), (op.data.category_id for _, op in writes))
 
-@router.put('/{product_id}', status_code=HTTPStatus.OK)
+    results: list[ProductBulkResult] = []
+    creates: list[tuple[int, ProductBulkCreate]] = []
+    upserts: dict[str, tuple[int, ProductBulkUpsert]] = {}
+    for index, op in writes:
+        detail = references.problem(op.data.catalog_id, op.data.category_id)
+        if detail is None:
+            if isinstance(op, ProductBulkCreate):
+                creates.append((index, op))
+            elif op.sku in upserts:
+                detail = 'Duplicate SKU in batch'
+            else:
+                upserts[op.sku] = (index, op)
+        if detail is not None:
+            results.append(ProductBulkResult(index=index, op=op.op, status='invalid', detail=detail))
+
+    deletes, invalid = await _plan_deletes(session, current_user.id, batch.operations, upserts.keys())
+    results.extend(invalid)
+    if creates:
+        results.extend(await _bulk_create(session, current_user.id, creates))
+    if upserts:
+        results.extend(await _bulk_upsert(session, current_user.id, upserts))
+    if deletes:
+        results.extend(await _bulk_delete(session, current_user.id, deletes))
+    response = await idempotency.store(sorted(results, key=lambda result: result.index), HTTPStatus.OK)
+    await session.commit()
+    return response
+
+
+@router.post(
+    '/import',
+    status_code=HTTPStatus.OK,
+    dependencies=[Depends(invalidates('products'))],
+    openapi_extra={
+        'requestBody': {
+            'required': True,
+            'content': {media_type: {'schema': {'type': 'string'}} for media_type in EXPORT_MEDIA_TYPES.values()},
+        }
+    },
+)
+async def import_products(
+    request: Request,
+    session: T_WriteSession,
+    references: T_OwnedReferences,
+    current_user: T_CurrentUser,
+    import_format: T_ImportFormat = 'ndjson',
+) -> ProductImportResult:
+    """Create or update products from an NDJSON or CSV file sent as the request body, in the export's format.
+
+    The body is parsed as it streams in, so an upload of any size is never held in memory. Rows reference their
+    catalog and category by ID or by name, and are validated and loaded into a staging table with COPY in
+    batches; all valid rows are then merged in a single statement, updating the products whose SKU already
+    exists. Invalid rows are skipped and reported with their position in the file, and the whole import is
+    written in one transaction.
+    """
+    importer = ProductImporter(session, references, current_user.id)
+    await importer.stage(parse_rows(read_lines(request.stream()), import_format))
+    result = await importer.merge()
+    await session.commit()
+    return result
+
+
+@router.put('/{product_id}', status_code=HTTPStatus.OK, dependencies=[Depends(invalidates('products'))])
 async def update_product(
     product_id: int,
     product_in: ProductSchema,
-    session: T_DbSession,
+    session: T_WriteSession,
+    references: T_OwnedReferences,
     current_user: T_CurrentUser,
 ) -> ProductPublic:
-    """Update an existing product for the current user."""
-    query = sa.select(Product).where(Product.id == product_id, Product.owner_id == current_user.id)
+    """Update an existing product for the current user.
+
+    The catalog and category must belong to the current user; otherwise 422 is returned before any write.
+    """
+    await references.check(product_in.catalog_id, product_in.category_id)
+    query = (
+        sa.update(Product)
+        .where(Product.id == product_id, Product.owner_id == current_user.id)
+        .values(**product_in.model_dump())
+        .returning(Product)
+    )
     product = await session.scalar(query)
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Product not found')
-    if product_in.name is not None:
-        product.name = product_in.name
-    product.description = product_in.description
-    product.price = product_in.price
-    product.catalog_id = product_in.catalog_id
-    product.category_id = product_in.category_id
     await session.commit()
-    await session.refresh(product)
     return ProductPublic.model_validate(product)
 
 
-@router.delete('/{product_id}', status_code=HTTPStatus.NO_CONTENT)
+@router.delete('/{product_id}', status_code=HTTPStatus.NO_CONTENT, dependencies=[Depends(invalidates('products'))])
 async def delete_product(
     product_id: int,
-    session: T_DbSession,
+    session: T_WriteSession,
     current_user: T_CurrentUser,
 ) -> None:
     """Delete a product by its ID if it belongs to the current user."""
-    query = sa.select(Product).where(Product.id == product_id, Product.owner_id == current_user.id)
-    product = await session.scalar(query)
-    if not product:
+    query = (
+        sa.delete(Product).where(Product.id == product_id, Product.owner_id == current_user.id).returning(Product.id)
+    )
+    if await session.scalar(query) is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Product not found')
-    await session.delete(product)
     await session.commit()
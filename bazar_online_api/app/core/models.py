@@ -1,23 +1,44 @@
 from datetime import UTC, datetime
 from decimal import Decimal
 
-from sqlalchemy import DateTime, ForeignKey, Integer, Numeric, String, Text
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Computed,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    Numeric,
+    String,
+    Text,
+    UniqueConstraint,
+    event,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
+SEARCH_CONFIG = 'simple'
+
 
 class Base(DeclarativeBase):
     """SQLAlchemy's Base class."""
 
 
+event.listen(Base.metadata, 'before_create', DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm'))  # type: ignore[no-untyped-call]
+
+
 class User(Base):
     """Users table."""
 
     __tablename__ = 'users'
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     username: Mapped[str] = mapped_column(String(50), unique=True, index=True, nullable=False)
     email: Mapped[str] = mapped_column(String(100), unique=True, index=True, nullable=False)
     hashed_password: Mapped[str] = mapped_column(String(255), nullable=False)
+    token_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC)
@@ -34,8 +55,12 @@ class Catalog(Base):
     """Catalogs table."""
 
     __tablename__ = 'catalogs'
+    __table_args__ = (
+        Index('ix_catalogs_owner_id_id', 'owner_id', 'id'),
+        Index('ix_catalogs_owner_id_created_at_id', 'owner_id', 'created_at', 'id'),
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     description: Mapped[str | None] = mapped_column(Text)
     owner_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), nullable=False)
@@ -45,15 +70,21 @@ class Catalog(Base):
     )
 
     owner: Mapped['User'] = relationship('User', back_populates='catalogs')
-    products: Mapped[list['Product']] = relationship('Product', back_populates='catalog', cascade='all, delete-orphan')
+    products: Mapped[list['Product']] = relationship(
+        'Product', back_populates='catalog', cascade='all, delete-orphan', passive_deletes=True
+    )
 
 
 class Category(Base):
     """Categories table."""
 
     __tablename__ = 'categories'
+    __table_args__ = (
+        Index('ix_categories_owner_id_id', 'owner_id', 'id'),
+        Index('ix_categories_owner_id_created_at_id', 'owner_id', 'created_at', 'id'),
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(50), nullable=False)
     owner_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
@@ -63,7 +94,7 @@ class Category(Base):
 
     owner: Mapped['User'] = relationship('User', back_populates='categories')
     products: Mapped[list['Product']] = relationship(
-        'Product', back_populates='category', cascade='all, delete-orphan'
+        'Product', back_populates='category', cascade='all, delete-orphan', passive_deletes=True
     )
 
 
@@ -71,19 +102,152 @@ class Product(Base):
     """Products table."""
 
     __tablename__ = 'products'
+    __table_args__ = (
+        Index('ix_products_owner_id_id', 'owner_id', 'id'),
+        Index('ix_products_owner_id_created_at_id', 'owner_id', 'created_at', 'id'),
+        Index('ix_products_owner_id_catalog_id_created_at_id', 'owner_id', 'catalog_id', 'created_at', 'id'),
+        Index('ix_products_owner_id_category_id_created_at_id', 'owner_id', 'category_id', 'created_at', 'id'),
+        Index('ix_products_owner_id_price_id', 'owner_id', 'price', 'id'),
+        Index('ix_products_owner_id_name_id', 'owner_id', 'name', 'id'),
+        Index('ix_products_catalog_id_price', 'catalog_id', 'price'),
+        Index('ix_products_category_id_price', 'category_id', 'price'),
+        UniqueConstraint('owner_id', 'sku', name='uq_products_owner_id_sku'),
+        Index('ix_products_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_products_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     description: Mapped[str | None] = mapped_column(Text)
     price: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
-    catalog_id: Mapped[int] = mapped_column(Integer, ForeignKey('catalogs.id'), nullable=False)
-    category_id: Mapped[int] = mapped_column(Integer, ForeignKey('categories.id'), nullable=False)
+    sku: Mapped[str | None] = mapped_column(String(64))
+    catalog_id: Mapped[int] = mapped_column(Integer, ForeignKey('catalogs.id', ondelete='CASCADE'), nullable=False)
+    category_id: Mapped[int] = mapped_column(Integer, ForeignKey('categories.id', ondelete='CASCADE'), nullable=False)
     owner_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id'), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC)
     )
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', name), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
 
     catalog: Mapped['Catalog'] = relationship('Catalog', back_populates='products')
     category: Mapped['Category'] = relationship('Category', back_populates='products')
     owner: Mapped['User'] = relationship('User', back_populates='products')
+
+
+class CatalogStats(Base):
+    """Product statistics per catalog, kept up to date by triggers on the products table."""
+
+    __tablename__ = 'catalog_stats'
+
+    catalog_id: Mapped[int] = mapped_column(Integer, ForeignKey('catalogs.id', ondelete='CASCADE'), primary_key=True)
+    product_count: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default='0')
+    price_total: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, server_default='0')
+    price_min: Mapped[Decimal | None] = mapped_column(Numeric(10, 2))
+    price_max: Mapped[Decimal | None] = mapped_column(Numeric(10, 2))
+
+
+class CategoryStats(Base):
+    """Product statistics per category, kept up to date by triggers on the products table."""
+
+    __tablename__ = 'category_stats'
+
+    category_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True
+    )
+    product_count: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default='0')
+    price_total: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, server_default='0')
+    price_min: Mapped[Decimal | None] = mapped_column(Numeric(10, 2))
+    price_max: Mapped[Decimal | None] = mapped_column(Numeric(10, 2))
+
+
+class IdempotencyKey(Base):
+    """Idempotency keys of the users' POST requests, with the response of the request that first used each one."""
+
+    __tablename__ = 'idempotency_keys'
+
+    owner_id: Mapped[int] = mapped_column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    status_code: Mapped[int | None] = mapped_column(Integer)
+    response_body: Mapped[bytes | None] = mapped_column(LargeBinary)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+
+
+# Statement-level triggers fold each write statement on products into the stats tables: counts and totals are
+# adjusted by the net change per catalog and category, while minimum and maximum prices of the affected ones are
+# re-read from the (catalog_id, price) and (category_id, price) indexes. Stats of a catalog or category deleted
+# in the same statement are skipped, as the cascade removes them.
+# Migration 3b9e5d0c8a41 is the source of truth for this SQL; tests/core/test_models.py checks that this copy,
+# used by create_all, matches it.
+PRODUCT_STATS_FUNCTION = """
+CREATE OR REPLACE FUNCTION refresh_product_stats() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    changes text;
+    stats_table text;
+    key_column text;
+    parent_table text;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changes := 'SELECT catalog_id, category_id, price, 1 AS sign FROM new_rows';
+    ELSIF TG_OP = 'DELETE' THEN
+        changes := 'SELECT catalog_id, category_id, price, -1 AS sign FROM old_rows';
+    ELSE
+        changes := 'WITH moved AS ('
+            || 'SELECT n.catalog_id, n.category_id, n.price, o.catalog_id AS old_catalog_id, '
+            || 'o.category_id AS old_category_id, o.price AS old_price '
+            || 'FROM new_rows n JOIN old_rows o USING (id) '
+            || 'WHERE (n.catalog_id, n.category_id, n.price) IS DISTINCT FROM (o.catalog_id, o.category_id, o.price)) '
+            || 'SELECT catalog_id, category_id, price, 1 AS sign FROM moved UNION ALL '
+            || 'SELECT old_catalog_id, old_category_id, old_price, -1 FROM moved';
+    END IF;
+    FOR stats_table, key_column, parent_table IN
+        VALUES ('catalog_stats', 'catalog_id', 'catalogs'), ('category_stats', 'category_id', 'categories')
+    LOOP
+        EXECUTE format(
+            'WITH changes AS (%1$s) '
+            'INSERT INTO %2$I AS s (%3$I, product_count, price_total) '
+            'SELECT %3$I, sum(sign), sum(sign * price) FROM changes '
+            'WHERE EXISTS (SELECT FROM %4$I p WHERE p.id = changes.%3$I) GROUP BY %3$I '
+            'ON CONFLICT (%3$I) DO UPDATE SET product_count = s.product_count + excluded.product_count, '
+            'price_total = s.price_total + excluded.price_total',
+            changes, stats_table, key_column, parent_table
+        );
+        EXECUTE format(
+            'WITH changes AS (%1$s) '
+            'UPDATE %2$I s SET price_min = (SELECT min(price) FROM products p WHERE p.%3$I = s.%3$I), '
+            'price_max = (SELECT max(price) FROM products p WHERE p.%3$I = s.%3$I) '
+            'WHERE s.%3$I IN (SELECT %3$I FROM changes)',
+            changes, stats_table, key_column
+        );
+    END LOOP;
+    RETURN NULL;
+END;
+$$
+"""
+PRODUCT_STATS_TRIGGERS = (
+    (
+        'CREATE TRIGGER products_stats_insert AFTER INSERT ON products REFERENCING NEW TABLE AS new_rows '
+        'FOR EACH STATEMENT EXECUTE FUNCTION refresh_product_stats()'
+    ),
+    (
+        'CREATE TRIGGER products_stats_update AFTER UPDATE ON products REFERENCING OLD TABLE AS old_rows '
+        'NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION refresh_product_stats()'
+    ),
+    (
+        'CREATE TRIGGER products_stats_delete AFTER DELETE ON products REFERENCING OLD TABLE AS old_rows '
+        'FOR EACH STATEMENT EXECUTE FUNCTION refresh_product_stats()'
+    ),
+)
+
+for statement in (PRODUCT_STATS_FUNCTION, *PRODUCT_STATS_TRIGGERS):
+    # DDL statements are %-formatted with the table name, so the placeholders of format() are escaped.
+    event.listen(Product.__table__, 'after_create', DDL(statement.replace('%', '%%')))  # type: ignore[no-untyped-call]
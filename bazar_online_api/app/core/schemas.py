@@ -1,9 +1,8 @@
+from datetime import datetime
 from decimal import Decimal
-from typing import Literal
+from typing import Annotated, Literal, Self
 
-from pydantic import BaseModel, Field, TypeAdapter, field_validator
-
-from app.core.security import get_password_hash
+from pydantic import BaseModel, Field, TypeAdapter, field_validator, model_validator
 
 
 class UserCreate(BaseModel):
@@ -21,11 +20,16 @@ class UserCreate(BaseModel):
             raise ValueError('username field cannot have blank spaces.')
         return v
 
-    @field_validator('password')
-    @classmethod
-    def password_validate(cls, v: str) -> str:
-        """Validation for 'password' field."""
-        return get_password_hash(v)
+
+class Principal(BaseModel):
+    """Authenticated user as seen by the request handlers."""
+
+    model_config = {'from_attributes': True, 'frozen': True}
+
+    id: int
+    email: str
+    username: str
+    token_version: int = 0
 
 
 class UserUpdate(BaseModel):
@@ -72,6 +76,7 @@ class ProductPublic(BaseModel):
     name: str
     description: str | None = None
     price: Decimal
+    sku: str | None = None
     catalog_id: int
     category_id: int
     owner_id: int
@@ -79,6 +84,92 @@ class ProductPublic(BaseModel):
 
 ProductPublicList = TypeAdapter(list[ProductPublic])
 
+MAX_BULK_OPERATIONS = 1000
+
+
+class ProductBulkCreate(BaseModel):
+    """Bulk operation creating a new product."""
+
+    op: Literal['create']
+    data: ProductSchema
+
+
+class ProductBulkUpsert(BaseModel):
+    """Bulk operation creating or replacing the product identified by a client-side SKU."""
+
+    op: Literal['upsert']
+    sku: str = Field(min_length=1, max_length=64)
+    data: ProductSchema
+
+
+class ProductBulkDelete(BaseModel):
+    """Bulk operation deleting a product by ID."""
+
+    op: Literal['delete']
+    id: int
+
+
+ProductBulkOperation = Annotated[ProductBulkCreate | ProductBulkUpsert | ProductBulkDelete, Field(discriminator='op')]
+
+
+class ProductBulkRequest(BaseModel):
+    """Schema for a batch of product operations."""
+
+    operations: list[ProductBulkOperation] = Field(min_length=1, max_length=MAX_BULK_OPERATIONS)
+
+
+class ProductBulkResult(BaseModel):
+    """Outcome of a single operation of a product batch."""
+
+    index: int
+    op: Literal['create', 'upsert', 'delete']
+    status: Literal['created', 'updated', 'deleted', 'not_found', 'invalid']
+    id: int | None = None
+    detail: str | None = None
+
+
+class ProductImportRow(BaseModel):
+    """Row of a product import file, referencing its catalog and category by ID or by name.
+
+    Follows the rules of ProductSchema, tightened to the column limits of the products table so that no valid row
+    can fail the import's merge. Other columns, such as the `id` and `owner_id` of an export, are ignored.
+    """
+
+    name: str = Field(min_length=1, max_length=100)
+    description: str | None = None
+    price: Decimal = Field(max_digits=10, decimal_places=2)
+    sku: str | None = Field(None, min_length=1, max_length=64)
+    catalog_id: int | None = None
+    catalog: str | None = Field(None, min_length=1)
+    category_id: int | None = None
+    category: str | None = Field(None, min_length=1)
+
+    @model_validator(mode='after')
+    def references_validate(self) -> Self:
+        """Validation that the catalog and the category are given."""
+        if self.catalog_id is None and self.catalog is None:
+            raise ValueError('catalog_id or catalog is required.')
+        if self.category_id is None and self.category is None:
+            raise ValueError('category_id or category is required.')
+        return self
+
+
+class ProductImportError(BaseModel):
+    """Row of a product import file that was skipped."""
+
+    row: int = Field(description='Position of the row in the file, starting at 1 after any CSV header.')
+    detail: str
+
+
+class ProductImportResult(BaseModel):
+    """Outcome of a product import."""
+
+    rows: int = Field(description='Rows read from the file.')
+    created: int
+    updated: int
+    invalid: int
+    errors: list[ProductImportError] = Field(description='Skipped rows, up to the first IMPORT_MAX_ERRORS of them.')
+
 
 class CatalogSchema(BaseModel):
     """Schema for catalog instances."""
@@ -99,8 +190,42 @@ class CatalogPublic(BaseModel):
 CatalogPublicList = TypeAdapter(list[CatalogPublic])
 
 
+class Page[T](BaseModel):
+    """Schema for a page of a keyset-paginated listing."""
+
+    items: list[T]
+    next_cursor: str | None = None
+
+
+class CatalogWithProducts(CatalogPublic):
+    """Public schema for a catalog expanded with the first page of its products."""
+
+    products: Page[ProductPublic] | None = None
+
+
+class ProductStats(BaseModel):
+    """Aggregated statistics of the products of a catalog or category."""
+
+    product_count: int
+    price_min: Decimal | None = None
+    price_max: Decimal | None = None
+    price_avg: Decimal | None = None
+    inventory_value: Decimal
+
+
 class Token(BaseModel):
     """Schema for access token."""
 
     token_type: Literal['bearer'] = 'bearer'  # noqa: S105
     access_token: str
+
+
+class SlowQuery(BaseModel):
+    """SQL statement that ran slower than the slow query threshold."""
+
+    statement: str
+    bind_shape: str
+    duration_ms: float
+    route: str | None = None
+    recorded_at: datetime
+    plan: str | None = None
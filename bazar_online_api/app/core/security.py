@@ -1,5 +1,9 @@
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime, timedelta
 from typing import Annotated
+from uuid import uuid4
 
 import jwt
 from fastapi import Depends
@@ -22,17 +26,82 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def create_access_token(email: str) -> str:
+class PasswordHasherBusyError(Exception):
+    """Raised when too many password hashing jobs are already waiting for the pool."""
+
+
+class PasswordHasher:
+    """Runs bcrypt hashing and verification on a dedicated, bounded thread pool.
+
+    bcrypt is deliberately slow; running it on the event loop would stall every other in-flight request.
+    Jobs beyond `max_pending` are rejected instead of queued, so bursts of logins degrade into fast
+    failures rather than unbounded latency.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int) -> None:
+        """Create the pool with `max_workers` threads, accepting up to `max_pending` jobs at a time."""
+        self.max_pending = max_pending
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hasher')
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs running or waiting in the pool."""
+        return self._pending
+
+    async def _run[T](self, func: Callable[..., T], *args: str) -> T:
+        if self._pending >= self.max_pending:
+            raise PasswordHasherBusyError
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """Generate a bcrypt hash for the given password."""
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify that a plain password matches the hashed password."""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        """Stop the worker threads once the queued jobs are done."""
+        self._executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS, max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
+
+
+def create_access_token(user_id: int, email: str, username: str, token_version: int) -> str:
     """Create a JWT access token.
 
+    The token carries everything request handlers need about the user, so it can be trusted without a
+    database lookup once its signature and token version are checked.
+
     Args:
-        email: User e-mail.
+        user_id: User ID, stored in the `uid` claim.
+        email: User e-mail, stored in the `sub` claim.
+        username: User name.
+        token_version: User's current token version; bumping it revokes every token issued before.
 
     Returns:
         A JWT encoded access token.
     """
+    now = datetime.now(UTC)
     return jwt.encode(
-        {'sub': email, 'exp': datetime.now(UTC) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)},
+        {
+            'sub': email,
+            'uid': user_id,
+            'username': username,
+            'ver': token_version,
+            'iat': now,
+            'jti': uuid4().hex,
+            'exp': now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        },
         algorithm=settings.ACCESS_TOKEN_ALGORITHM,
         key=settings.SECRET_KEY,
     )
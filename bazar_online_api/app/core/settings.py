@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import computed_field
 from pydantic_core import MultiHostUrl
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -16,6 +18,39 @@ class Settings(BaseSettings):
     POSTGRES_DB: str
     ACCESS_TOKEN_ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_REPLICA_URLS: list[str] = []
+    DB_REPLICA_CONNECT_TIMEOUT: float = 2.0
+    DB_REPLICA_EJECT_SECONDS: float = 30.0
+    DB_REPLICA_STICKY_SECONDS: int = 5
+    CACHE_BACKEND: Literal['memory', 'redis'] = 'memory'
+    CACHE_REDIS_URL: str = 'redis://localhost:6379/0'
+    CACHE_MAX_ENTRIES: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
+    RESPONSE_CACHE_VERSION_TTL_SECONDS: int = 86_400
+    SEARCH_SIMILARITY_THRESHOLD: float = 0.4
+    REQUEST_QUERY_WARNING_THRESHOLD: int = 20
+    SLOW_QUERY_THRESHOLD_SECONDS: float = 0.2
+    SLOW_QUERY_LOG_SIZE: int = 200
+    SLOW_QUERY_EXPLAIN_RATE: float = 0.0
+    SLOW_QUERY_EXPLAIN_ANALYZE: bool = False
+    ADMIN_API_KEY: str | None = None
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 86_400
+    IDEMPOTENCY_LOCK_SECONDS: int = 60
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+    IDEMPOTENCY_PURGE_RATE: float = 0.01
+    IDEMPOTENCY_PURGE_BATCH_SIZE: int = 1000
+    TOKEN_REVOCATION_CHECK: bool = True
+    TOKEN_VERSION_CACHE_TTL_SECONDS: int = 30
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
 
     @computed_field  # type: ignore[prop-decorator]
     @property
@@ -0,0 +1,126 @@
+import importlib
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Annotated, Any, Protocol
+
+from fastapi import Depends
+
+from app.core.settings import settings
+
+
+class CacheBackend(Protocol):
+    """Key/value store with per-entry expiry shared by the application caches."""
+
+    async def get(self, key: str) -> bytes | None:
+        """Return the value stored under `key`, or None if it is missing or expired."""
+        ...
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Store `value` under `key` for `ttl` seconds."""
+        ...
+
+    async def delete(self, key: str) -> None:
+        """Remove `key` from the cache."""
+        ...
+
+
+class MemoryCache:
+    """In-process cache with per-entry expiry and least-recently-used eviction."""
+
+    def __init__(self, max_entries: int, clock: Callable[[], float] = time.monotonic) -> None:
+        """Create an empty cache holding at most `max_entries` entries."""
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Number of entries currently held, including expired ones not yet evicted."""
+        return len(self._entries)
+
+    async def get(self, key: str) -> bytes | None:
+        """Return the value stored under `key`, or None if it is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Store `value` under `key` for `ttl` seconds, evicting the least recently used entry if full."""
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        """Remove `key` from the cache."""
+        self._entries.pop(key, None)
+
+
+class RedisClient(Protocol):
+    """Subset of the `redis.asyncio.Redis` interface used by `RedisCache`."""
+
+    def get(self, name: str) -> Awaitable[Any]:
+        """GET command."""
+        ...
+
+    def set(self, name: str, value: bytes, px: int) -> Awaitable[Any]:
+        """SET command with a millisecond expiry."""
+        ...
+
+    def delete(self, *names: str) -> Awaitable[Any]:
+        """DEL command."""
+        ...
+
+
+class RedisCache:
+    """Cache backed by Redis, or any server speaking its protocol, shared between workers."""
+
+    def __init__(self, client: RedisClient, prefix: str = 'bazar:') -> None:
+        """Wrap an async Redis client, namespacing every key with `prefix`."""
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> bytes | None:
+        """Return the value stored under `key`, or None if it is missing or expired."""
+        value: bytes | None = await self.client.get(self.prefix + key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Store `value` under `key` for `ttl` seconds."""
+        await self.client.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+
+    async def delete(self, key: str) -> None:
+        """Remove `key` from the cache."""
+        await self.client.delete(self.prefix + key)
+
+
+def build_cache() -> CacheBackend:
+    """Build the cache backend selected by the settings.
+
+    Raises:
+        RuntimeError: If the Redis backend is selected but the optional `redis` package is not installed.
+    """
+    if settings.CACHE_BACKEND == 'redis':
+        try:
+            redis = importlib.import_module('redis.asyncio')
+        except ImportError:
+            raise RuntimeError('CACHE_BACKEND=redis requires the `redis` package to be installed') from None
+        return RedisCache(redis.Redis.from_url(settings.CACHE_REDIS_URL))
+    return MemoryCache(max_entries=settings.CACHE_MAX_ENTRIES)
+
+
+cache = build_cache()
+
+
+def get_cache() -> CacheBackend:
+    """Returns the application cache backend."""
+    return cache
+
+
+T_Cache = Annotated[CacheBackend, Depends(get_cache)]
@@ -0,0 +1,44 @@
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import asyncpg  # type: ignore[import-untyped]
+import sqlalchemy as sa
+from psycopg import AsyncConnection as PsycopgConnection
+from psycopg import sql
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+
+async def copy_rows(
+    connection: AsyncConnection, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]
+) -> None:
+    """Load `rows` into `table` with COPY FROM STDIN, in the connection's current transaction.
+
+    COPY streams the rows in the driver's binary or text protocol instead of binding them to INSERT statements,
+    which is several times faster for large volumes. Both the asyncpg and the psycopg drivers are supported.
+
+    Args:
+        connection: SQLAlchemy connection whose driver connection runs the COPY.
+        table: Name of the target table.
+        columns: Names of the target columns, in the order of the values of each row.
+        rows: Values of the rows to load.
+
+    Raises:
+        TypeError: If the connection uses another driver.
+    """
+    raw = await connection.get_raw_connection()
+    driver = raw.driver_connection
+    if isinstance(driver, asyncpg.Connection):
+        if not driver.is_in_transaction():
+            # SQLAlchemy only opens the asyncpg transaction with the first statement it runs.
+            await connection.execute(sa.text('SELECT'))
+        await driver.copy_records_to_table(table, records=rows, columns=list(columns))
+    elif isinstance(driver, PsycopgConnection):
+        query = sql.SQL('COPY {} ({}) FROM STDIN').format(
+            sql.Identifier(table), sql.SQL(', ').join(map(sql.Identifier, columns))
+        )
+        async with driver.cursor() as cursor, cursor.copy(query) as copy:
+            for row in rows:
+                await copy.write_row(row)
+    else:
+        msg = f'COPY is not supported for {type(driver).__name__} connections'
+        raise TypeError(msg)
@@ -1,16 +1,136 @@
-from collections.abc import AsyncGenerator
-from typing import Annotated
+import time
+from collections.abc import AsyncGenerator, Callable, Iterator, Sequence
+from typing import Annotated, Any
 
 from fastapi import Depends
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import Engine, event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
 
 from app.core.settings import settings
+from app.infra.metrics import Counter, Gauge, Histogram, registry
+from app.infra.profiling import track_queries
 
-engine = create_async_engine(
-    url=settings.asyncpg_url.unicode_string(),
-    future=True,
-    echo=True,
+POOL_WAIT_SECONDS = registry.register(
+    Histogram('db_pool_wait_seconds', 'Time spent obtaining a connection from the database pool.')
 )
+POOL_TIMEOUTS = registry.register(
+    Counter('db_pool_timeouts_total', 'Connection requests that gave up after DB_POOL_TIMEOUT seconds.')
+)
+REPLICA_EJECTIONS = registry.register(
+    Counter('db_replica_ejections_total', 'Read replicas taken out of rotation after failing to connect.')
+)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool recording how long checkouts wait and how often they time out."""
+
+    def _do_get(self) -> Any:  # noqa: ANN401
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+
+class ReplicaRouter:
+    """Round-robin selection of read replicas, taking replicas that fail to connect out of rotation for a while."""
+
+    def __init__(
+        self,
+        factories: Sequence[async_sessionmaker[AsyncSession]],
+        eject_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Route reads over the replicas behind `factories`, ejecting failed ones for `eject_seconds`."""
+        self.factories = tuple(factories)
+        self.eject_seconds = eject_seconds
+        self._clock = clock
+        self._ejected_until = [0.0] * len(self.factories)
+        self._next = 0
+
+    def candidates(self) -> Iterator[tuple[int, async_sessionmaker[AsyncSession]]]:
+        """Yield the index and session factory of every replica in rotation, starting with the next one in turn."""
+        count = len(self.factories)
+        if not count:
+            return
+        start, self._next = self._next, (self._next + 1) % count
+        now = self._clock()
+        for offset in range(count):
+            index = (start + offset) % count
+            if self._ejected_until[index] <= now:
+                yield index, self.factories[index]
+
+    def eject(self, index: int) -> None:
+        """Take the replica at `index` out of rotation for `eject_seconds`."""
+        self._ejected_until[index] = self._clock() + self.eject_seconds
+        REPLICA_EJECTIONS.inc()
+
+    async def connect(self) -> AsyncSession | None:
+        """Open a session on the next reachable replica, or return None if no replica is available."""
+        for index, factory in self.candidates():
+            session = factory()
+            try:
+                await session.connection()
+            except (DBAPIError, OSError):
+                await session.close()
+                self.eject(index)
+                continue
+            return session
+        return None
+
+
+def _set_search_settings(dbapi_connection: Any, _connection_record: Any) -> None:  # noqa: ANN401
+    autocommit = dbapi_connection.autocommit
+    dbapi_connection.autocommit = True
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f'SET pg_trgm.word_similarity_threshold = {float(settings.SEARCH_SIMILARITY_THRESHOLD)}')
+    cursor.close()
+    dbapi_connection.autocommit = autocommit
+
+
+def configure_search(engine: Engine) -> None:
+    """Set the trigram word similarity threshold to SEARCH_SIMILARITY_THRESHOLD on every new connection of `engine`.
+
+    The `%>` operator reads it from the session, so it is set once per pooled connection rather than per search.
+    """
+    event.listen(engine, 'connect', _set_search_settings)
+
+
+def _create_engine(url: str, poolclass: type[Pool] = AsyncAdaptedQueuePool, **connect_args: Any) -> AsyncEngine:  # noqa: ANN401
+    return create_async_engine(
+        url=url,
+        future=True,
+        echo=settings.DB_ECHO,
+        poolclass=poolclass,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={'statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE, **connect_args},
+    )
+
+
+engine = _create_engine(settings.asyncpg_url.unicode_string(), poolclass=InstrumentedPool)
+replica_engines = [
+    _create_engine(url, timeout=settings.DB_REPLICA_CONNECT_TIMEOUT) for url in settings.DB_REPLICA_URLS
+]
+for instrumented in (engine, *replica_engines):
+    track_queries(instrumented.sync_engine)
+    configure_search(instrumented.sync_engine)
+
+pool = engine.pool
+if isinstance(pool, InstrumentedPool):
+    registry.register(Gauge('db_pool_size', 'Configured number of persistent pool connections.', pool.size))
+    registry.register(Gauge('db_pool_checked_out', 'Connections currently checked out of the pool.', pool.checkedout))
+    registry.register(Gauge('db_pool_checked_in', 'Idle connections currently held by the pool.', pool.checkedin))
+    registry.register(Gauge('db_pool_overflow', 'Connections open beyond the pool size.', pool.overflow))
 
 AsyncSessionFactory = async_sessionmaker(
     bind=engine,
@@ -18,6 +138,16 @@ AsyncSessionFactory = async_sessionmaker(
     expire_on_commit=False,
 )
 
+replica_router = ReplicaRouter(
+    [async_sessionmaker(bind=replica, autoflush=False, expire_on_commit=False) for replica in replica_engines],
+    eject_seconds=settings.DB_REPLICA_EJECT_SECONDS,
+)
+
+
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Returns the session factory, for work that outlives the request-scoped session (e.g. streaming)."""
+    return AsyncSessionFactory
+
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """Yields an async SQLAlchemy session."""
@@ -25,4 +155,11 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+def get_replica_router() -> ReplicaRouter:
+    """Returns the router over the read replicas (empty when DB_REPLICA_URLS is not set)."""
+    return replica_router
+
+
 T_DbSession = Annotated[AsyncSession, Depends(get_session)]
+T_SessionFactory = Annotated[async_sessionmaker[AsyncSession], Depends(get_session_factory)]
+T_ReplicaRouter = Annotated[ReplicaRouter, Depends(get_replica_router)]
@@ -0,0 +1,178 @@
+import collections
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import Connection, Engine, event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.settings import settings
+from app.infra.metrics import Counter, Histogram, registry
+from app.infra.slow_queries import slow_query_log
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+REQUEST_SECONDS = registry.register(
+    Histogram('http_request_seconds', 'Time spent answering HTTP requests.', ('method', 'route', 'status'))
+)
+REQUEST_QUERIES = registry.register(
+    Histogram('http_request_queries', 'SQL statements run per HTTP request.', ('method', 'route'), QUERY_COUNT_BUCKETS)
+)
+REQUEST_DB_SECONDS = registry.register(
+    Histogram('http_request_db_seconds', 'Time spent in SQL statements per HTTP request.', ('method', 'route'))
+)
+REQUEST_SERIALIZATION_SECONDS = registry.register(
+    Histogram(
+        'http_request_serialization_seconds',
+        'Time spent encoding response bodies per HTTP request.',
+        ('method', 'route'),
+    )
+)
+QUERY_BUDGET_EXCEEDED = registry.register(
+    Counter(
+        'http_request_query_budget_exceeded_total',
+        'HTTP requests that ran more than REQUEST_QUERY_WARNING_THRESHOLD SQL statements.',
+        ('method', 'route'),
+    )
+)
+
+
+class RequestProfile:
+    """SQL and serialization work done while answering one request."""
+
+    def __init__(self, scope: Scope | None = None) -> None:
+        """Start an empty profile of the request described by the ASGI `scope`."""
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self.statements: collections.Counter[str] = collections.Counter()
+
+    @property
+    def route(self) -> str | None:
+        """Path template of the route answering the request, once it was routed."""
+        return None if self.scope is None else _route_path(self.scope)
+
+    def server_timing(self, total_seconds: float) -> str:
+        """Render the profile as the value of a `Server-Timing` header, durations in milliseconds."""
+        return (
+            f'db;desc="{self.queries} queries";dur={self.db_seconds * 1000:.1f}, '
+            f'serialize;dur={self.serialization_seconds * 1000:.1f}, '
+            f'total;dur={total_seconds * 1000:.1f}'
+        )
+
+
+_current_profile: ContextVar[RequestProfile | None] = ContextVar('request_profile', default=None)
+
+
+@contextmanager
+def profile_serialization() -> Iterator[None]:
+    """Count the time spent in the block towards the current request's serialization time."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.serialization_seconds += time.perf_counter() - start
+
+
+def _before_cursor_execute(conn: Connection, *_args: Any) -> None:  # noqa: ANN401
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Connection,
+    _cursor: Any,  # noqa: ANN401
+    statement: str,
+    parameters: Any,  # noqa: ANN401
+    _context: Any,  # noqa: ANN401
+    executemany: bool,  # noqa: FBT001
+) -> None:
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.queries += 1
+        profile.db_seconds += elapsed
+        profile.statements[statement] += 1
+    if elapsed >= settings.SLOW_QUERY_THRESHOLD_SECONDS:
+        route = None if profile is None else profile.route
+        slow_query_log.record(conn, statement, parameters, elapsed, route, executemany=executemany)
+
+
+def track_queries(engine: Engine) -> None:
+    """Count the statements run on `engine`, and the time they take, towards the current request's profile.
+
+    Statements slower than SLOW_QUERY_THRESHOLD_SECONDS are also recorded in the slow query log.
+    """
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def _route_path(scope: Scope) -> str:
+    route = scope.get('route')
+    return getattr(route, 'path', 'unmatched')
+
+
+class ProfilingMiddleware:
+    """ASGI middleware recording per-route latency, SQL statement count, DB time and serialization time.
+
+    The figures are exposed as metrics, and as a `Server-Timing` header reporting the work done before the
+    response started. Requests running more than REQUEST_QUERY_WARNING_THRESHOLD statements are logged with their
+    most repeated statement, which usually points at an N+1 query pattern.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Wrap `app`."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Answer the request with `app`, profiling it."""
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope)
+        token = _current_profile.set(profile)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                MutableHeaders(scope=message).append(
+                    'Server-Timing', profile.server_timing(time.perf_counter() - start)
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_profile.reset(token)
+            self._record(scope, profile, status, time.perf_counter() - start)
+
+    @staticmethod
+    def _record(scope: Scope, profile: RequestProfile, status: int, elapsed: float) -> None:
+        method, route = scope['method'], _route_path(scope)
+        REQUEST_SECONDS.observe(elapsed, method=method, route=route, status=str(status))
+        REQUEST_QUERIES.observe(profile.queries, method=method, route=route)
+        REQUEST_DB_SECONDS.observe(profile.db_seconds, method=method, route=route)
+        REQUEST_SERIALIZATION_SECONDS.observe(profile.serialization_seconds, method=method, route=route)
+        if profile.queries > settings.REQUEST_QUERY_WARNING_THRESHOLD:
+            QUERY_BUDGET_EXCEEDED.inc(method=method, route=route)
+            statement, count = profile.statements.most_common(1)[0]
+            logger.warning(
+                'Possible N+1 queries: %s %s ran %d statements, %d of them: %s',
+                method,
+                route,
+                profile.queries,
+                count,
+                statement,
+            )
@@ -0,0 +1,124 @@
+import collections
+import logging
+import random
+import re
+from collections.abc import Callable, Sequence
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import Connection
+
+from app.core.schemas import SlowQuery
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r'\$\d+|%\(\w+\)s|%s|\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+
+def normalize_sql(statement: str) -> str:
+    """Reduce a statement to its shape: literals and bind placeholders become `?`, lists of them `(?, ...)`."""
+    statement = _STRING_LITERAL.sub('?', statement)
+    statement = _PLACEHOLDER.sub('?', statement)
+    statement = _PLACEHOLDER_LIST.sub('(?, ...)', statement)
+    return _WHITESPACE.sub(' ', statement).strip()
+
+
+def _value_shape(value: Any) -> str:  # noqa: ANN401
+    if isinstance(value, list | tuple | set):
+        return f'{type(value).__name__}[{len(value)}]'
+    return type(value).__name__
+
+
+def bind_shape(parameters: Any, *, executemany: bool = False) -> str:  # noqa: ANN401
+    """Describe the types of a statement's bind parameters, without their values."""
+    if executemany:
+        rows = list(parameters)
+        return f'{len(rows)} x {bind_shape(rows[0])}' if rows else '0 x ()'
+    if isinstance(parameters, dict):
+        return '(' + ', '.join(f'{name}: {_value_shape(value)}' for name, value in parameters.items()) + ')'
+    if isinstance(parameters, Sequence) and not isinstance(parameters, str):
+        return '(' + ', '.join(_value_shape(value) for value in parameters) + ')'
+    return '()'
+
+
+def _explain(conn: Connection, statement: str, parameters: Any) -> str | None:  # noqa: ANN401
+    """Run EXPLAIN on `statement` inside a savepoint, rolled back afterwards so it leaves the transaction intact.
+
+    Plain EXPLAIN only plans the statement, so the plan shows estimated rows and costs. With
+    SLOW_QUERY_EXPLAIN_ANALYZE on, SELECT statements are explained with EXPLAIN (ANALYZE, BUFFERS) instead, which
+    runs them again to measure rows, timings and buffer use; the rollback undoes their writes to the database, but
+    not the other effects of volatile functions they call, such as advancing sequences.
+    """
+    keyword = statement.lstrip()[:6].upper()
+    if not keyword.startswith(_EXPLAINABLE):
+        return None
+    explain = (
+        'EXPLAIN (ANALYZE, BUFFERS)' if settings.SLOW_QUERY_EXPLAIN_ANALYZE and keyword == 'SELECT' else 'EXPLAIN'
+    )
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute('SAVEPOINT slow_query_explain')
+        try:
+            cursor.execute(f'{explain} {statement}', parameters)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        finally:
+            cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+            cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+    except Exception:
+        logger.exception('Could not explain slow query')
+        return None
+    finally:
+        cursor.close()
+    return plan
+
+
+class SlowQueryLog:
+    """Bounded in-memory log of the statements slower than SLOW_QUERY_THRESHOLD_SECONDS, newest last."""
+
+    def __init__(self, size: int, sample: Callable[[], float] = random.random) -> None:
+        """Keep the last `size` slow statements; `sample` draws the number deciding whether to explain one."""
+        self._entries: collections.deque[SlowQuery] = collections.deque(maxlen=size)
+        self._sample = sample
+
+    def record(  # noqa: PLR0913
+        self,
+        conn: Connection,
+        statement: str,
+        parameters: Any,  # noqa: ANN401
+        duration: float,
+        route: str | None,
+        *,
+        executemany: bool,
+    ) -> None:
+        """Log a statement that took `duration` seconds, explaining a SLOW_QUERY_EXPLAIN_RATE fraction of them."""
+        plan = None
+        if not executemany and self._sample() < settings.SLOW_QUERY_EXPLAIN_RATE:
+            plan = _explain(conn, statement, parameters)
+        entry = SlowQuery(
+            statement=normalize_sql(statement),
+            bind_shape=bind_shape(parameters, executemany=executemany),
+            duration_ms=round(duration * 1000, 3),
+            route=route,
+            recorded_at=datetime.now(UTC),
+            plan=plan,
+        )
+        self._entries.append(entry)
+        logger.warning(
+            'Slow query (%.1f ms) on %s: %s %s', entry.duration_ms, route, entry.statement, entry.bind_shape
+        )
+
+    def entries(self) -> list[SlowQuery]:
+        """Return the logged statements, newest first."""
+        return list(reversed(self._entries))
+
+    def clear(self) -> None:
+        """Forget every logged statement."""
+        self._entries.clear()
+
+
+slow_query_log = SlowQueryLog(settings.SLOW_QUERY_LOG_SIZE)
@@ -2,10 +2,14 @@ import logging
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.api.v1.router import router as api_v1_router
-from app.infra.database import engine
+from app.core.security import PasswordHasherBusyError, password_hasher
+from app.infra.database import engine, replica_engines
+from app.infra.metrics import registry
+from app.infra.profiling import ProfilingMiddleware
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -24,6 +28,9 @@ async def lifespan(_app: FastAPI) -> AsyncGenerator[None, None]:
     logger.info('Starting up the Bazar Online API...')
     yield
     await engine.dispose()
+    for replica in replica_engines:
+        await replica.dispose()
+    password_hasher.shutdown()
     logger.info('Shutting down the Bazar Online API...')
 
 
@@ -33,6 +40,17 @@ app = FastAPI(
     version='0.1.0',
     lifespan=lifespan,
 )
+app.add_middleware(ProfilingMiddleware)
+
+
+@app.exception_handler(PasswordHasherBusyError)
+async def password_hasher_busy_handler(_request: Request, _exc: PasswordHasherBusyError) -> JSONResponse:
+    """Answer 503 when the password hashing pool is saturated, asking the client to retry shortly."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={'detail': 'Too many authentication requests, please retry shortly.'},
+        headers={'Retry-After': '1'},
+    )
 
 
 @app.get('/healthcheck', response_model=dict, tags=['Healthcheck'])
@@ -45,4 +63,10 @@ def healthcheck() -> dict[str, str]:
     return {'status': 'ok'}
 
 
+@app.get('/metrics', response_class=PlainTextResponse, tags=['Healthcheck'])
+def metrics() -> PlainTextResponse:
+    """Metrics endpoint, in the Prometheus text exposition format."""
+    return PlainTextResponse(registry.render(), media_type='text/plain; version=0.0.4')
+
+
 app.include_router(api_v1_router, prefix='/v1')
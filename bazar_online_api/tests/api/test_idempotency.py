@@ -0,0 +1,120 @@
+from datetime import UTC, datetime, timedelta
+from http import HTTPStatus
+
+import pytest
+import sqlalchemy as sa
+from app.core.models import Catalog, IdempotencyKey, User
+from app.core.settings import settings
+from app.infra.cache import MemoryCache
+from app.infra.database import ReplicaRouter, get_replica_router
+from app.main import app
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+
+@pytest.mark.asyncio
+async def test_idempotency_waits_for_in_flight_key(
+    async_client: AsyncClient, token: str, session: AsyncSession, user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a duplicate of an in-flight request gets 409 until the first one stores its response."""
+    monkeypatch.setattr(settings, 'IDEMPOTENCY_WAIT_SECONDS', 0)
+    payload = {'name': 'Once', 'description': 'Created a single time'}
+    headers = {'Authorization': f'Bearer {token}', 'Idempotency-Key': 'in-flight'}
+    first = await async_client.post('/v1/catalogs/', json=payload, headers={**headers, 'Idempotency-Key': 'other'})
+    fingerprint = (await session.get(IdempotencyKey, (user.id, 'other'))).fingerprint  # type: ignore[union-attr]
+    session.add(
+        IdempotencyKey(owner_id=user.id, key='in-flight', fingerprint=fingerprint, created_at=datetime.now(UTC))
+    )
+    await session.commit()
+
+    response = await async_client.post('/v1/catalogs/', json=payload, headers=headers)
+    assert response.status_code == HTTPStatus.CONFLICT, f'Expected {HTTPStatus.CONFLICT}, got {response.status_code}'
+
+    slot = await session.get(IdempotencyKey, (user.id, 'in-flight'))
+    slot.status_code, slot.response_body = HTTPStatus.CREATED, first.content  # type: ignore[union-attr]
+    await session.commit()
+    response = await async_client.post('/v1/catalogs/', json=payload, headers=headers)
+    assert response.status_code == HTTPStatus.CREATED, f'Expected {HTTPStatus.CREATED}, got {response.status_code}'
+    assert response.json() == first.json()
+
+
+@pytest.mark.asyncio
+async def test_idempotency_claims_purge_expired_keys(
+    async_client: AsyncClient, token: str, session: AsyncSession, user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that claiming a key purges the expired keys of every user, keeping live ones."""
+    monkeypatch.setattr(settings, 'IDEMPOTENCY_PURGE_RATE', 1.0)
+    expired_at = datetime.now(UTC) - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS + 1)
+    session.add_all(
+        [
+            IdempotencyKey(owner_id=user.id, key='expired', fingerprint='', status_code=201, created_at=expired_at),
+            IdempotencyKey(
+                owner_id=user.id, key='live', fingerprint='', status_code=201, created_at=datetime.now(UTC)
+            ),
+        ]
+    )
+    await session.commit()
+
+    headers = {'Authorization': f'Bearer {token}', 'Idempotency-Key': 'new'}
+    response = await async_client.post('/v1/catalogs/', json={'name': 'Purging'}, headers=headers)
+    assert response.status_code == HTTPStatus.CREATED, f'Expected {HTTPStatus.CREATED}, got {response.status_code}'
+
+    keys = await session.scalars(sa.select(IdempotencyKey.key).order_by(IdempotencyKey.key))
+    assert list(keys) == ['live', 'new']
+
+
+@pytest.mark.asyncio
+async def test_idempotency_wait_backs_off(
+    async_client: AsyncClient, token: str, session: AsyncSession, user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a duplicate waiting for an in-flight request polls its key with an exponential backoff."""
+    monkeypatch.setattr(settings, 'IDEMPOTENCY_WAIT_SECONDS', 1.0)
+    payload = {'name': 'Busy'}
+    headers = {'Authorization': f'Bearer {token}', 'Idempotency-Key': 'busy'}
+    await async_client.post('/v1/catalogs/', json=payload, headers={**headers, 'Idempotency-Key': 'done'})
+    fingerprint = (await session.get(IdempotencyKey, (user.id, 'done'))).fingerprint  # type: ignore[union-attr]
+    session.add(IdempotencyKey(owner_id=user.id, key='busy', fingerprint=fingerprint, created_at=datetime.now(UTC)))
+    await session.commit()
+    engine = (await session.connection()).engine
+    lookups = 0
+
+    def count(*args: object) -> None:
+        nonlocal lookups
+        lookups += str(args[2]).startswith('SELECT idempotency_keys.fingerprint')
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', count)
+    try:
+        response = await async_client.post('/v1/catalogs/', json=payload, headers=headers)
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', count)
+
+    assert response.status_code == HTTPStatus.CONFLICT, f'Expected {HTTPStatus.CONFLICT}, got {response.status_code}'
+    # Sleeps of 0.05, 0.1, 0.2, 0.4 and the remaining 0.25 seconds, where polling every 0.05 seconds takes 20.
+    max_lookups = 6
+    assert lookups <= max_lookups
+
+
+@pytest.mark.asyncio
+async def test_idempotency_replay_keeps_cache_and_replica_reads(
+    async_client: AsyncClient, token: str, session: AsyncSession, user: User, cache: MemoryCache
+) -> None:
+    """Test that a replayed response leaves the cached listings valid and the user's reads on the replicas."""
+    replica = async_sessionmaker(bind=session.bind, join_transaction_mode='create_savepoint')
+    app.dependency_overrides[get_replica_router] = lambda: ReplicaRouter([replica], eject_seconds=30)
+    headers = {'Authorization': f'Bearer {token}', 'Idempotency-Key': 'once'}
+    first = await async_client.post('/v1/catalogs/', json={'name': 'Once'}, headers=headers)
+    await cache.delete(f'primary_reads:{user.id}')
+    listing = await async_client.get('/v1/catalogs/', headers={'Authorization': f'Bearer {token}'})
+    await session.execute(sa.update(Catalog).values(name='Changed behind the API'))
+    await session.commit()
+
+    replay = await async_client.post('/v1/catalogs/', json={'name': 'Once'}, headers=headers)
+    assert replay.status_code == HTTPStatus.CREATED, f'Expected {HTTPStatus.CREATED}, got {replay.status_code}'
+    assert replay.headers['Idempotent-Replayed'] == 'true'
+    assert replay.json() == first.json()
+
+    cached = await async_client.get('/v1/catalogs/', headers={'Authorization': f'Bearer {token}'})
+    assert cached.headers['ETag'] == listing.headers['ETag']
+    assert cached.content == listing.content
+    assert await cache.get(f'primary_reads:{user.id}') is None
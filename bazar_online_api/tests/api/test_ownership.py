@@ -0,0 +1,51 @@
+import pytest
+from app.api.ownership import OwnedReferences
+from app.core.models import Catalog, Category
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from tests.factory import DataFactory
+
+
+@pytest.mark.asyncio
+async def test_owned_references_resolve_once(
+    engine: AsyncEngine, session: AsyncSession, catalog: Catalog, category: Category
+) -> None:
+    """Test that references are resolved in one query and answered from memory once known."""
+    statements: list[str] = []
+
+    def count(*args: object) -> None:
+        statements.append(str(args[2]))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', count)
+    try:
+        references = OwnedReferences(session, catalog.owner_id)
+        await references.resolve({catalog.id, 999999}, {category.id})
+        await references.resolve({catalog.id}, {category.id})
+        await references.check(catalog.id, category.id)
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', count)
+
+    assert len(statements) == 1
+    assert references.problem(catalog.id, category.id) is None
+    assert references.problem(999999, category.id) == 'Catalog not found'
+
+
+@pytest.mark.asyncio
+async def test_owned_references_resolve_names(
+    session: AsyncSession, factory: DataFactory, catalog: Catalog, category: Category
+) -> None:
+    """Test that names resolve to the IDs of the owner's catalogs and categories only, which are then owned."""
+    others = await factory.create_users(1)
+    await factory.create_catalogs(others, 1)
+    namesake = Catalog(name=catalog.name, owner_id=catalog.owner_id)
+    session.add(namesake)
+    await session.flush()
+
+    references = OwnedReferences(session, catalog.owner_id)
+    await references.resolve_names({catalog.name, 'Catalog 0'}, {category.name})
+
+    assert sorted(references.named('catalog', catalog.name)) == [catalog.id, namesake.id]
+    assert references.named('catalog', 'Catalog 0') == []
+    assert references.named('category', category.name) == [category.id]
+    assert references.problem(catalog.id, category.id) is None
@@ -0,0 +1,77 @@
+from collections.abc import AsyncIterator
+from typing import Literal
+
+import pytest
+from app.api.product_import import RECORD_TOO_LONG, parse_rows, read_csv_records, read_lines
+from app.core.schemas import ProductImportRow
+
+
+async def _stream(chunks: list[bytes]) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+async def _lines(chunks: list[bytes]) -> list[str | None]:
+    return [line async for batch in read_lines(_stream(chunks)) for line in batch]
+
+
+async def _csv_records(chunks: list[bytes]) -> list[list[str] | str]:
+    return [record async for record in read_csv_records(read_lines(_stream(chunks)))]
+
+
+async def _rows(chunks: list[bytes], import_format: Literal['ndjson', 'csv']) -> list[ProductImportRow | str]:
+    return [row async for row in parse_rows(read_lines(_stream(chunks)), import_format)]
+
+
+def _bytewise(data: bytes) -> list[bytes]:
+    return [data[i : i + 1] for i in range(len(data))]
+
+
+@pytest.mark.asyncio
+async def test_read_lines_across_chunks() -> None:
+    """Test that lines are split on newlines wherever the chunks end, even inside a UTF-8 character."""
+    data = '﻿{"name": "Café"}\n\n{"name": "Pão"}'.encode()
+    split = data.index('é'.encode()) + 1
+    expected = ['{"name": "Café"}\n', '\n', '{"name": "Pão"}']
+    assert await _lines([data[:split], data[split:]]) == expected
+    assert await _lines(_bytewise(data)) == expected
+
+
+@pytest.mark.asyncio
+async def test_read_lines_drops_long_lines() -> None:
+    """Test that a line longer than the record limit is replaced by None, even when it arrives in small chunks."""
+    data = b'{"name": "A"}\n' + b'x' * 70_000 + b'\n{"name": "B"}\n'
+    chunks = [data[i : i + 1000] for i in range(0, len(data), 1000)]
+    assert await _lines(chunks) == ['{"name": "A"}\n', None, '{"name": "B"}\n']
+
+
+@pytest.mark.asyncio
+async def test_read_csv_records_quoted_newlines() -> None:
+    """Test that a quoted field spanning lines and chunks is read as one field."""
+    data = b'name,description\r\nA,"one\r\n""two"""\r\n\r\nB,\r\n'
+    expected = [['name', 'description'], ['A', 'one\r\n"two"'], ['B', '']]
+    assert await _csv_records([data]) == expected
+    assert await _csv_records(_bytewise(data)) == expected
+
+
+@pytest.mark.asyncio
+async def test_parse_rows_quote_inside_unquoted_field() -> None:
+    """Test that a quote inside an unquoted field is a literal character and does not swallow the next rows."""
+    data = b'name,price,catalog_id,category_id\nTV 55" 4K,10,1,1\nCable,2,1,1\nMouse,3,1,1\n'
+    rows = await _rows(_bytewise(data), 'csv')
+    assert [row.name for row in rows if isinstance(row, ProductImportRow)] == ['TV 55" 4K', 'Cable', 'Mouse']
+
+
+@pytest.mark.asyncio
+async def test_parse_rows_reports_long_records() -> None:
+    """Test that a record growing past the limit, e.g. from an unclosed quote, is one row error and reading resumes."""
+    fillers = b''.join(b'Filler %d,1,1,1\n' % index for index in range(5000))
+    data = b'name,price,catalog_id,category_id\n"Open,1,1,1\n' + fillers
+    rows = await _rows([data[i : i + 4096] for i in range(0, len(data), 4096)], 'csv')
+    assert rows[0] == RECORD_TOO_LONG
+    assert all(isinstance(row, ProductImportRow) for row in rows[1:])
+    assert isinstance(rows[-1], ProductImportRow)
+    assert rows[-1].name == 'Filler 4999'
+
+    rows = await _rows([b'{"name": "', b'x' * 70_000, b'"}\n{"price": 1}\n'], 'ndjson')
+    assert [row == RECORD_TOO_LONG for row in rows] == [True, False]
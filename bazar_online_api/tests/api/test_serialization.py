@@ -0,0 +1,41 @@
+from datetime import UTC, datetime
+from decimal import Decimal
+
+import pytest
+import sqlalchemy as sa
+from app.api.serialization import encode_page, select_public
+from app.core.models import Catalog, Category, Product
+from app.core.schemas import Page, ProductPublic
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@pytest.mark.asyncio
+async def test_encode_page_matches_pydantic(session: AsyncSession, catalog: Catalog, category: Category) -> None:
+    """Test that rows encoded by the fast path serialize exactly like the `Page` model built from ORM instances."""
+    now = datetime.now(UTC)
+    session.add_all(
+        Product(
+            name=name,
+            description=description,
+            price=price,
+            catalog_id=catalog.id,
+            category_id=category.id,
+            owner_id=catalog.owner_id,
+            created_at=now,
+            updated_at=now,
+        )
+        for name, description, price in (('Lamp', 'Bright "lamp"', Decimal('19.90')), ('Chair', None, Decimal(5)))
+    )
+    await session.commit()
+
+    keys = (Product.created_at, Product.id)
+    rows = (
+        await session.execute(select_public(Product, tuple(ProductPublic.model_fields), *keys).order_by(*keys))
+    ).all()
+    products = (await session.scalars(sa.select(Product).order_by(*keys))).all()
+
+    expected = Page[ProductPublic](
+        items=[ProductPublic.model_validate(product) for product in products], next_cursor='abc'
+    ).model_dump_json()
+    assert encode_page(rows, tuple(ProductPublic.model_fields), 'abc').decode() == expected
+    assert [row.name for row in rows] == ['Lamp', 'Chair']
@@ -0,0 +1,90 @@
+from http import HTTPStatus
+
+import pytest
+import sqlalchemy as sa
+from app.core.models import Catalog
+from app.core.settings import settings
+from app.infra.slow_queries import slow_query_log
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@pytest.mark.asyncio
+async def test_slow_queries_require_admin_key(async_client: AsyncClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the slow query log is hidden without ADMIN_API_KEY and forbidden without the matching header."""
+    response = await async_client.get('/v1/admin/slow-queries', headers={'X-Admin-Key': 'anything'})
+    assert response.status_code == HTTPStatus.NOT_FOUND, f'Expected {HTTPStatus.NOT_FOUND}, got {response.status_code}'
+
+    monkeypatch.setattr(settings, 'ADMIN_API_KEY', 'admin-secret')
+    response = await async_client.get('/v1/admin/slow-queries', headers={'X-Admin-Key': 'wrong'})
+    assert response.status_code == HTTPStatus.FORBIDDEN, f'Expected {HTTPStatus.FORBIDDEN}, got {response.status_code}'
+
+
+@pytest.mark.asyncio
+async def test_list_slow_queries(
+    async_client: AsyncClient, token: str, catalog: Catalog, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that slow statements are listed with their route, bind shape and a sampled plan, and can be cleared."""
+    monkeypatch.setattr(settings, 'ADMIN_API_KEY', 'admin-secret')
+    monkeypatch.setattr(settings, 'SLOW_QUERY_THRESHOLD_SECONDS', 0)
+    monkeypatch.setattr(settings, 'SLOW_QUERY_EXPLAIN_RATE', 1)
+    slow_query_log.clear()
+    admin_headers = {'X-Admin-Key': 'admin-secret'}
+
+    response = await async_client.get(f'/v1/catalogs/{catalog.id}', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == HTTPStatus.OK
+    response = await async_client.get('/v1/admin/slow-queries', headers=admin_headers)
+    assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
+    entries = [entry for entry in response.json() if 'FROM catalogs' in entry['statement']]
+    assert len(entries) == 1
+    assert entries[0]['route'] == '/v1/catalogs/{catalog_id}'
+    assert entries[0]['bind_shape'] == '(id_1: int, owner_id_1: int)'
+    assert 'catalogs.id = ?' in entries[0]['statement']
+    assert 'cost=' in entries[0]['plan']
+    assert 'Execution Time' not in entries[0]['plan']
+
+    response = await async_client.delete('/v1/admin/slow-queries', headers=admin_headers)
+    assert response.status_code == HTTPStatus.NO_CONTENT
+    assert slow_query_log.entries() == []
+
+
+@pytest.mark.asyncio
+async def test_slow_writes_are_explained_without_running_again(
+    async_client: AsyncClient, token: str, session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a sampled slow INSERT gets a plan while the row is written only once."""
+    monkeypatch.setattr(settings, 'SLOW_QUERY_THRESHOLD_SECONDS', 0)
+    monkeypatch.setattr(settings, 'SLOW_QUERY_EXPLAIN_RATE', 1)
+    slow_query_log.clear()
+
+    payload = {'name': 'Explained', 'description': 'Written once'}
+    response = await async_client.post('/v1/catalogs/', json=payload, headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == HTTPStatus.CREATED, f'Expected {HTTPStatus.CREATED}, got {response.status_code}'
+
+    entries = [entry for entry in slow_query_log.entries() if entry.statement.startswith('INSERT INTO catalogs')]
+    assert len(entries) == 1
+    assert entries[0].plan is not None
+    assert 'Insert on catalogs' in entries[0].plan
+    assert await session.scalar(sa.select(sa.func.count()).where(Catalog.name == 'Explained')) == 1
+    slow_query_log.clear()
+
+
+@pytest.mark.asyncio
+async def test_slow_selects_are_explain_analyzed_when_enabled(
+    async_client: AsyncClient, token: str, catalog: Catalog, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that SLOW_QUERY_EXPLAIN_ANALYZE measures the plans of SELECT statements, and only of those."""
+    monkeypatch.setattr(settings, 'SLOW_QUERY_THRESHOLD_SECONDS', 0)
+    monkeypatch.setattr(settings, 'SLOW_QUERY_EXPLAIN_RATE', 1)
+    monkeypatch.setattr(settings, 'SLOW_QUERY_EXPLAIN_ANALYZE', True)
+    slow_query_log.clear()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    await async_client.get(f'/v1/catalogs/{catalog.id}', headers=headers)
+    await async_client.post('/v1/catalogs/', json={'name': 'Analyzed'}, headers=headers)
+
+    plans = {entry.statement.split()[0]: entry.plan or '' for entry in slow_query_log.entries()}
+    assert 'Execution Time' in plans['SELECT']
+    assert 'Insert on catalogs' in plans['INSERT']
+    assert 'Execution Time' not in plans['INSERT']
+    slow_query_log.clear()
@@ -1,8 +1,14 @@
+from datetime import UTC, datetime, timedelta
 from http import HTTPStatus
 from typing import TYPE_CHECKING
 
+import jwt
 import pytest
 from app.core.models import User
+from app.core.schemas import Principal
+from app.core.security import password_hasher
+from app.core.settings import settings
+from app.infra.cache import MemoryCache
 from app.main import app
 
 if TYPE_CHECKING:
@@ -10,7 +16,7 @@ if TYPE_CHECKING:
 else:
     from httpx import AsyncClient  # type: ignore[import]
 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, invalidate_principal
 
 
 @pytest.mark.asyncio
@@ -92,14 +98,13 @@ async def test_login_incorrect_credentials(async_client: AsyncClient) -> None:
 @pytest.mark.asyncio
 async def test_refresh_token(async_client: AsyncClient) -> None:
     """Test that the refresh-token endpoint returns a new access token for an authenticated user."""
-    dummy_user = User(
+    dummy_user = Principal(
         id=1,
         username='dummyuser',
         email='dummy@example.com',
-        hashed_password='dummy_hashed',
     )
 
-    async def override_get_current_user() -> User:
+    async def override_get_current_user() -> Principal:
         return dummy_user
 
     app.dependency_overrides[get_current_user] = override_get_current_user
@@ -110,3 +115,70 @@ async def test_refresh_token(async_client: AsyncClient) -> None:
     data = refresh_response.json()
     assert 'access_token' in data, 'access_token not found in refresh-token response'
     app.dependency_overrides.pop(get_current_user, None)
+
+
+@pytest.mark.asyncio
+async def test_legacy_token_principal_is_cached(async_client: AsyncClient, user: User, cache: MemoryCache) -> None:
+    """Test that a token holding only the e-mail is resolved once and then served from the principal cache."""
+    legacy_token = jwt.encode(
+        {'sub': user.email, 'exp': datetime.now(UTC) + timedelta(minutes=5)},
+        algorithm=settings.ACCESS_TOKEN_ALGORITHM,
+        key=settings.SECRET_KEY,
+    )
+    response = await async_client.get('/v1/catalogs/', headers={'Authorization': f'Bearer {legacy_token}'})
+    assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
+    cached = await cache.get(f'principal:{user.email}')
+    assert cached is not None
+    assert Principal.model_validate_json(cached) == Principal(id=user.id, email=user.email, username=user.username)
+
+    await invalidate_principal(cache, user.email)
+    assert await cache.get(f'principal:{user.email}') is None
+
+
+@pytest.mark.asyncio
+async def test_revoke_tokens(async_client: AsyncClient, token: str) -> None:
+    """Test that revoking tokens rejects the previous token and returns a working new one."""
+    response = await async_client.post('/v1/auth/revoke-tokens', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
+    new_token = response.json()['access_token']
+
+    old_resp = await async_client.get('/v1/catalogs/', headers={'Authorization': f'Bearer {token}'})
+    assert old_resp.status_code == HTTPStatus.UNAUTHORIZED, (
+        f'Expected {HTTPStatus.UNAUTHORIZED}, got {old_resp.status_code}'
+    )
+    new_resp = await async_client.get('/v1/catalogs/', headers={'Authorization': f'Bearer {new_token}'})
+    assert new_resp.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {new_resp.status_code}'
+
+
+@pytest.mark.asyncio
+async def test_revoke_tokens_rejects_legacy_token(async_client: AsyncClient, token: str, user: User) -> None:
+    """Test that a token holding only the e-mail is rejected once the user revoked their tokens."""
+    legacy_token = jwt.encode(
+        {'sub': user.email, 'exp': datetime.now(UTC) + timedelta(minutes=5)},
+        algorithm=settings.ACCESS_TOKEN_ALGORITHM,
+        key=settings.SECRET_KEY,
+    )
+    response = await async_client.get('/v1/catalogs/', headers={'Authorization': f'Bearer {legacy_token}'})
+    assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
+
+    response = await async_client.post('/v1/auth/revoke-tokens', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
+
+    response = await async_client.get('/v1/catalogs/', headers={'Authorization': f'Bearer {legacy_token}'})
+    assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+        f'Expected {HTTPStatus.UNAUTHORIZED}, got {response.status_code}'
+    )
+
+
+@pytest.mark.asyncio
+async def test_register_when_password_hasher_saturated(
+    async_client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that registration answers 503 with Retry-After while the hashing pool is saturated."""
+    monkeypatch.setattr(password_hasher, 'max_pending', 0)
+    payload = {'email': 'busy@example.com', 'username': 'busyuser', 'password': 'busypassword'}
+    response = await async_client.post('/v1/auth/register', json=payload)
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE, (
+        f'Expected {HTTPStatus.SERVICE_UNAVAILABLE}, got {response.status_code}'
+    )
+    assert response.headers['retry-after'] == '1'
@@ -1,7 +1,23 @@
 from http import HTTPStatus
+from typing import Any
 
 import pytest
+from app.core.models import Catalog, Category
+from app.infra.database import ReplicaRouter, get_replica_router
+from app.main import app
 from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker
+
+
+class CountingSessionFactory(async_sessionmaker[AsyncSession]):
+    """Session factory counting the sessions it opens."""
+
+    calls = 0
+
+    def __call__(self, **local_kw: Any) -> AsyncSession:  # noqa: ANN401
+        """Open a session and count it."""
+        self.calls += 1
+        return super().__call__(**local_kw)
 
 
 @pytest.mark.asyncio
@@ -24,7 +40,9 @@ async def test_list_catalogs(async_client: AsyncClient, token: str) -> None:
     await async_client.post('/v1/catalogs/', json=payload2, headers={'Authorization': f'Bearer {token}'})
     response = await async_client.get('/v1/catalogs/', headers={'Authorization': f'Bearer {token}'})
     assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
-    data = response.json()
+    body = response.json()
+    assert body['next_cursor'] is None
+    data = body['items']
     assert isinstance(data, list)
     expected_catalog_count = 2
     assert len(data) == expected_catalog_count, f'Expected {expected_catalog_count} catalogs, got {len(data)}'
@@ -79,3 +97,164 @@ async def test_delete_catalog(async_client: AsyncClient, token: str) -> None:
     )
     get_resp = await async_client.get(f'/v1/catalogs/{catalog_id}', headers={'Authorization': f'Bearer {token}'})
     assert get_resp.status_code == HTTPStatus.NOT_FOUND, f'Expected {HTTPStatus.NOT_FOUND}, got {get_resp.status_code}'
+
+
+@pytest.mark.asyncio
+async def test_update_catalog_not_found(async_client: AsyncClient, token: str) -> None:
+    """Test that updating a non-existent catalog returns 404."""
+    update_payload = {'name': 'NewCatalog', 'description': 'New description'}
+    response = await async_client.put(
+        '/v1/catalogs/999999', json=update_payload, headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == HTTPStatus.NOT_FOUND, f'Expected {HTTPStatus.NOT_FOUND}, got {response.status_code}'
+
+
+@pytest.mark.asyncio
+async def test_delete_catalog_cascades_products(
+    async_client: AsyncClient, token: str, catalog: Catalog, category: Category
+) -> None:
+    """Test that deleting a catalog also deletes its products."""
+    headers = {'Authorization': f'Bearer {token}'}
+    payload = {'name': 'Orphan', 'price': 1, 'catalog_id': catalog.id, 'category_id': category.id}
+    create_resp = await async_client.post('/v1/products/', json=payload, headers=headers)
+    product_id = create_resp.json()['id']
+    delete_resp = await async_client.delete(f'/v1/catalogs/{catalog.id}', headers=headers)
+    assert delete_resp.status_code == HTTPStatus.NO_CONTENT, (
+        f'Expected {HTTPStatus.NO_CONTENT}, got {delete_resp.status_code}'
+    )
+    get_resp = await async_client.get(f'/v1/products/{product_id}', headers=headers)
+    assert get_resp.status_code == HTTPStatus.NOT_FOUND, f'Expected {HTTPStatus.NOT_FOUND}, got {get_resp.status_code}'
+
+
+@pytest.mark.asyncio
+async def test_reads_use_replica_until_user_writes(
+    async_client: AsyncClient, token: str, connection: AsyncConnection
+) -> None:
+    """Test that GETs are routed to a replica, and to the primary for a while after the user writes."""
+    replica = CountingSessionFactory(
+        bind=connection, autoflush=False, expire_on_commit=False, join_transaction_mode='create_savepoint'
+    )
+    app.dependency_overrides[get_replica_router] = lambda: ReplicaRouter([replica], eject_seconds=30)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = await async_client.get('/v1/catalogs/', headers=headers)
+    assert response.status_code == HTTPStatus.OK
+    assert replica.calls == 1
+
+    payload = {'name': 'FreshCatalog', 'description': 'Just written'}
+    catalog_id = (await async_client.post('/v1/catalogs/', json=payload, headers=headers)).json()['id']
+    response = await async_client.get(f'/v1/catalogs/{catalog_id}', headers=headers)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['name'] == 'FreshCatalog'
+    assert replica.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_get_catalog_etag_and_not_modified(async_client: AsyncClient, token: str, catalog: Catalog) -> None:
+    """Test that catalog reads carry an ETag, answer a matching If-None-Match with 304, and change on update."""
+    headers = {'Authorization': f'Bearer {token}'}
+    response = await async_client.get(f'/v1/catalogs/{catalog.id}', headers=headers)
+    assert response.status_code == HTTPStatus.OK
+    etag = response.headers['ETag']
+
+    not_modified = await async_client.get(f'/v1/catalogs/{catalog.id}', headers={**headers, 'If-None-Match': etag})
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+    assert not_modified.headers['ETag'] == etag
+    assert not_modified.content == b''
+
+    payload = {'name': 'Renamed', 'description': 'Changed'}
+    await async_client.put(f'/v1/catalogs/{catalog.id}', json=payload, headers=headers)
+    response = await async_client.get(f'/v1/catalogs/{catalog.id}', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['name'] == 'Renamed'
+    assert response.headers['ETag'] != etag
+
+
+@pytest.mark.asyncio
+async def test_get_catalog_include_products(
+    async_client: AsyncClient, token: str, catalog: Catalog, category: Category
+) -> None:
+    """Test that `include=products` embeds the first page of the catalog products, kept fresh on product writes."""
+    headers = {'Authorization': f'Bearer {token}'}
+    response = await async_client.get(f'/v1/catalogs/{catalog.id}', headers=headers)
+    assert 'products' not in response.json()
+
+    response = await async_client.get(f'/v1/catalogs/{catalog.id}', params={'include': 'products'}, headers=headers)
+    assert response.json()['products'] == {'items': [], 'next_cursor': None}
+
+    payload = {'name': 'Shelf', 'price': 3, 'catalog_id': catalog.id, 'category_id': category.id}
+    await async_client.post('/v1/products/', json=payload, headers=headers)
+    response = await async_client.get(f'/v1/catalogs/{catalog.id}', params={'include': 'products'}, headers=headers)
+    assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
+    body = response.json()
+    assert body['name'] == catalog.name
+    assert [item['name'] for item in body['products']['items']] == ['Shelf']
+
+
+@pytest.mark.asyncio
+async def test_list_catalog_products(
+    async_client: AsyncClient, token: str, catalog: Catalog, category: Category
+) -> None:
+    """Test that a catalog's products are listed page by page, and that a missing catalog returns 404."""
+    headers = {'Authorization': f'Bearer {token}'}
+    other = (await async_client.post('/v1/catalogs/', json={'name': 'Other'}, headers=headers)).json()
+    for name, catalog_id in (('One', catalog.id), ('Elsewhere', other['id']), ('Two', catalog.id)):
+        payload = {'name': name, 'price': 1, 'catalog_id': catalog_id, 'category_id': category.id}
+        await async_client.post('/v1/products/', json=payload, headers=headers)
+
+    first = await async_client.get(f'/v1/catalogs/{catalog.id}/products', params={'limit': 1}, headers=headers)
+    assert first.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {first.status_code}'
+    params = {'limit': 1, 'cursor': first.json()['next_cursor']}
+    second = await async_client.get(f'/v1/catalogs/{catalog.id}/products', params=params, headers=headers)
+    assert [item['name'] for item in first.json()['items'] + second.json()['items']] == ['One', 'Two']
+    assert second.json()['next_cursor'] is None
+
+    missing = await async_client.get('/v1/catalogs/999999/products', headers=headers)
+    assert missing.status_code == HTTPStatus.NOT_FOUND, f'Expected {HTTPStatus.NOT_FOUND}, got {missing.status_code}'
+
+
+@pytest.mark.asyncio
+async def test_get_catalog_stats(async_client: AsyncClient, token: str, catalog: Catalog, category: Category) -> None:
+    """Test that catalog stats follow product creates, updates, moves, bulk writes and deletes."""
+    headers = {'Authorization': f'Bearer {token}'}
+    url = f'/v1/catalogs/{catalog.id}/stats'
+    response = await async_client.get(url, headers=headers)
+    assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
+    empty = {'product_count': 0, 'price_min': None, 'price_max': None, 'price_avg': None, 'inventory_value': '0'}
+    assert response.json() == empty
+
+    data = {'name': 'Stat', 'catalog_id': catalog.id, 'category_id': category.id}
+    ids = [
+        (await async_client.post('/v1/products/', json={**data, 'price': price}, headers=headers)).json()['id']
+        for price in (10, 20, 40)
+    ]
+    response = await async_client.get(url, headers=headers)
+    assert response.json() == {
+        'product_count': 3,
+        'price_min': '10.00',
+        'price_max': '40.00',
+        'price_avg': '23.33',
+        'inventory_value': '70.00',
+    }
+
+    other = (await async_client.post('/v1/catalogs/', json={'name': 'Other'}, headers=headers)).json()
+    await async_client.put(f'/v1/products/{ids[2]}', json={**data, 'price': 5}, headers=headers)
+    await async_client.put(
+        f'/v1/products/{ids[0]}', json={**data, 'price': 10, 'catalog_id': other['id']}, headers=headers
+    )
+    operations = [{'op': 'create', 'data': {**data, 'price': 1}}, {'op': 'delete', 'id': ids[1]}]
+    await async_client.post('/v1/products/bulk', json={'operations': operations}, headers=headers)
+    response = await async_client.get(url, headers=headers)
+    assert response.json() == {
+        'product_count': 2,
+        'price_min': '1.00',
+        'price_max': '5.00',
+        'price_avg': '3.00',
+        'inventory_value': '6.00',
+    }
+    response = await async_client.get(f'/v1/catalogs/{other["id"]}/stats', headers=headers)
+    assert response.json()['product_count'] == 1
+    assert response.json()['inventory_value'] == '10.00'
+
+    missing = await async_client.get('/v1/catalogs/999999/stats', headers=headers)
+    assert missing.status_code == HTTPStatus.NOT_FOUND, f'Expected {HTTPStatus.NOT_FOUND}, got {missing.status_code}'
@@ -1,6 +1,7 @@
 from http import HTTPStatus
 
 import pytest
+from app.core.models import Catalog, Category
 from httpx import AsyncClient
 
 
@@ -23,7 +24,9 @@ async def test_list_categories(async_client: AsyncClient, token: str) -> None:
     await async_client.post('/v1/categories/', json=payload2, headers={'Authorization': f'Bearer {token}'})
     response = await async_client.get('/v1/categories/', headers={'Authorization': f'Bearer {token}'})
     assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
-    data = response.json()
+    body = response.json()
+    assert body['next_cursor'] is None
+    data = body['items']
     assert isinstance(data, list)
     num_of_categories = 2
     assert len(data) == num_of_categories, f'Expected {num_of_categories} categories, got {len(data)}'
@@ -82,3 +85,29 @@ async def test_delete_category(async_client: AsyncClient, token: str) -> None:
     )
     get_resp = await async_client.get(f'/v1/categories/{cat_id}', headers={'Authorization': f'Bearer {token}'})
     assert get_resp.status_code == HTTPStatus.NOT_FOUND, f'Expected {HTTPStatus.NOT_FOUND}, got {get_resp.status_code}'
+
+
+@pytest.mark.asyncio
+async def test_get_category_stats(async_client: AsyncClient, token: str, catalog: Catalog, category: Category) -> None:
+    """Test that category stats drop the products removed along with their catalog."""
+    headers = {'Authorization': f'Bearer {token}'}
+    other = (await async_client.post('/v1/catalogs/', json={'name': 'Other'}, headers=headers)).json()
+    for price, catalog_id in ((3, catalog.id), (7, other['id'])):
+        payload = {'name': 'Stat', 'price': price, 'catalog_id': catalog_id, 'category_id': category.id}
+        await async_client.post('/v1/products/', json=payload, headers=headers)
+    response = await async_client.get(f'/v1/categories/{category.id}/stats', headers=headers)
+    assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
+    assert response.json()['product_count'] == 2  # noqa: PLR2004
+
+    await async_client.delete(f'/v1/catalogs/{catalog.id}', headers=headers)
+    response = await async_client.get(f'/v1/categories/{category.id}/stats', headers=headers)
+    assert response.json() == {
+        'product_count': 1,
+        'price_min': '7.00',
+        'price_max': '7.00',
+        'price_avg': '7.00',
+        'inventory_value': '7.00',
+    }
+
+    missing = await async_client.get('/v1/categories/999999/stats', headers=headers)
+    assert missing.status_code == HTTPStatus.NOT_FOUND, f'Expected {HTTPStatus.NOT_FOUND}, got {missing.status_code}'
@@ -1,12 +1,25 @@
+import csv
+import io
+import json
+from collections.abc import AsyncGenerator
 from http import HTTPStatus
+from typing import Any
 
 import pytest
-from app.core.models import Catalog, Category
+import sqlalchemy as sa
+from app.api.pagination import encode_cursor
+from app.api.v1.endpoints.product import ProductListParams, _list_query
+from app.core.models import Catalog, Category, Product, User
 from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from tests.factory import DataFactory
 
 
 @pytest.mark.asyncio
-async def test_create_product(async_client: AsyncClient, token: str, catalog: Catalog, category: Category) -> None:
+async def test_create_product(
+    async_client: AsyncClient, token: str, user: User, catalog: Catalog, category: Category
+) -> None:
     """Test that a new product can be created."""
     payload = {
         'name': 'TestProduct',
@@ -24,11 +37,13 @@ async def test_create_product(async_client: AsyncClient, token: str, catalog: Ca
     assert float(data['price']) == expected_price
     assert data['catalog_id'] == catalog.id
     assert data['category_id'] == category.id
-    assert data['owner_id'] == 1
+    assert data['owner_id'] == user.id
 
 
 @pytest.mark.asyncio
-async def test_list_products(async_client: AsyncClient, token: str, catalog: Catalog, category: Category) -> None:
+async def test_list_products(
+    async_client: AsyncClient, token: str, user: User, catalog: Catalog, category: Category
+) -> None:
     """Test that listing products returns the expected number."""
     payload1 = {
         'name': 'ProductOne',
@@ -48,12 +63,14 @@ async def test_list_products(async_client: AsyncClient, token: str, catalog: Cat
     await async_client.post('/v1/products/', json=payload2, headers={'Authorization': f'Bearer {token}'})
     response = await async_client.get('/v1/products/', headers={'Authorization': f'Bearer {token}'})
     assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
-    data = response.json()
+    body = response.json()
+    assert body['next_cursor'] is None
+    data = body['items']
     assert isinstance(data, list)
     expected_count = 2
     assert len(data) == expected_count, f'Expected {expected_count} products, got {len(data)}'
     for item in data:
-        assert item['owner_id'] == 1
+        assert item['owner_id'] == user.id
 
 
 @pytest.mark.asyncio
@@ -115,6 +132,76 @@ async def test_update_product(async_client: AsyncClient, token: str, catalog: Ca
     assert float(data['price']) == expected_price
 
 
+@pytest.mark.asyncio
+async def test_update_product_not_found(
+    async_client: AsyncClient, token: str, catalog: Catalog, category: Category
+) -> None:
+    """Test that updating a non-existent product returns a 404."""
+    update_payload = {'name': 'NewProduct', 'price': 4.44, 'catalog_id': catalog.id, 'category_id': category.id}
+    response = await async_client.put(
+        '/v1/products/999999', json=update_payload, headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == HTTPStatus.NOT_FOUND, f'Expected {HTTPStatus.NOT_FOUND}, got {response.status_code}'
+
+
+@pytest.mark.asyncio
+async def test_product_writes_reject_foreign_references(
+    async_client: AsyncClient, token: str, session: AsyncSession, catalog: Catalog, category: Category
+) -> None:
+    """Test that products referencing another user's or a missing catalog or category are rejected with 422."""
+    headers = {'Authorization': f'Bearer {token}'}
+    stranger = User(username='stranger', email='stranger@example.com', hashed_password='secret')
+    session.add(stranger)
+    await session.flush()
+    foreign_catalog = Catalog(name='Foreign', owner_id=stranger.id)
+    session.add(foreign_catalog)
+    await session.commit()
+
+    payload = {'name': 'Leak', 'price': 1, 'catalog_id': foreign_catalog.id, 'category_id': category.id}
+    response = await async_client.post('/v1/products/', json=payload, headers=headers)
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, (
+        f'Expected {HTTPStatus.UNPROCESSABLE_ENTITY}, got {response.status_code}'
+    )
+    assert response.json()['detail'] == 'Catalog not found'
+
+    payload = {**payload, 'catalog_id': catalog.id}
+    product_id = (await async_client.post('/v1/products/', json=payload, headers=headers)).json()['id']
+    response = await async_client.put(
+        f'/v1/products/{product_id}', json={**payload, 'category_id': 999999}, headers=headers
+    )
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, (
+        f'Expected {HTTPStatus.UNPROCESSABLE_ENTITY}, got {response.status_code}'
+    )
+    assert response.json()['detail'] == 'Category not found'
+    assert (await session.scalar(sa.select(sa.func.count()).select_from(Product))) == 1
+
+
+@pytest.mark.asyncio
+async def test_create_product_idempotency_key(
+    async_client: AsyncClient, token: str, session: AsyncSession, catalog: Catalog, category: Category
+) -> None:
+    """Test that retries with an Idempotency-Key replay the first response, and that a key cannot be reused."""
+    headers = {'Authorization': f'Bearer {token}', 'Idempotency-Key': 'retry-1'}
+    payload = {'name': 'Once', 'price': 2, 'catalog_id': catalog.id, 'category_id': category.id}
+    failed = await async_client.post('/v1/products/', json={**payload, 'catalog_id': 999999}, headers=headers)
+    assert failed.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, (
+        f'Expected {HTTPStatus.UNPROCESSABLE_ENTITY}, got {failed.status_code}'
+    )
+
+    first = await async_client.post('/v1/products/', json=payload, headers=headers)
+    assert first.status_code == HTTPStatus.CREATED, f'Expected {HTTPStatus.CREATED}, got {first.status_code}'
+    retry = await async_client.post('/v1/products/', json=payload, headers=headers)
+    assert retry.status_code == HTTPStatus.CREATED, f'Expected {HTTPStatus.CREATED}, got {retry.status_code}'
+    assert retry.content == first.content
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert (await session.scalar(sa.select(sa.func.count()).select_from(Product))) == 1
+
+    reused = await async_client.post('/v1/products/', json={**payload, 'name': 'Twice'}, headers=headers)
+    assert reused.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, (
+        f'Expected {HTTPStatus.UNPROCESSABLE_ENTITY}, got {reused.status_code}'
+    )
+
+
 @pytest.mark.asyncio
 async def test_delete_product(async_client: AsyncClient, token: str, catalog: Catalog, category: Category) -> None:
     """Test that a product can be deleted."""
@@ -133,3 +220,435 @@ async def test_delete_product(async_client: AsyncClient, token: str, catalog: Ca
     )
     get_resp = await async_client.get(f'/v1/products/{prod_id}', headers={'Authorization': f'Bearer {token}'})
     assert get_resp.status_code == HTTPStatus.NOT_FOUND, f'Expected {HTTPStatus.NOT_FOUND}, got {get_resp.status_code}'
+
+
+@pytest.mark.asyncio
+async def test_list_products_paginates(
+    async_client: AsyncClient, token: str, catalog: Catalog, category: Category
+) -> None:
+    """Test that listing products can be walked page by page with the returned cursor."""
+    headers = {'Authorization': f'Bearer {token}'}
+    created_ids = []
+    for i in range(5):
+        payload = {'name': f'Product{i}', 'price': 1.5, 'catalog_id': catalog.id, 'category_id': category.id}
+        create_resp = await async_client.post('/v1/products/', json=payload, headers=headers)
+        created_ids.append(create_resp.json()['id'])
+
+    page_size = 2
+    seen_ids: list[int] = []
+    params: dict[str, str | int] = {'limit': page_size}
+    for _ in range(len(created_ids)):
+        response = await async_client.get('/v1/products/', params=params, headers=headers)
+        assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
+        body = response.json()
+        assert len(body['items']) <= page_size
+        seen_ids.extend(item['id'] for item in body['items'])
+        if body['next_cursor'] is None:
+            break
+        params['cursor'] = body['next_cursor']
+
+    assert seen_ids == created_ids, f'Expected {created_ids}, got {seen_ids}'
+
+
+@pytest.mark.asyncio
+async def test_list_products_invalid_cursor(async_client: AsyncClient, token: str) -> None:
+    """Test that a malformed pagination cursor returns a 400."""
+    response = await async_client.get(
+        '/v1/products/', params={'cursor': 'not-a-cursor'}, headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST, (
+        f'Expected {HTTPStatus.BAD_REQUEST}, got {response.status_code}'
+    )
+
+
+@pytest.mark.asyncio
+async def test_list_products_sparse_fields(
+    async_client: AsyncClient, token: str, catalog: Catalog, category: Category
+) -> None:
+    """Test that `fields` restricts the returned item fields and still paginates by the hidden sort keys."""
+    headers = {'Authorization': f'Bearer {token}'}
+    for i in range(3):
+        payload = {'name': f'Sparse{i}', 'price': 2, 'catalog_id': catalog.id, 'category_id': category.id}
+        await async_client.post('/v1/products/', json=payload, headers=headers)
+
+    response = await async_client.get('/v1/products/', params={'fields': 'price, name', 'limit': 2}, headers=headers)
+    assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
+    body = response.json()
+    assert body['items'] == [{'name': 'Sparse0', 'price': '2.00'}, {'name': 'Sparse1', 'price': '2.00'}]
+
+    params = {'fields': 'name', 'cursor': body['next_cursor']}
+    response = await async_client.get('/v1/products/', params=params, headers=headers)
+    assert response.json() == {'items': [{'name': 'Sparse2'}], 'next_cursor': None}
+
+
+@pytest.mark.asyncio
+async def test_list_products_unknown_fields(async_client: AsyncClient, token: str) -> None:
+    """Test that requesting a field outside the public schema returns a 400."""
+    response = await async_client.get(
+        '/v1/products/', params={'fields': 'name,owner_password'}, headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST, (
+        f'Expected {HTTPStatus.BAD_REQUEST}, got {response.status_code}'
+    )
+    assert response.json()['detail'] == 'Unknown fields: owner_password'
+
+
+@pytest.mark.asyncio
+async def test_export_products_ndjson(
+    async_client: AsyncClient, token: str, catalog: Catalog, category: Category
+) -> None:
+    """Test that products are exported as one JSON document per line."""
+    headers = {'Authorization': f'Bearer {token}'}
+    for name in ('ExportOne', 'ExportTwo'):
+        payload = {'name': name, 'price': 7.5, 'catalog_id': catalog.id, 'category_id': category.id}
+        await async_client.post('/v1/products/', json=payload, headers=headers)
+
+    response = await async_client.get('/v1/products/export', params={'format': 'ndjson'}, headers=headers)
+    assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row['name'] for row in rows] == ['ExportOne', 'ExportTwo']
+
+
+@pytest.mark.asyncio
+async def test_export_products_csv(
+    async_client: AsyncClient, token: str, catalog: Catalog, category: Category
+) -> None:
+    """Test that products are exported as CSV with a header row."""
+    headers = {'Authorization': f'Bearer {token}'}
+    payload = {'name': 'Export, CSV', 'price': 3.25, 'catalog_id': catalog.id, 'category_id': category.id}
+    await async_client.post('/v1/products/', json=payload, headers=headers)
+
+    response = await async_client.get('/v1/products/export', params={'format': 'csv'}, headers=headers)
+    assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 1
+    assert rows[0]['name'] == 'Export, CSV'
+    assert rows[0]['catalog_id'] == str(catalog.id)
+
+
+@pytest.mark.asyncio
+async def test_import_products_csv(
+    async_client: AsyncClient, token: str, session: AsyncSession, catalog: Catalog, category: Category
+) -> None:
+    """Test that a CSV import creates and updates products by SKU and reports every skipped row.
+
+    The SKU of a row skipped for a bad reference stays free for a later row.
+    """
+    headers = {'Authorization': f'Bearer {token}'}
+    existing = {'name': 'Old name', 'price': 1, 'catalog_id': catalog.id, 'category_id': category.id}
+    await async_client.post(
+        '/v1/products/bulk', json={'operations': [{'op': 'upsert', 'sku': 'SKU-1', 'data': existing}]}, headers=headers
+    )
+    body = (
+        'name,description,price,sku,catalog,category_id\r\n'
+        f'New name,"Updated, over\ntwo lines",9.90,SKU-1,{catalog.name},{category.id}\r\n'
+        f'Without SKU,,5,,{catalog.name},{category.id}\r\n'
+        f'Bad price,,cheap,SKU-2,{catalog.name},{category.id}\r\n'
+        f'Lost,,5,SKU-3,Missing catalog,{category.id}\r\n'
+        f'Twice,,5,SKU-1,{catalog.name},{category.id}\r\n'
+        f'Foreign category,,5,SKU-4,{catalog.name},999999\r\n'
+        'Short row,5\r\n'
+        f'Found,,5,SKU-3,{catalog.name},{category.id}\r\n'
+    )
+
+    response = await async_client.post('/v1/products/import', params={'format': 'csv'}, content=body, headers=headers)
+    assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
+    result = response.json()
+    assert {key: result[key] for key in ('rows', 'created', 'updated', 'invalid')} == {
+        'rows': 8,
+        'created': 2,
+        'updated': 1,
+        'invalid': 5,
+    }
+    assert [(error['row'], error['detail']) for error in result['errors']] == [
+        (3, 'price: Input should be a valid decimal'),
+        (4, "Catalog 'Missing catalog' not found"),
+        (5, 'Duplicate SKU in file'),
+        (6, 'Category not found'),
+        (7, 'Expected 6 fields, got 2'),
+    ]
+    products = (await session.execute(sa.select(Product.name, Product.description, Product.sku))).all()
+    assert sorted(products) == [
+        ('Found', None, 'SKU-3'),
+        ('New name', 'Updated, over\ntwo lines', 'SKU-1'),
+        ('Without SKU', None, None),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_import_products_ndjson_round_trip(
+    async_client: AsyncClient, token: str, catalog: Catalog, category: Category
+) -> None:
+    """Test that an NDJSON export can be imported back, updating the products that have a SKU."""
+    headers = {'Authorization': f'Bearer {token}'}
+    data = {'name': 'RoundTrip', 'price': 4, 'catalog_id': catalog.id, 'category_id': category.id}
+    operations = [{'op': 'upsert', 'sku': f'RT-{index}', 'data': data} for index in range(3)]
+    await async_client.post('/v1/products/bulk', json={'operations': operations}, headers=headers)
+    export = await async_client.get('/v1/products/export', params={'format': 'ndjson'}, headers=headers)
+
+    async def chunks() -> AsyncGenerator[bytes, None]:
+        for index in range(0, len(export.content), 7):
+            yield export.content[index : index + 7]
+
+    response = await async_client.post('/v1/products/import', content=chunks(), headers=headers)
+    assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
+    assert response.json() == {'rows': 3, 'created': 0, 'updated': 3, 'invalid': 0, 'errors': []}
+
+
+@pytest.mark.asyncio
+async def test_import_products_rejects_non_utf8(
+    async_client: AsyncClient, token: str, session: AsyncSession, catalog: Catalog, category: Category
+) -> None:
+    """Test that an import file that is not UTF-8 is rejected with 422 without writing anything."""
+    body = f'name,price,catalog_id,category_id\r\nCaf\u00e9,1,{catalog.id},{category.id}\r\n'.encode('latin-1')
+    response = await async_client.post(
+        '/v1/products/import',
+        params={'format': 'csv'},
+        content=body,
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, (
+        f'Expected {HTTPStatus.UNPROCESSABLE_ENTITY}, got {response.status_code}'
+    )
+    assert response.json()['detail'] == 'The file must be encoded in UTF-8'
+    assert await session.scalar(sa.select(sa.func.count()).select_from(Product)) == 0
+
+
+@pytest.mark.asyncio
+async def test_import_products_csv_requires_columns(async_client: AsyncClient, token: str) -> None:
+    """Test that a CSV import whose header lacks required columns is rejected with 422."""
+    response = await async_client.post(
+        '/v1/products/import',
+        params={'format': 'csv'},
+        content='name,price,catalog_id\r\nThing,1,1\r\n',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, (
+        f'Expected {HTTPStatus.UNPROCESSABLE_ENTITY}, got {response.status_code}'
+    )
+    assert response.json()['detail'] == 'CSV header lacks the columns: category_id or category'
+
+
+@pytest.mark.asyncio
+async def test_bulk_products(async_client: AsyncClient, token: str, catalog: Catalog, category: Category) -> None:
+    """Test that a batch of creates, upserts and deletes returns one result per operation."""
+    headers = {'Authorization': f'Bearer {token}'}
+    expected_price = 12.5
+    data = {'name': 'BulkProduct', 'price': 10, 'catalog_id': catalog.id, 'category_id': category.id}
+    create_resp = await async_client.post('/v1/products/', json=data, headers=headers)
+    existing_id = create_resp.json()['id']
+
+    operations = [
+        {'op': 'create', 'data': data},
+        {'op': 'upsert', 'sku': 'SKU-1', 'data': data},
+        {'op': 'delete', 'id': existing_id},
+        {'op': 'delete', 'id': 999999},
+        {'op': 'create', 'data': {**data, 'catalog_id': 999999}},
+    ]
+    response = await async_client.post('/v1/products/bulk', json={'operations': operations}, headers=headers)
+    assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
+    results = response.json()
+    assert [result['status'] for result in results] == ['created', 'created', 'deleted', 'not_found', 'invalid']
+    assert results[4]['detail'] == 'Catalog not found'
+    upserted_id = results[1]['id']
+
+    operations = [{'op': 'upsert', 'sku': 'SKU-1', 'data': {**data, 'name': 'Renamed', 'price': 12.5}}]
+    response = await async_client.post('/v1/products/bulk', json={'operations': operations}, headers=headers)
+    assert response.json() == [
+        {'index': 0, 'op': 'upsert', 'status': 'updated', 'id': upserted_id, 'detail': None},
+    ]
+    get_resp = await async_client.get(f'/v1/products/{upserted_id}', headers=headers)
+    product = get_resp.json()
+    assert product['name'] == 'Renamed'
+    assert product['sku'] == 'SKU-1'
+    assert float(product['price']) == expected_price
+    get_resp = await async_client.get(f'/v1/products/{existing_id}', headers=headers)
+    assert get_resp.status_code == HTTPStatus.NOT_FOUND, f'Expected {HTTPStatus.NOT_FOUND}, got {get_resp.status_code}'
+
+
+@pytest.mark.asyncio
+async def test_bulk_products_rejects_touching_a_product_twice(
+    async_client: AsyncClient, token: str, catalog: Catalog, category: Category
+) -> None:
+    """Test that operations touching a product already touched by the batch are reported as invalid."""
+    headers = {'Authorization': f'Bearer {token}'}
+    data = {'name': 'BulkProduct', 'price': 10, 'catalog_id': catalog.id, 'category_id': category.id}
+    operations = [{'op': 'upsert', 'sku': 'SKU-1', 'data': data}, {'op': 'create', 'data': data}]
+    response = await async_client.post('/v1/products/bulk', json={'operations': operations}, headers=headers)
+    upserted_id, created_id = (result['id'] for result in response.json())
+
+    operations = [
+        {'op': 'delete', 'id': upserted_id},
+        {'op': 'upsert', 'sku': 'SKU-1', 'data': {**data, 'name': 'Renamed'}},
+        {'op': 'upsert', 'sku': 'SKU-1', 'data': data},
+        {'op': 'delete', 'id': created_id},
+        {'op': 'delete', 'id': created_id},
+    ]
+    response = await async_client.post('/v1/products/bulk', json={'operations': operations}, headers=headers)
+    assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
+    assert [(result['status'], result['detail']) for result in response.json()] == [
+        ('invalid', 'Product is also upserted in batch'),
+        ('updated', None),
+        ('invalid', 'Duplicate SKU in batch'),
+        ('deleted', None),
+        ('invalid', 'Duplicate ID in batch'),
+    ]
+    get_resp = await async_client.get(f'/v1/products/{upserted_id}', headers=headers)
+    assert get_resp.json()['name'] == 'Renamed'
+
+
+@pytest.mark.asyncio
+async def test_list_products_served_from_cache_until_write(
+    async_client: AsyncClient, token: str, session: AsyncSession, catalog: Catalog, category: Category
+) -> None:
+    """Test that a repeated list is served from the response cache, and that a product write invalidates it."""
+    headers = {'Authorization': f'Bearer {token}'}
+    payload = {'name': 'Cached', 'price': 1, 'catalog_id': catalog.id, 'category_id': category.id}
+    await async_client.post('/v1/products/', json=payload, headers=headers)
+    first = await async_client.get('/v1/products/', headers=headers)
+
+    await session.execute(sa.update(Product).values(name='Changed behind the API'))
+    await session.commit()
+    cached = await async_client.get('/v1/products/', headers=headers)
+    assert cached.content == first.content
+    assert cached.headers['ETag'] == first.headers['ETag']
+
+    await async_client.post('/v1/products/', json={**payload, 'name': 'Another'}, headers=headers)
+    fresh = await async_client.get('/v1/products/', headers=headers)
+    assert [item['name'] for item in fresh.json()['items']] == ['Changed behind the API', 'Another']
+
+
+@pytest.mark.asyncio
+async def test_search_products(async_client: AsyncClient, token: str, catalog: Catalog, category: Category) -> None:
+    """Test that search ranks full-text matches, and catches prefixes and typos through trigram similarity."""
+    headers = {'Authorization': f'Bearer {token}'}
+    products = [
+        ('Leather jacket', 'Vintage brown jacket'),
+        ('Wool scarf', 'Goes well with a leather jacket'),
+        ('Cotton shirt', 'Plain white shirt'),
+    ]
+    for name, description in products:
+        payload = {
+            'name': name,
+            'description': description,
+            'price': 10,
+            'catalog_id': catalog.id,
+            'category_id': category.id,
+        }
+        await async_client.post('/v1/products/', json=payload, headers=headers)
+
+    async def search(q: str) -> list[str]:
+        response = await async_client.get('/v1/products/search', params={'q': q, 'fields': 'name'}, headers=headers)
+        assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
+        return [item['name'] for item in response.json()['items']]
+
+    assert await search('leather jacket') == ['Leather jacket', 'Wool scarf']
+    assert await search('leath') == ['Leather jacket']
+    assert await search('jaket') == ['Leather jacket']
+    assert await search('sweater') == []
+
+
+@pytest.mark.asyncio
+async def test_search_products_paginates(
+    async_client: AsyncClient, token: str, catalog: Catalog, category: Category
+) -> None:
+    """Test that ranked search results can be walked page by page without gaps or repeats."""
+    headers = {'Authorization': f'Bearer {token}'}
+    for i in range(5):
+        payload = {'name': f'Lamp {i}', 'price': 1, 'catalog_id': catalog.id, 'category_id': category.id}
+        await async_client.post('/v1/products/', json=payload, headers=headers)
+
+    seen: list[str] = []
+    params: dict[str, str | int] = {'q': 'lamp', 'limit': 2, 'fields': 'name'}
+    while True:
+        body = (await async_client.get('/v1/products/search', params=params, headers=headers)).json()
+        seen.extend(item['name'] for item in body['items'])
+        if body['next_cursor'] is None:
+            break
+        params['cursor'] = body['next_cursor']
+
+    assert seen == [f'Lamp {i}' for i in reversed(range(5))]
+
+
+@pytest.mark.asyncio
+async def test_search_products_uses_indexes(session: AsyncSession) -> None:
+    """Test that both search conditions can be answered from their GIN indexes."""
+    await session.execute(sa.text('SET LOCAL enable_seqscan = off'))
+    plan = await session.scalars(
+        sa.text(
+            "EXPLAIN SELECT id FROM products WHERE search_vector @@ websearch_to_tsquery('simple', :q) OR name %> :q"
+        ),
+        {'q': 'lamp'},
+    )
+    plan_text = '\n'.join(plan)
+    assert 'ix_products_search_vector' in plan_text
+    assert 'ix_products_name_trgm' in plan_text
+
+
+@pytest.mark.asyncio
+async def test_list_products_filters_and_sort(
+    async_client: AsyncClient, token: str, catalog: Catalog, category: Category
+) -> None:
+    """Test that the listing filters and sort order are applied, including across pages."""
+    headers = {'Authorization': f'Bearer {token}'}
+    other = (await async_client.post('/v1/catalogs/', json={'name': 'Other'}, headers=headers)).json()
+    for name, price, catalog_id in (
+        ('A', 5, catalog.id),
+        ('B', 15, catalog.id),
+        ('C', 25, catalog.id),
+        ('D', 15, other['id']),
+    ):
+        payload = {'name': name, 'price': price, 'catalog_id': catalog_id, 'category_id': category.id}
+        await async_client.post('/v1/products/', json=payload, headers=headers)
+
+    async def names(**params: str | int) -> list[str]:
+        result: list[str] = []
+        while True:
+            response = await async_client.get('/v1/products/', params={'fields': 'name', **params}, headers=headers)
+            assert response.status_code == HTTPStatus.OK, f'Expected {HTTPStatus.OK}, got {response.status_code}'
+            body = response.json()
+            result.extend(item['name'] for item in body['items'])
+            if body['next_cursor'] is None:
+                return result
+            params['cursor'] = body['next_cursor']
+
+    assert await names(catalog_id=catalog.id) == ['A', 'B', 'C']
+    assert await names(category_id=category.id, price_min=10, price_max=20) == ['B', 'D']
+    assert await names(sort='-price', limit=1) == ['C', 'D', 'B', 'A']
+    assert await names(catalog_id=other['id'], sort='-name') == ['D']
+    assert await names(created_after='2999-01-01T00:00:00Z') == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ('params', 'index'),
+    [
+        ({}, 'ix_products_owner_id_created_at_id'),
+        ({'catalog_id': 0}, 'ix_products_owner_id_catalog_id_created_at_id'),
+        ({'category_id': 0, 'sort': '-created_at'}, 'ix_products_owner_id_category_id_created_at_id'),
+        ({'price_min': 10, 'price_max': 20, 'sort': 'price'}, 'ix_products_owner_id_price_id'),
+        ({'sort': '-name', 'cursor': encode_cursor(['m', 10])}, 'ix_products_owner_id_name_id'),
+    ],
+)
+async def test_list_products_query_plans(
+    session: AsyncSession, factory: DataFactory, user: User, params: dict[str, Any], index: str
+) -> None:
+    """Test that each filter and sort combination is an index range scan returning rows already in order.
+
+    `catalog_id` and `category_id` are positions in the owner's seeded catalogs and categories.
+    """
+    catalogs = await factory.create_catalogs([user.id], 20)
+    categories = await factory.create_categories([user.id], 20)
+    await factory.create_products({user.id: 5000}, catalogs, categories)
+    await factory.analyze()
+    seeded = {'catalog_id': catalogs[user.id], 'category_id': categories[user.id]}
+    params = {key: seeded[key][value] if key in seeded else value for key, value in params.items()}
+    query, _ = _list_query(user.id, ProductListParams(**params), ('id', 'name'))
+    connection = await session.connection()
+    compiled = query.compile(dialect=connection.dialect)
+    plan = '\n'.join((await connection.exec_driver_sql(f'EXPLAIN {compiled}', compiled.params)).scalars())
+    assert index in plan, plan
+    assert 'Sort' not in plan, plan
+    assert 'Seq Scan' not in plan, plan
@@ -0,0 +1,251 @@
+"""Fixtures of the benchmark suite.
+
+Benchmarks are marked `benchmark` and deselected by default; run them with `make benchmark`. Each one reports its
+p50/p95/p99 latency and throughput, and fails when its p95 (p50 for short runs) or throughput are more than
+BENCHMARK_TOLERANCE (default 0.25, i.e. 25%) worse than the baseline saved in `baselines.json`. Record new
+baselines with `make benchmark-baseline` on the machine the suite is compared on.
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import time
+from collections.abc import AsyncGenerator, Awaitable, Callable, Iterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Literal
+
+import httpx
+import pytest
+import pytest_asyncio
+import sqlalchemy as sa
+import uvicorn
+from app.core.models import User
+from app.core.security import create_access_token, get_password_hash
+from app.infra.cache import MemoryCache, get_cache
+from app.infra.database import get_session, get_session_factory
+from app.main import app
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from tests.factory import DataFactory
+
+BASELINES_PATH = Path(__file__).with_name('baselines.json')
+TOLERANCE = float(os.environ.get('BENCHMARK_TOLERANCE', '0.25'))
+SAVE_BASELINES = os.environ.get('BENCHMARK_SAVE') == '1'
+
+PASSWORD = 'benchmark-password'
+USER_COUNT = 100
+CATALOGS_PER_USER = 5
+CATEGORIES_PER_USER = 10
+PRODUCTS_PER_USER = 100
+NAMED_USERS = ('small', 'large', 'bulk')
+
+type Request = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+class Dataset:
+    """Seeded users and the access tokens of the ones the benchmarks act as."""
+
+    def __init__(self, users: dict[str, User], catalogs: dict[int, range], categories: dict[int, range]) -> None:
+        """Describe the benchmarks' `users` by name, and every user's catalog and category IDs by owner ID."""
+        self.users = users
+        self.catalogs = catalogs
+        self.categories = categories
+
+    def token(self, name: str) -> str:
+        """Access token of the user called `name` by the benchmarks."""
+        user = self.users[name]
+        return create_access_token(
+            user_id=user.id, email=user.email, username=user.username, token_version=user.token_version
+        )
+
+    def headers(self, name: str) -> dict[str, str]:
+        """Authorization header of the user called `name` by the benchmarks."""
+        return {'Authorization': f'Bearer {self.token(name)}'}
+
+
+@pytest_asyncio.fixture(scope='package')
+async def bench_engine(engine: AsyncEngine) -> AsyncGenerator[AsyncEngine, None]:
+    """Engine on the test database without statement echoing, which would dominate the measurements."""
+    bench_engine = create_async_engine(engine.url, pool_size=20, max_overflow=0)
+    yield bench_engine
+    await bench_engine.dispose()
+
+
+@pytest_asyncio.fixture(scope='package')
+async def dataset(bench_engine: AsyncEngine) -> AsyncGenerator[Dataset, None]:
+    """Seed many users with catalogs, categories and products with COPY, and delete them after the benchmarks.
+
+    `small` owns 1k products, `large` 100k and every other user PRODUCTS_PER_USER; `bulk` owns none and takes the
+    bulk writes.
+    """
+    async with bench_engine.begin() as conn:
+        factory = DataFactory(conn)
+        user_ids = await factory.create_users(
+            USER_COUNT + len(NAMED_USERS), hashed_password=get_password_hash(PASSWORD)
+        )
+        catalogs = await factory.create_catalogs(user_ids, CATALOGS_PER_USER)
+        categories = await factory.create_categories(user_ids, CATEGORIES_PER_USER)
+        named = dict(zip(NAMED_USERS, user_ids, strict=False))
+        product_counts = dict.fromkeys(user_ids, PRODUCTS_PER_USER) | {
+            named['small']: 1_000,
+            named['large']: 100_000,
+            named['bulk']: 0,
+        }
+        await factory.create_products(product_counts, catalogs, categories)
+        await factory.analyze()
+        users = {user.id: user for user in await AsyncSession(conn).scalars(sa.select(User))}
+
+    yield Dataset({name: users[user_id] for name, user_id in named.items()}, catalogs, categories)
+
+    async with bench_engine.begin() as conn:
+        await conn.execute(sa.text('TRUNCATE users, catalogs, categories, products, idempotency_keys CASCADE'))
+
+
+@asynccontextmanager
+async def _serve(server: uvicorn.Server) -> AsyncGenerator[str, None]:
+    task = asyncio.create_task(server.serve())
+    while not server.started:  # noqa: ASYNC110 - Uvicorn only exposes a flag
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    yield f'http://127.0.0.1:{port}'
+    server.should_exit = True
+    await task
+
+
+@pytest_asyncio.fixture(scope='package', params=['asgi', 'uvicorn'])
+async def bench_client(
+    request: pytest.FixtureRequest, bench_engine: AsyncEngine
+) -> AsyncGenerator[httpx.AsyncClient, None]:
+    """Client driving the app in-process over ASGI, or over HTTP through a local Uvicorn server.
+
+    Every request gets its own session from a pool of 20 connections, as in production.
+    """
+    session_factory = async_sessionmaker(bind=bench_engine, autoflush=False, expire_on_commit=False)
+
+    async def get_session_overrides() -> AsyncGenerator[AsyncSession, None]:
+        async with session_factory() as session:
+            yield session
+
+    cache = MemoryCache(max_entries=100_000)
+    app.dependency_overrides[get_session] = get_session_overrides
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    app.dependency_overrides[get_cache] = lambda: cache
+    limits = httpx.Limits(max_connections=100, max_keepalive_connections=100)
+    if request.param == 'asgi':
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench', limits=limits) as client:
+            yield client
+    else:
+        config = uvicorn.Config(app, host='127.0.0.1', port=0, lifespan='off', log_level='warning', access_log=False)
+        async with (
+            _serve(uvicorn.Server(config)) as base_url,
+            httpx.AsyncClient(base_url=base_url, limits=limits) as client,
+        ):
+            yield client
+    app.dependency_overrides.clear()
+
+
+class BenchmarkResult:
+    """Latency distribution and throughput of a benchmark run."""
+
+    def __init__(self, latencies: list[float], elapsed: float) -> None:
+        """Summarize the per-request `latencies` of a run that took `elapsed` seconds, all in seconds."""
+        percentiles = statistics.quantiles(latencies, n=100, method='inclusive')
+        self.requests = len(latencies)
+        self.p50_ms = percentiles[49] * 1000
+        self.p95_ms = percentiles[94] * 1000
+        self.p99_ms = percentiles[98] * 1000
+        self.rps = len(latencies) / elapsed
+
+    def as_baseline(self) -> dict[str, float]:
+        """Figures of the run compared against later runs."""
+        return {'p50_ms': round(self.p50_ms, 3), 'p95_ms': round(self.p95_ms, 3), 'rps': round(self.rps, 1)}
+
+    def __str__(self) -> str:
+        """One-line report of the run."""
+        return (
+            f'{self.requests} requests, p50 {self.p50_ms:.2f} ms, p95 {self.p95_ms:.2f} ms, '
+            f'p99 {self.p99_ms:.2f} ms, {self.rps:.1f} req/s'
+        )
+
+
+class Benchmark:
+    """Runs a request many times from concurrent workers and checks the result against the saved baseline."""
+
+    def __init__(
+        self, name: str, client: httpx.AsyncClient, baselines: dict[str, dict[str, float]], results: dict[str, Any]
+    ) -> None:
+        """Benchmark `name` through `client`, comparing with `baselines` and recording into `results`."""
+        self.name = name
+        self.client = client
+        self.baselines = baselines
+        self.results = results
+
+    async def __call__(  # noqa: PLR0913
+        self,
+        request: Request,
+        *,
+        requests: int,
+        concurrency: int,
+        warmup: int = 5,
+        status_code: int = 200,
+        percentile: Literal['p50', 'p95'] = 'p95',
+    ) -> BenchmarkResult:
+        """Send `request` `requests` times from `concurrency` workers, after `warmup` unmeasured requests.
+
+        The latency `percentile` is compared with the baseline; runs too short for a stable p95 compare the p50.
+        """
+        for _ in range(warmup):
+            await request(self.client)
+        latencies: list[float] = []
+
+        async def worker(count: int) -> None:
+            for _ in range(count):
+                start = time.perf_counter()
+                response = await request(self.client)
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == status_code, response.text
+
+        start = time.perf_counter()
+        share, extra = divmod(requests, concurrency)
+        await asyncio.gather(*(worker(share + (index < extra)) for index in range(concurrency)))
+        result = BenchmarkResult(latencies, time.perf_counter() - start)
+        print(f'\n{self.name}: {result}')  # noqa: T201
+        self.results[self.name] = result.as_baseline()
+        self._compare(result, percentile)
+        return result
+
+    def _compare(self, result: BenchmarkResult, percentile: Literal['p50', 'p95']) -> None:
+        baseline = self.baselines.get(self.name)
+        if baseline is None or SAVE_BASELINES:
+            return
+        key = f'{percentile}_ms'
+        latency = result.p50_ms if percentile == 'p50' else result.p95_ms
+        assert latency <= baseline[key] * (1 + TOLERANCE), (
+            f'{self.name}: {percentile} regressed from {baseline[key]:.2f} ms to {latency:.2f} ms'
+        )
+        assert result.rps >= baseline['rps'] / (1 + TOLERANCE), (
+            f'{self.name}: throughput regressed from {baseline["rps"]:.1f} to {result.rps:.1f} req/s'
+        )
+
+
+@pytest.fixture(scope='package')
+def benchmark_results() -> Iterator[dict[str, Any]]:
+    """Results of the benchmarks run, saved as the new baselines when BENCHMARK_SAVE=1."""
+    results: dict[str, Any] = {}
+    yield results
+    if SAVE_BASELINES and results:
+        baselines = json.loads(BASELINES_PATH.read_text()) if BASELINES_PATH.exists() else {}
+        baselines.update(results)
+        BASELINES_PATH.write_text(json.dumps(dict(sorted(baselines.items())), indent=2) + '\n')
+
+
+@pytest.fixture
+def benchmark(
+    request: pytest.FixtureRequest, bench_client: httpx.AsyncClient, benchmark_results: dict[str, Any]
+) -> Benchmark:
+    """Benchmark runner named after the test and its parameters."""
+    baselines = json.loads(BASELINES_PATH.read_text()) if BASELINES_PATH.exists() else {}
+    return Benchmark(request.node.name, bench_client, baselines, benchmark_results)
@@ -0,0 +1,67 @@
+import itertools
+from decimal import Decimal
+
+import httpx
+import pytest
+
+from tests.benchmarks.conftest import PASSWORD, Benchmark, Dataset
+
+# The Uvicorn server of `bench_client` runs as a task of the session event loop, which the tests must share.
+pytestmark = [pytest.mark.benchmark, pytest.mark.asyncio(loop_scope='session')]
+
+
+async def test_login(benchmark: Benchmark, dataset: Dataset) -> None:
+    """Password login, bound by bcrypt running on the hashing pool.
+
+    bcrypt keeps the run short, too short for a stable p95, so the p50 is compared with the baseline instead.
+    """
+    form = {'username': dataset.users['small'].email, 'password': PASSWORD}
+    await benchmark(
+        lambda client: client.post('/v1/auth/login', data=form),
+        requests=40,
+        concurrency=4,
+        warmup=1,
+        percentile='p50',
+    )
+
+
+async def test_current_user(benchmark: Benchmark, dataset: Dataset) -> None:
+    """Token refresh, which only authenticates the user: JWT decoding and the token version check."""
+    headers = dataset.headers('small')
+    await benchmark(
+        lambda client: client.post('/v1/auth/refresh-token', headers=headers), requests=2000, concurrency=20
+    )
+
+
+@pytest.mark.parametrize('username', ['small', 'large'])
+async def test_list_products(benchmark: Benchmark, dataset: Dataset, username: str) -> None:
+    """First page of the products listing of a user owning 1k or 100k products, sorted by price.
+
+    Every request uses a distinct `price_min` so that it misses the response cache and reaches the database.
+    """
+    headers = dataset.headers(username)
+    price_mins = (Decimal(index) / 1000 for index in itertools.count())
+
+    async def request(client: httpx.AsyncClient) -> httpx.Response:
+        params = {'sort': '-price', 'price_min': str(next(price_mins))}
+        return await client.get('/v1/products/', params=params, headers=headers)
+
+    await benchmark(request, requests=1000, concurrency=20)
+
+
+async def test_list_products_cached(benchmark: Benchmark, dataset: Dataset) -> None:
+    """Repeated products listing of the 100k products user, answered from the response cache."""
+    headers = dataset.headers('large')
+    await benchmark(lambda client: client.get('/v1/products/', headers=headers), requests=2000, concurrency=20)
+
+
+async def test_bulk_create_products(benchmark: Benchmark, dataset: Dataset) -> None:
+    """Batches of 100 product creations."""
+    owner = dataset.users['bulk']
+    catalog_id, category_id = dataset.catalogs[owner.id][0], dataset.categories[owner.id][0]
+    data = {'name': 'Bulk product', 'price': '9.90', 'catalog_id': catalog_id, 'category_id': category_id}
+    batch = {'operations': [{'op': 'create', 'data': data}] * 100}
+    headers = dataset.headers('bulk')
+    await benchmark(
+        lambda client: client.post('/v1/products/bulk', json=batch, headers=headers), requests=100, concurrency=4
+    )
@@ -1,15 +1,19 @@
 from collections.abc import AsyncGenerator
 from datetime import UTC, datetime
 
+import pytest
 import pytest_asyncio
 import sqlalchemy as sa
 from app.core.models import Base, Catalog, Category, User
 from app.core.security import create_access_token
-from app.infra.database import get_session
+from app.infra.cache import MemoryCache, get_cache
+from app.infra.database import configure_search, get_session, get_session_factory
+from app.infra.profiling import track_queries
 from app.main import app
 from httpx import ASGITransport, AsyncClient
 from pydantic_core import MultiHostUrl
 from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
@@ -17,10 +21,12 @@ from sqlalchemy.ext.asyncio import (
 )
 from testcontainers.postgres import PostgresContainer  # type: ignore[import-untyped]
 
+from tests.factory import DataFactory
+
 
 @pytest_asyncio.fixture(scope='session')
 async def engine() -> AsyncGenerator[AsyncEngine, None]:
-    """SQLAlchemy DB Engine for testing purposes."""
+    """SQLAlchemy DB Engine for testing purposes, on a database whose tables are created once per session."""
     with PostgresContainer('postgres:16') as postgres:
         url = MultiHostUrl.build(
             scheme='postgresql+psycopg',
@@ -31,10 +37,12 @@ async def engine() -> AsyncGenerator[AsyncEngine, None]:
             path=postgres.dbname,
         )
         engine = create_async_engine(url=url.unicode_string(), echo=True, future=True)
+        track_queries(engine.sync_engine)
+        configure_search(engine.sync_engine)
 
-        async with engine.connect() as conn:
+        async with engine.begin() as conn:
             await conn.execute(sa.text('CREATE SCHEMA IF NOT EXISTS meu_brecho'))
-            await conn.commit()
+            await conn.run_sync(Base.metadata.create_all)
 
         yield engine
 
@@ -42,27 +50,53 @@ async def engine() -> AsyncGenerator[AsyncEngine, None]:
 
 
 @pytest_asyncio.fixture
-async def session(engine: AsyncEngine) -> AsyncGenerator[AsyncSession, None]:
-    """SQLAlchemy DB Session for testing purposes."""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+async def connection(engine: AsyncEngine) -> AsyncGenerator[AsyncConnection, None]:
+    """DB connection in a transaction that is rolled back after the test, discarding everything it wrote."""
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        yield conn
+        await transaction.rollback()
+
+
+@pytest.fixture
+def session_factory(connection: AsyncConnection) -> async_sessionmaker[AsyncSession]:
+    """Factory of sessions joining the test's transaction, whose commits and rollbacks only affect a savepoint."""
+    return async_sessionmaker(
+        bind=connection, autoflush=False, expire_on_commit=False, join_transaction_mode='create_savepoint'
+    )
 
-    async_session = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
-    async with async_session() as session:
+
+@pytest_asyncio.fixture
+async def session(session_factory: async_sessionmaker[AsyncSession]) -> AsyncGenerator[AsyncSession, None]:
+    """SQLAlchemy DB Session for testing purposes."""
+    async with session_factory() as session:
         yield session
 
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
+
+@pytest.fixture
+def factory(connection: AsyncConnection) -> DataFactory:
+    """COPY-based generator of large datasets, rolled back with the test's transaction."""
+    return DataFactory(connection)
 
 
 @pytest_asyncio.fixture
-async def async_client(session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+async def cache() -> MemoryCache:
+    """Empty in-memory cache backend for a single test."""
+    return MemoryCache(max_entries=1000)
+
+
+@pytest_asyncio.fixture
+async def async_client(
+    session_factory: async_sessionmaker[AsyncSession], session: AsyncSession, cache: MemoryCache
+) -> AsyncGenerator[AsyncClient, None]:
     """Async Test Client using httpx."""
 
     async def get_session_overrides() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
     app.dependency_overrides[get_session] = get_session_overrides
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    app.dependency_overrides[get_cache] = lambda: cache
     transport = ASGITransport(app=app)
 
     async with AsyncClient(transport=transport, base_url='http://test') as client:
@@ -89,7 +123,9 @@ async def user(session: AsyncSession) -> User:
 @pytest_asyncio.fixture
 async def token(user: User) -> str:
     """Generate an access token for the dummy user."""
-    return create_access_token(email=user.email)
+    return create_access_token(
+        user_id=user.id, email=user.email, username=user.username, token_version=user.token_version
+    )
 
 
 @pytest_asyncio.fixture
@@ -0,0 +1,23 @@
+import ast
+from pathlib import Path
+
+from app.core.models import PRODUCT_STATS_FUNCTION, PRODUCT_STATS_TRIGGERS
+
+STATS_MIGRATION = (
+    Path(__file__).parents[2] / 'alembic' / 'versions' / '3b9e5d0c8a41_add_catalog_and_category_statistics.py'
+)
+
+
+def test_product_stats_sql_matches_migration() -> None:
+    """Test that the trigger SQL run by create_all is the one the statistics migration installs."""
+    constants = {
+        target.id: ast.literal_eval(node.value)
+        for node in ast.parse(STATS_MIGRATION.read_text()).body
+        if isinstance(node, ast.Assign)
+        for target in node.targets
+        if isinstance(target, ast.Name) and target.id.startswith('PRODUCT_STATS_')
+    }
+    assert constants == {
+        'PRODUCT_STATS_FUNCTION': PRODUCT_STATS_FUNCTION,
+        'PRODUCT_STATS_TRIGGERS': PRODUCT_STATS_TRIGGERS,
+    }
@@ -0,0 +1,27 @@
+import asyncio
+
+import pytest
+from app.core.security import PasswordHasher, PasswordHasherBusyError
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_round_trip() -> None:
+    """Test that a hash produced on the pool verifies against the original password only."""
+    hasher = PasswordHasher(max_workers=1, max_pending=2)
+    hashed = await hasher.hash('secret-password')
+    assert await hasher.verify('secret-password', hashed)
+    assert not await hasher.verify('wrong-password', hashed)
+    assert hasher.pending == 0
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_rejects_when_saturated() -> None:
+    """Test that jobs beyond the pending limit are rejected instead of queued."""
+    hasher = PasswordHasher(max_workers=1, max_pending=1)
+    running = asyncio.create_task(hasher.hash('secret-password'))
+    await asyncio.sleep(0)
+    with pytest.raises(PasswordHasherBusyError):
+        await hasher.hash('another-password')
+    await running
+    hasher.shutdown()
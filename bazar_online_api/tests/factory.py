@@ -0,0 +1,134 @@
+from collections.abc import Iterator, Mapping, Sequence
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+from typing import Any
+
+import sqlalchemy as sa
+from app.infra.copy import copy_rows
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+HASHED_PASSWORD = 'hashed-password'
+USER_COLUMNS = ('id', 'username', 'email', 'hashed_password', 'token_version', 'created_at', 'updated_at')
+CATALOG_COLUMNS = ('id', 'name', 'description', 'owner_id', 'created_at', 'updated_at')
+CATEGORY_COLUMNS = ('id', 'name', 'owner_id', 'created_at', 'updated_at')
+PRODUCT_COLUMNS = (
+    'id',
+    'name',
+    'description',
+    'price',
+    'sku',
+    'catalog_id',
+    'category_id',
+    'owner_id',
+    'created_at',
+    'updated_at',
+)
+
+
+class DataFactory:
+    """Generates users, catalogs, categories and products and loads them with COPY.
+
+    IDs are reserved from the tables' sequences before loading, so the rows are streamed straight from generators
+    and the IDs of millions of rows are returned as ranges instead of being read back. The rows are written in the
+    connection's current transaction: inside the `connection` fixture they are rolled back after the test.
+    """
+
+    def __init__(self, connection: AsyncConnection, start: datetime | None = None) -> None:
+        """Load rows through `connection`, with creation times counting up one second per row from `start`."""
+        self.connection = connection
+        self.start = start or datetime(2025, 1, 1, tzinfo=UTC)
+
+    async def _reserve_ids(self, table: str, count: int) -> range:
+        """Take `count` consecutive values of the ID sequence of `table`."""
+        if count == 0:
+            return range(0)
+        query = sa.text(
+            "SELECT setval(pg_get_serial_sequence(:table, 'id'), nextval(pg_get_serial_sequence(:table, 'id')) "
+            '+ :count - 1)'
+        )
+        last = await self.connection.scalar(query, {'table': table, 'count': count})
+        return range(last - count + 1, last + 1)
+
+    def _timestamps(self, index: int) -> tuple[datetime, datetime]:
+        """Creation and update times of the `index`-th row of an owner."""
+        created_at = self.start + timedelta(seconds=index)
+        return created_at, created_at
+
+    async def create_users(self, count: int, *, hashed_password: str = HASHED_PASSWORD) -> range:
+        """Create `count` users called `user<ID>`, with e-mail `user<ID>@example.com`, and return their IDs."""
+        ids = await self._reserve_ids('users', count)
+        rows = (
+            (user_id, f'user{user_id}', f'user{user_id}@example.com', hashed_password, 0, *self._timestamps(index))
+            for index, user_id in enumerate(ids)
+        )
+        await copy_rows(self.connection, 'users', USER_COLUMNS, rows)
+        return ids
+
+    async def create_catalogs(self, owner_ids: Sequence[int], per_owner: int) -> dict[int, range]:
+        """Create `per_owner` catalogs for each of `owner_ids`, and return the IDs of each owner's catalogs."""
+        ids = await self._reserve_ids('catalogs', len(owner_ids) * per_owner)
+        catalogs = {
+            owner_id: ids[slot * per_owner : (slot + 1) * per_owner] for slot, owner_id in enumerate(owner_ids)
+        }
+        rows = (
+            (catalog_id, f'Catalog {index}', f'Catalog {index} of user {owner_id}', owner_id, *self._timestamps(index))
+            for owner_id, catalog_ids in catalogs.items()
+            for index, catalog_id in enumerate(catalog_ids)
+        )
+        await copy_rows(self.connection, 'catalogs', CATALOG_COLUMNS, rows)
+        return catalogs
+
+    async def create_categories(self, owner_ids: Sequence[int], per_owner: int) -> dict[int, range]:
+        """Create `per_owner` categories for each of `owner_ids`, and return the IDs of each owner's categories."""
+        ids = await self._reserve_ids('categories', len(owner_ids) * per_owner)
+        categories = {
+            owner_id: ids[slot * per_owner : (slot + 1) * per_owner] for slot, owner_id in enumerate(owner_ids)
+        }
+        rows = (
+            (category_id, f'Category {index}', owner_id, *self._timestamps(index))
+            for owner_id, category_ids in categories.items()
+            for index, category_id in enumerate(category_ids)
+        )
+        await copy_rows(self.connection, 'categories', CATEGORY_COLUMNS, rows)
+        return categories
+
+    async def create_products(
+        self,
+        counts: Mapping[int, int],
+        catalogs: Mapping[int, Sequence[int]],
+        categories: Mapping[int, Sequence[int]],
+    ) -> dict[int, range]:
+        """Create `counts[owner_id]` products for each owner, spread over the owner's catalogs and categories.
+
+        The products of an owner are named `Product <n>`, have SKU `SKU-<n>` and prices cycling from 1.00 to
+        100.99. Return the IDs of each owner's products.
+        """
+        ids = await self._reserve_ids('products', sum(counts.values()))
+        products: dict[int, range] = {}
+        offset = 0
+        for owner_id, count in counts.items():
+            products[owner_id] = ids[offset : offset + count]
+            offset += count
+
+        def rows() -> Iterator[tuple[Any, ...]]:
+            for owner_id, product_ids in products.items():
+                catalog_ids, category_ids = catalogs[owner_id], categories[owner_id]
+                for index, product_id in enumerate(product_ids):
+                    yield (
+                        product_id,
+                        f'Product {index}',
+                        f'Description of product {index}, about as long as a marketplace listing usually is.',
+                        Decimal(index % 10_000) / 100 + 1,
+                        f'SKU-{index}',
+                        catalog_ids[index % len(catalog_ids)],
+                        category_ids[index % len(category_ids)],
+                        owner_id,
+                        *self._timestamps(index),
+                    )
+
+        await copy_rows(self.connection, 'products', PRODUCT_COLUMNS, rows())
+        return products
+
+    async def analyze(self) -> None:
+        """Refresh the planner statistics of the tables, as autovacuum would after a large load."""
+        await self.connection.exec_driver_sql('ANALYZE users, catalogs, categories, products')
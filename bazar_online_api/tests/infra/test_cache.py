@@ -0,0 +1,75 @@
+import pytest
+from app.infra.cache import MemoryCache, RedisCache
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        """Start the clock at zero."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+class FakeRedis:
+    """In-memory stand-in for `redis.asyncio.Redis`, ignoring expiry."""
+
+    def __init__(self) -> None:
+        """Start with an empty store."""
+        self.store: dict[str, bytes] = {}
+        self.expiries: dict[str, int] = {}
+
+    async def get(self, name: str) -> bytes | None:
+        """GET command."""
+        return self.store.get(name)
+
+    async def set(self, name: str, value: bytes, px: int) -> None:
+        """SET command with a millisecond expiry."""
+        self.store[name] = value
+        self.expiries[name] = px
+
+    async def delete(self, *names: str) -> None:
+        """DEL command."""
+        for name in names:
+            self.store.pop(name, None)
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_expires_entries() -> None:
+    """Test that entries are no longer returned once their TTL has elapsed."""
+    clock = FakeClock()
+    cache = MemoryCache(max_entries=10, clock=clock)
+    await cache.set('key', b'value', ttl=5)
+    assert await cache.get('key') == b'value'
+    clock.now = 5
+    assert await cache.get('key') is None
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_evicts_least_recently_used() -> None:
+    """Test that the least recently used entry is evicted when the cache is full."""
+    cache = MemoryCache(max_entries=2)
+    await cache.set('a', b'1', ttl=60)
+    await cache.set('b', b'2', ttl=60)
+    await cache.get('a')
+    await cache.set('c', b'3', ttl=60)
+    assert await cache.get('a') == b'1'
+    assert await cache.get('b') is None
+    assert await cache.get('c') == b'3'
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_prefixes_keys() -> None:
+    """Test that the Redis backend namespaces keys and sends the TTL in milliseconds."""
+    client = FakeRedis()
+    cache = RedisCache(client, prefix='test:')
+    await cache.set('key', b'value', ttl=1.5)
+    assert client.store == {'test:key': b'value'}
+    assert client.expiries == {'test:key': 1500}
+    assert await cache.get('key') == b'value'
+    await cache.delete('key')
+    assert await cache.get('key') is None
@@ -0,0 +1,22 @@
+from datetime import UTC, datetime
+
+import pytest
+import sqlalchemy as sa
+from app.core.models import User
+from app.infra.copy import copy_rows
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@pytest.mark.asyncio
+async def test_copy_rows_loads_rows_in_the_current_transaction(session: AsyncSession) -> None:
+    """Test that copied rows are visible in the transaction and discarded with it on rollback."""
+    now = datetime.now(UTC)
+    columns = ('username', 'email', 'hashed_password', 'token_version', 'created_at', 'updated_at')
+    rows = ((f'copied{index}', f'copied{index}@example.com', 'hash', 0, now, now) for index in range(3))
+    await copy_rows(await session.connection(), 'users', columns, rows)
+
+    usernames = await session.scalars(sa.select(User.username).order_by(User.username))
+    assert list(usernames) == ['copied0', 'copied1', 'copied2']
+
+    await session.rollback()
+    assert await session.scalar(sa.select(sa.func.count()).select_from(User)) == 0
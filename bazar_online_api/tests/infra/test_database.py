@@ -0,0 +1,91 @@
+import pytest
+import sqlalchemy as sa
+from app.core.settings import settings
+from app.infra.database import (
+    POOL_TIMEOUTS,
+    POOL_WAIT_SECONDS,
+    REPLICA_EJECTIONS,
+    InstrumentedPool,
+    ReplicaRouter,
+    configure_search,
+)
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from tests.infra.test_cache import FakeClock
+
+
+@pytest.mark.asyncio
+async def test_instrumented_pool_records_waits_and_timeouts(engine: AsyncEngine) -> None:
+    """Test that checkouts are timed and that exhausting the pool counts a timeout."""
+    small_engine = create_async_engine(
+        engine.url, poolclass=InstrumentedPool, pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    waits_before = POOL_WAIT_SECONDS.count()
+    timeouts_before = POOL_TIMEOUTS.value()
+    try:
+        async with small_engine.connect():
+            with pytest.raises(PoolTimeoutError):
+                async with small_engine.connect():
+                    pass
+    finally:
+        await small_engine.dispose()
+
+    expected_waits = 2
+    assert POOL_WAIT_SECONDS.count() - waits_before == expected_waits
+    assert POOL_TIMEOUTS.value() - timeouts_before == 1
+
+
+@pytest.mark.asyncio
+async def test_configure_search_sets_threshold_per_connection(
+    engine: AsyncEngine, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that new connections get the configured similarity threshold, which outlives rolled back work."""
+    monkeypatch.setattr(settings, 'SEARCH_SIMILARITY_THRESHOLD', 0.25)
+    search_engine = create_async_engine(engine.url, pool_size=1, max_overflow=0)
+    configure_search(search_engine.sync_engine)
+    try:
+        for _ in range(2):
+            async with search_engine.connect() as conn:
+                threshold = await conn.scalar(sa.text('SHOW pg_trgm.word_similarity_threshold'))
+                await conn.rollback()
+            assert threshold == '0.25'
+    finally:
+        await search_engine.dispose()
+
+
+def test_replica_router_round_robin_and_ejection() -> None:
+    """Test that replicas are tried in turn and that an ejected replica is skipped until its ejection expires."""
+    clock = FakeClock()
+    first, second = async_sessionmaker[AsyncSession](), async_sessionmaker[AsyncSession]()
+    router = ReplicaRouter([first, second], eject_seconds=10, clock=clock)
+
+    assert [factory for _, factory in router.candidates()] == [first, second]
+    assert [factory for _, factory in router.candidates()] == [second, first]
+
+    router.eject(0)
+    assert [factory for _, factory in router.candidates()] == [second]
+    clock.now = 10
+    assert [factory for _, factory in router.candidates()] == [second, first]
+
+
+@pytest.mark.asyncio
+async def test_replica_router_ejects_unreachable_replica(engine: AsyncEngine) -> None:
+    """Test that a replica refusing connections is ejected and the next one is used instead."""
+    unreachable_engine = create_async_engine(engine.url.set(host='127.0.0.1', port=1))
+    unreachable = async_sessionmaker(bind=unreachable_engine)
+    reachable = async_sessionmaker(bind=engine)
+    router = ReplicaRouter([unreachable, reachable], eject_seconds=30)
+    ejections_before = REPLICA_EJECTIONS.value()
+    try:
+        session = await router.connect()
+        assert session is not None
+        async with session:
+            assert session.bind is engine
+        assert [factory for _, factory in router.candidates()] == [reachable]
+        assert REPLICA_EJECTIONS.value() - ejections_before == 1
+
+        router.eject(1)
+        assert await router.connect() is None
+    finally:
+        await unreachable_engine.dispose()
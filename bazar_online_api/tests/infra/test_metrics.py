@@ -0,0 +1,46 @@
+import pytest
+from app.infra.metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_registry_renders_prometheus_text() -> None:
+    """Test that counters, gauges and histograms render in the Prometheus text format."""
+    registry = Registry()
+    requests = registry.register(Counter('requests_total', 'Requests served.', ['route']))
+    registry.register(Gauge('connections', 'Open connections.', lambda: 3))
+    latency = registry.register(Histogram('latency_seconds', 'Request latency.', buckets=(0.1, 1.0)))
+    requests.inc(route='/a')
+    requests.inc(2, route='/a')
+    latency.observe(0.05)
+    latency.observe(0.1)
+    latency.observe(5)
+
+    assert registry.render().splitlines() == [
+        '# HELP requests_total Requests served.',
+        '# TYPE requests_total counter',
+        'requests_total{route="/a"} 3.0',
+        '# HELP connections Open connections.',
+        '# TYPE connections gauge',
+        'connections 3.0',
+        '# HELP latency_seconds Request latency.',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1.0"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        'latency_seconds_sum 5.15',
+        'latency_seconds_count 3',
+    ]
+
+
+def test_metric_rejects_unknown_labels() -> None:
+    """Test that observing a metric with the wrong label names fails loudly."""
+    counter = Counter('errors_total', 'Errors.', ['route'])
+    with pytest.raises(ValueError, match='expects labels'):
+        counter.inc(method='GET')
+
+
+def test_registry_rejects_duplicate_names() -> None:
+    """Test that two metrics cannot share a name."""
+    registry = Registry()
+    registry.register(Counter('errors_total', 'Errors.'))
+    with pytest.raises(ValueError, match='already registered'):
+        registry.register(Counter('errors_total', 'Errors.'))
@@ -0,0 +1,57 @@
+import logging
+import re
+
+import pytest
+from app.core.models import Catalog
+from app.core.settings import settings
+from app.infra.profiling import QUERY_BUDGET_EXCEEDED, REQUEST_QUERIES, REQUEST_SECONDS, RequestProfile
+from httpx import AsyncClient
+
+
+def test_server_timing() -> None:
+    """Test that a profile renders as a Server-Timing header value in milliseconds."""
+    profile = RequestProfile()
+    profile.queries = 3
+    profile.db_seconds = 0.0125
+    profile.serialization_seconds = 0.0004
+
+    assert profile.server_timing(0.05) == 'db;desc="3 queries";dur=12.5, serialize;dur=0.4, total;dur=50.0'
+
+
+@pytest.mark.asyncio
+async def test_requests_are_profiled(async_client: AsyncClient, token: str, catalog: Catalog) -> None:
+    """Test that requests get a Server-Timing header and are recorded under their route template."""
+    route = '/v1/catalogs/{catalog_id}'
+    requests_before = REQUEST_SECONDS.count(method='GET', route=route, status='200')
+    profiled_before = REQUEST_QUERIES.count(method='GET', route=route)
+
+    response = await async_client.get(f'/v1/catalogs/{catalog.id}', headers={'Authorization': f'Bearer {token}'})
+
+    match = re.match(
+        r'db;desc="(\d+) queries";dur=[\d.]+, serialize;dur=[\d.]+, total;dur=[\d.]+$',
+        response.headers['Server-Timing'],
+    )
+    assert match is not None
+    assert int(match.group(1)) >= 1
+    assert REQUEST_SECONDS.count(method='GET', route=route, status='200') == requests_before + 1
+    assert REQUEST_QUERIES.count(method='GET', route=route) == profiled_before + 1
+
+
+@pytest.mark.asyncio
+async def test_query_budget_warning(
+    async_client: AsyncClient,
+    token: str,
+    catalog: Catalog,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Test that a request running more statements than the threshold is logged and counted."""
+    monkeypatch.setattr(settings, 'REQUEST_QUERY_WARNING_THRESHOLD', 0)
+    route = '/v1/catalogs/{catalog_id}'
+    exceeded_before = QUERY_BUDGET_EXCEEDED.value(method='GET', route=route)
+
+    with caplog.at_level(logging.WARNING, logger='app.infra.profiling'):
+        await async_client.get(f'/v1/catalogs/{catalog.id}', headers={'Authorization': f'Bearer {token}'})
+
+    assert QUERY_BUDGET_EXCEEDED.value(method='GET', route=route) == exceeded_before + 1
+    assert any('Possible N+1 queries: GET /v1/catalogs/{catalog_id}' in message for message in caplog.messages)
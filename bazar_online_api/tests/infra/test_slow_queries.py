@@ -0,0 +1,20 @@
+from app.infra.slow_queries import bind_shape, normalize_sql
+
+
+def test_normalize_sql() -> None:
+    """Test that literals, placeholders and placeholder lists are reduced to the statement's shape."""
+    statement = """SELECT products.id FROM products
+        WHERE products.owner_id = $1 AND products.name = 'Lamp' AND products.id IN ($2, $3, $4) LIMIT 21"""
+
+    assert normalize_sql(statement) == (
+        'SELECT products.id FROM products WHERE products.owner_id = ? AND products.name = ? '
+        'AND products.id IN (?, ...) LIMIT ?'
+    )
+    assert normalize_sql('SELECT %(id_1)s, %(id_2)s') == 'SELECT ?, ?'
+
+
+def test_bind_shape() -> None:
+    """Test that bind parameters are described by their types only."""
+    assert bind_shape((1, 'secret', [1, 2])) == '(int, str, list[2])'
+    assert bind_shape({'owner_id_1': 1, 'name_1': None}) == '(owner_id_1: int, name_1: NoneType)'
+    assert bind_shape([{'id': 1}, {'id': 2}], executemany=True) == '2 x (id: int)'
@@ -0,0 +1,30 @@
+import pytest
+import sqlalchemy as sa
+from app.core.models import Catalog, CatalogStats, Category, Product, User
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from tests.factory import DataFactory
+
+
+@pytest.mark.asyncio
+async def test_factory_loads_related_rows(session: AsyncSession, factory: DataFactory) -> None:
+    """Test that the factory's rows reference each other through the IDs it returns, and keep stats up to date."""
+    user_ids = await factory.create_users(3)
+    catalogs = await factory.create_catalogs(user_ids, 2)
+    categories = await factory.create_categories(user_ids, 4)
+    products = await factory.create_products({user_ids[0]: 10, user_ids[1]: 0, user_ids[2]: 5}, catalogs, categories)
+
+    assert list(await session.scalars(sa.select(User.id).order_by(User.id))) == list(user_ids)
+    assert await session.scalar(sa.select(sa.func.count()).select_from(Category)) == 3 * 4
+    for owner_id in user_ids:
+        owned = sa.select(Catalog.id).where(Catalog.owner_id == owner_id).order_by(Catalog.id)
+        assert list(await session.scalars(owned)) == list(catalogs[owner_id])
+        query = sa.select(Product.id, Product.catalog_id, Product.category_id).where(Product.owner_id == owner_id)
+        rows = (await session.execute(query.order_by(Product.id))).all()
+        assert [row.id for row in rows] == list(products[owner_id])
+        assert {row.catalog_id for row in rows} <= set(catalogs[owner_id])
+        assert {row.category_id for row in rows} <= set(categories[owner_id])
+
+    stats = await session.get(CatalogStats, catalogs[user_ids[0]][0])
+    assert stats is not None
+    assert stats.product_count == 10 // 2
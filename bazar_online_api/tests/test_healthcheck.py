@@ -11,3 +11,12 @@ def test_healthcheck() -> None:
     response = client.get('/healthcheck')
     assert response.status_code == HTTPStatus.OK
     assert response.json() == {'status': 'ok'}
+
+
+def test_metrics() -> None:
+    """Test that the metrics endpoint exposes the database pool metrics."""
+    response = client.get('/metrics')
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain')
+    assert '# TYPE db_pool_wait_seconds histogram' in response.text
+    assert 'db_pool_checked_out ' in response.text